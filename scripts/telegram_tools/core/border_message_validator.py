@@ -12,6 +12,9 @@ import sys
 from datetime import datetime, timedelta
 from pathlib import Path
 import pytz
+from hash_cache import sha256_file
+from ocr_queue import PRIORITY_BORDER, enqueue_and_drain
+from temporal_anchor import ESTIMATE_MARGIN, TemporalAnchor
 
 try:
     from telethon import TelegramClient
@@ -39,6 +42,16 @@ class BorderMessageValidator:
             dir_path.mkdir(parents=True, exist_ok=True)
 
         self.moscow_tz = pytz.timezone('Europe/Moscow')
+        # Downloaded images per channel, queued for OCR once by queue_media_ocr
+        self.pending_ocr = {}
+
+    def queue_media_ocr(self):
+        """Queue every image downloaded so far for background OCR, starting one drainer"""
+        queued = 0
+        for channel, messages in self.pending_ocr.items():
+            queued += enqueue_and_drain(channel, (messages, PRIORITY_BORDER))
+        self.pending_ocr = {}
+        return queued
 
     def load_credentials(self):
         """Load Telegram credentials"""
@@ -77,7 +90,7 @@ class BorderMessageValidator:
 
         return start_time <= msg_time_moscow <= end_time
 
-    async def download_and_verify_media(self, client, message, message_data):
+    async def download_and_verify_media(self, client, message, message_data, channel=None):
         """Download media and create verification hash"""
         if not hasattr(message, 'media') or not message.media:
             return None
@@ -94,22 +107,18 @@ class BorderMessageValidator:
 
             media_path = Path(media_path)
 
-            # Generate content hash
-            content_hash = hashlib.sha256()
-            with open(media_path, 'rb') as f:
-                for chunk in iter(lambda: f.read(4096), b""):
-                    content_hash.update(chunk)
-
             media_info = {
                 'file_path': str(media_path),
                 'file_name': media_path.name,
                 'file_size': media_path.stat().st_size,
-                'content_hash': content_hash.hexdigest(),
+                'content_hash': sha256_file(media_path),
                 'download_time': datetime.now(self.moscow_tz).isoformat(),
                 'message_id': message.id
             }
 
             print(f"📎 Downloaded media for message {message.id}: {media_path.name}")
+            if channel:
+                self.pending_ocr.setdefault(channel, []).append({'id': message.id, 'media_info': media_info})
             return media_info
 
         except Exception as e:
@@ -192,7 +201,7 @@ class BorderMessageValidator:
 
             if hasattr(message, 'media') and message.media:
                 # Download and verify media
-                media_info = await self.download_and_verify_media(client, message, None)
+                media_info = await self.download_and_verify_media(client, message, None, channel)
 
                 # Add media marker to text
                 if hasattr(message.media, 'photo'):
@@ -260,28 +269,40 @@ class BorderMessageValidator:
             # First pass: Get a large sample around the target date
             print("🔍 Phase 1: Broad search for date boundaries")
 
-            # Start from recent messages and go backward
-            last_id = 0
+            # Start just above the interpolated end of the day when anchors bracket it,
+            # otherwise from recent messages, and go backward
+            start_ids = [0]
+            estimate = TemporalAnchor().estimate_message_id(channel, start_moscow.date() + timedelta(days=1))
+            if estimate and estimate['method'] == 'interpolated':
+                start_ids.insert(0, estimate['message_id'] + ESTIMATE_MARGIN)
+                print(f"  🧭 Anchors place the end of the day near ID {estimate['message_id']}")
+
             search_limit = 1000
             messages_checked = 0
 
-            async for message in client.iter_messages(entity, limit=search_limit):
-                messages_checked += 1
-                msg_time_moscow = message.date.astimezone(self.moscow_tz)
-
-                # Check if message is in our target date
-                if start_moscow <= msg_time_moscow <= end_moscow:
-                    candidates.append({
-                        'id': message.id,
-                        'date_moscow': msg_time_moscow,
-                        'text': message.message or '[Media]'
-                    })
-                    print(f"  📌 Found candidate: ID {message.id} at {msg_time_moscow.strftime('%H:%M:%S')}")
-
-                # If we've gone past our target date, we can stop
-                if msg_time_moscow < start_moscow:
-                    print(f"  ⏹️  Reached messages before target date, stopping search")
+            for offset_id in start_ids:
+                async for message in client.iter_messages(entity, limit=search_limit, offset_id=offset_id):
+                    messages_checked += 1
+                    msg_time_moscow = message.date.astimezone(self.moscow_tz)
+
+                    # Check if message is in our target date
+                    if start_moscow <= msg_time_moscow <= end_moscow:
+                        candidates.append({
+                            'id': message.id,
+                            'date_moscow': msg_time_moscow,
+                            'text': message.message or '[Media]'
+                        })
+                        print(f"  📌 Found candidate: ID {message.id} at {msg_time_moscow.strftime('%H:%M:%S')}")
+
+                    # If we've gone past our target date, we can stop
+                    if msg_time_moscow < start_moscow:
+                        print(f"  ⏹️  Reached messages before target date, stopping search")
+                        break
+
+                if candidates:
                     break
+                if offset_id:
+                    print("  ↩️  Estimate missed the target date, searching from the latest message")
 
             if not candidates:
                 print("❌ No messages found for the target date")
@@ -466,6 +487,7 @@ Examples:
                     print(f"🎯 Live Confidence Score: {live_result['confidence_score']:.1%}")
             else:
                 print(f"❌ Live verification failed: {live_result.get('error', live_result['status'])}")
+            validator.queue_media_ocr()
         else:
             print(f"❌ Cache validation failed: {cache_result.get('error', cache_result['status'])}")
 
@@ -473,6 +495,7 @@ Examples:
         # Direct boundary detection
         print(f"🎯 Finding first message of {target_date} in {channel}")
         result = await validator.find_first_message_of_date(channel, target_date)
+        validator.queue_media_ocr()
 
         if result['status'] == 'success':
             msg = result['first_message']
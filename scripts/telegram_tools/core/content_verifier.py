@@ -11,7 +11,9 @@ import os
 import sys
 from datetime import datetime, timedelta
 from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
 import pytz
+from hash_cache import cached_sha256
 
 try:
     from telethon import TelegramClient
@@ -56,8 +58,11 @@ class ContentVerifier:
             content = content.encode('utf-8')
         return hashlib.sha256(content).hexdigest()
 
-    def verify_media_file(self, media_info):
-        """Verify media file exists and matches hash"""
+    def verify_media_file(self, media_info, deep=False):
+        """Verify media file exists and matches hash
+
+        Digests come from the stat-keyed hash cache; deep=True forces a full rehash.
+        """
         if not media_info:
             return {'status': 'no_media', 'verified': True}
 
@@ -79,13 +84,8 @@ class ContentVerifier:
             }
 
         # Calculate actual file hash
-        actual_hash = hashlib.sha256()
         try:
-            with open(file_path, 'rb') as f:
-                for chunk in iter(lambda: f.read(4096), b""):
-                    actual_hash.update(chunk)
-
-            actual_hash_str = actual_hash.hexdigest()
+            actual_hash_str = cached_sha256(file_path, deep)
 
             if actual_hash_str == expected_hash:
                 return {
@@ -109,6 +109,37 @@ class ContentVerifier:
                 'error': str(e)
             }
 
+    def verify_media_files(self, media_infos, deep=False, workers=None):
+        """verify_media_file over many files in a thread pool (hashlib releases the GIL)"""
+        workers = workers or min(8, os.cpu_count() or 1)
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            return list(pool.map(lambda info: self.verify_media_file(info, deep), media_infos))
+
+    def verify_cache_media(self, cache_file, deep=False, workers=None):
+        """Verify every media file referenced by a cache file, without contacting Telegram"""
+        with open(cache_file, 'r', encoding='utf-8') as f:
+            messages = [m for m in json.load(f).get('messages', []) if m.get('media_info')]
+
+        print(f"🔍 Verifying {len(messages)} media files from {cache_file}")
+        started = datetime.now()
+        results = self.verify_media_files([m['media_info'] for m in messages], deep, workers)
+        elapsed = (datetime.now() - started).total_seconds()
+
+        failed = [
+            {'message_id': m['id'], **result}
+            for m, result in zip(messages, results) if not result['verified']
+        ]
+        for failure in failed:
+            print(f"  ❌ Message {failure['message_id']}: {failure['status']}")
+        print(f"✅ Verified: {len(messages) - len(failed)}/{len(messages)} media files in {elapsed:.1f}s")
+
+        return {
+            'cache_file': str(cache_file),
+            'media_files': len(messages),
+            'failed': failed,
+            'verified': not failed
+        }
+
     async def verify_message_against_live(self, client, channel, message_data):
         """Verify cached message against live Telegram data"""
         try:
@@ -186,7 +217,7 @@ class ContentVerifier:
                 'error': str(e)
             }
 
-    async def verify_cache_file(self, cache_file, sample_size=10, verify_media=True):
+    async def verify_cache_file(self, cache_file, sample_size=10, verify_media=True, deep=False):
         """Verify cache file against live Telegram data"""
         print(f"🔍 Verifying cache file: {cache_file}")
 
@@ -216,6 +247,15 @@ class ContentVerifier:
 
             print(f"🧪 Verifying {len(sample_messages)} sample messages")
 
+            # Hash all sampled media up front, in parallel, instead of between live lookups
+            media_results = {}
+            if verify_media:
+                with_media = [m for m in sample_messages if m.get('media_info')]
+                media_results = dict(zip(
+                    (m['id'] for m in with_media),
+                    self.verify_media_files([m['media_info'] for m in with_media], deep)
+                ))
+
             # Load credentials and connect
             creds = self.load_credentials()
             client = TelegramClient(
@@ -236,9 +276,7 @@ class ContentVerifier:
                     live_verification = await self.verify_message_against_live(client, channel, message)
 
                     # Verify media if present and requested
-                    media_verification = {'status': 'no_media', 'verified': True}
-                    if verify_media and message.get('media_info'):
-                        media_verification = self.verify_media_file(message['media_info'])
+                    media_verification = media_results.get(message['id'], {'status': 'no_media', 'verified': True})
 
                     result = {
                         'message_id': message['id'],
@@ -421,8 +459,12 @@ async def main():
 Content Verifier - Advanced Cache Verification System
 
 Usage:
-  python content_verifier.py <cache_file> [--sample-size N] [--no-media] [--auto-correct]
-  python content_verifier.py --channel <channel> [--sample-size N] [--no-media] [--auto-correct]
+  python content_verifier.py <cache_file> [--sample-size N] [--no-media] [--deep] [--auto-correct]
+  python content_verifier.py --channel <channel> [--sample-size N] [--no-media] [--deep] [--auto-correct]
+  python content_verifier.py <cache_file> --media-only [--deep] [--workers N]
+
+  --deep        Rehash every media file instead of trusting the cached digest of unchanged files
+  --media-only  Verify all media files of the cache locally (no Telegram connection)
 
 Examples:
   python content_verifier.py cache.json
@@ -438,6 +480,9 @@ Examples:
     channel = None
     sample_size = 10
     verify_media = True
+    deep = False
+    media_only = False
+    workers = None
     auto_correct = False
 
     i = 1
@@ -455,6 +500,15 @@ Examples:
         elif arg == '--no-media':
             verify_media = False
             i += 1
+        elif arg == '--deep':
+            deep = True
+            i += 1
+        elif arg == '--media-only':
+            media_only = True
+            i += 1
+        elif arg == '--workers':
+            workers = int(sys.argv[i + 1])
+            i += 2
         elif arg == '--auto-correct':
             auto_correct = True
             i += 1
@@ -478,10 +532,14 @@ Examples:
         print(f"❌ Cache file not found: {cache_file}")
         sys.exit(1)
 
+    if media_only:
+        report = verifier.verify_cache_media(cache_file, deep, workers)
+        sys.exit(0 if report['verified'] else 1)
+
     try:
         # Run verification
         verification_report = await verifier.verify_cache_file(
-            cache_file, sample_size, verify_media
+            cache_file, sample_size, verify_media, deep
         )
 
         if verification_report['status'] == 'error':
@@ -4,6 +4,7 @@ Daily Persistence - Permanent storage for complete daily message caches
 Implements RTM requirements FR-002, TR-002
 """
 
+import gzip
 import json
 import os
 import shutil
@@ -11,9 +12,26 @@ from datetime import datetime, timedelta
 from pathlib import Path
 import pytz
 
+ARCHIVE_SUFFIX = ".ndjson.gz"
+LEGACY_SUFFIX = ".json"
+
+
+def archive_channel_name(path):
+    """Channel file name of a daily archive, for both .ndjson.gz and legacy .json"""
+    name = Path(path).name
+    for suffix in (ARCHIVE_SUFFIX, LEGACY_SUFFIX):
+        if name.endswith(suffix):
+            return name[:-len(suffix)]
+    return Path(path).stem
+
 
 class DailyPersistence:
-    """Manages permanent storage of daily message caches"""
+    """Manages permanent storage of daily message caches
+
+    Archives are gzip-compressed NDJSON: a {"meta": ...} line followed by one
+    message per line, newest first. Days archived before this format as
+    pretty-printed .json are still read.
+    """
 
     def __init__(self, base_dir=None):
         if base_dir is None:
@@ -37,11 +55,61 @@ class DailyPersistence:
 
         return dt.date()
 
-    def get_daily_path(self, channel, date):
+    def get_daily_path(self, channel, date, suffix=ARCHIVE_SUFFIX):
         """Get path for daily cache file"""
         clean_channel = channel.replace('@', '').replace('/', '_')
         date_str = date.strftime('%Y-%m-%d')
-        return self.daily_dir / date_str / f"{clean_channel}.json"
+        return self.daily_dir / date_str / f"{clean_channel}{suffix}"
+
+    def find_daily_path(self, channel, date):
+        """Existing archive for a channel and date (compressed preferred), or None"""
+        for suffix in (ARCHIVE_SUFFIX, LEGACY_SUFFIX):
+            path = self.get_daily_path(channel, date, suffix)
+            if path.exists():
+                return path
+        return None
+
+    def _iter_archive(self, path):
+        """Yield the meta dict, then each message, decompressing as it goes"""
+        if path.name.endswith(LEGACY_SUFFIX):
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            yield data.get('meta', {})
+            yield from data.get('messages', [])
+            return
+
+        with gzip.open(path, 'rt', encoding='utf-8') as f:
+            header = f.readline()
+            yield json.loads(header)['meta'] if header else {}
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+
+    def iter_daily_messages(self, channel, date):
+        """Stream a day's archived messages (newest first) without loading the whole file"""
+        daily_path = self.find_daily_path(channel, date)
+        if daily_path is None:
+            return
+        stream = self._iter_archive(daily_path)
+        next(stream, None)
+        yield from stream
+
+    def _write_archive(self, daily_path, meta, messages):
+        """Write meta + messages as gzip NDJSON via a temp file and rename"""
+        tmp_path = daily_path.with_name(f".{daily_path.name}.{os.getpid()}.tmp")
+        try:
+            with gzip.open(tmp_path, 'wt', encoding='utf-8') as f:
+                f.write(json.dumps({'meta': meta}, ensure_ascii=False, separators=(',', ':')) + '\n')
+                for msg in messages:
+                    f.write(json.dumps(msg, ensure_ascii=False, separators=(',', ':')) + '\n')
+            os.replace(tmp_path, daily_path)
+        finally:
+            if tmp_path.exists():
+                tmp_path.unlink()
+
+        legacy_path = daily_path.with_name(archive_channel_name(daily_path) + LEGACY_SUFFIX)
+        if legacy_path.exists():
+            legacy_path.unlink()
 
     def archive_daily_cache(self, channel, date=None):
         """Archive the current cache as a daily cache"""
@@ -70,10 +138,9 @@ class DailyPersistence:
             # Add daily persistence metadata
             cache_data['meta']['archived_at'] = datetime.now(self.moscow_tz).isoformat()
             cache_data['meta']['archive_date'] = date.isoformat()
-            cache_data['meta']['persistence_version'] = '1.0'
+            cache_data['meta']['persistence_version'] = '2.0'
 
-            with open(daily_path, 'w', encoding='utf-8') as dst:
-                json.dump(cache_data, dst, indent=2, ensure_ascii=False)
+            self._write_archive(daily_path, cache_data['meta'], cache_data['messages'])
 
             print(f"✅ Archived daily cache: {daily_path}")
             return True
@@ -84,9 +151,9 @@ class DailyPersistence:
 
     def restore_daily_cache(self, channel, date):
         """Restore a daily cache to the temp directory"""
-        daily_path = self.get_daily_path(channel, date)
+        daily_path = self.find_daily_path(channel, date)
 
-        if not daily_path.exists():
+        if daily_path is None:
             print(f"❌ No daily cache found for {channel} on {date}")
             return False
 
@@ -96,7 +163,16 @@ class DailyPersistence:
         restored_path = self.temp_dir / f"{clean_channel}_{date_str}_restored.json"
 
         try:
-            shutil.copy2(daily_path, restored_path)
+            if daily_path.name.endswith(LEGACY_SUFFIX):
+                shutil.copy2(daily_path, restored_path)
+            else:
+                # Caches are plain {meta, messages} JSON; stream the archive into one
+                stream = self._iter_archive(daily_path)
+                with open(restored_path, 'w', encoding='utf-8') as dst:
+                    dst.write('{"meta": ' + json.dumps(next(stream), ensure_ascii=False) + ', "messages": [')
+                    for i, msg in enumerate(stream):
+                        dst.write((',\n' if i else '\n') + json.dumps(msg, ensure_ascii=False))
+                    dst.write('\n]}\n')
             print(f"✅ Restored daily cache: {restored_path}")
             return str(restored_path)
 
@@ -106,14 +182,14 @@ class DailyPersistence:
 
     def get_daily_cache(self, channel, date):
         """Get daily cache data without restoring to temp"""
-        daily_path = self.get_daily_path(channel, date)
+        daily_path = self.find_daily_path(channel, date)
 
-        if not daily_path.exists():
+        if daily_path is None:
             return None
 
         try:
-            with open(daily_path, 'r', encoding='utf-8') as f:
-                return json.load(f)
+            stream = self._iter_archive(daily_path)
+            return {'meta': next(stream), 'messages': list(stream)}
         except Exception as e:
             print(f"❌ Failed to read daily cache: {str(e)}")
             return None
@@ -126,20 +202,22 @@ class DailyPersistence:
             clean_channel = channel.replace('@', '').replace('/', '_')
             for date_dir in self.daily_dir.iterdir():
                 if date_dir.is_dir():
-                    cache_file = date_dir / f"{clean_channel}.json"
-                    if cache_file.exists():
-                        caches.append({
-                            'channel': channel,
-                            'date': date_dir.name,
-                            'path': str(cache_file),
-                            'size': cache_file.stat().st_size
-                        })
+                    for suffix in (ARCHIVE_SUFFIX, LEGACY_SUFFIX):
+                        cache_file = date_dir / f"{clean_channel}{suffix}"
+                        if cache_file.exists():
+                            caches.append({
+                                'channel': channel,
+                                'date': date_dir.name,
+                                'path': str(cache_file),
+                                'size': cache_file.stat().st_size
+                            })
+                            break
         else:
             # List all caches
             for date_dir in self.daily_dir.iterdir():
                 if date_dir.is_dir():
-                    for cache_file in date_dir.glob("*.json"):
-                        channel_name = f"@{cache_file.stem}"
+                    for cache_file in self._archives_in(date_dir):
+                        channel_name = f"@{archive_channel_name(cache_file)}"
                         caches.append({
                             'channel': channel_name,
                             'date': date_dir.name,
@@ -149,12 +227,34 @@ class DailyPersistence:
 
         return sorted(caches, key=lambda x: (x['date'], x['channel']))
 
-    def cleanup_old_caches(self, retention_days=30):
-        """Remove daily caches older than retention period"""
-        cutoff_date = self.get_moscow_date() - timedelta(days=retention_days)
+    def _archives_in(self, date_dir):
+        return sorted(date_dir.glob(f"*{ARCHIVE_SUFFIX}")) + sorted(date_dir.glob(f"*{LEGACY_SUFFIX}"))
+
+    def compress_legacy_archives(self):
+        """Rewrite pretty-printed .json archives as gzip NDJSON; returns bytes saved"""
+        saved = 0
+        for legacy_path in sorted(self.daily_dir.glob(f"*/*{LEGACY_SUFFIX}")):
+            daily_path = legacy_path.with_name(archive_channel_name(legacy_path) + ARCHIVE_SUFFIX)
+            before = legacy_path.stat().st_size
+            stream = self._iter_archive(legacy_path)
+            meta = next(stream)
+            meta['persistence_version'] = '2.0'
+            self._write_archive(daily_path, meta, stream)
+            saved += before - daily_path.stat().st_size
+            print(f"🗜️  Compressed {legacy_path.parent.name}/{legacy_path.name}")
+        return saved
+
+    def cleanup_old_caches(self, retention_days=None):
+        """Compress legacy daily caches, removing days older than retention_days if given
+
+        Compressed archives are small enough to keep years of history, so by
+        default nothing is removed.
+        """
         removed_count = 0
+        date_dirs = self.daily_dir.iterdir() if retention_days is not None else ()
+        cutoff_date = self.get_moscow_date() - timedelta(days=retention_days or 0)
 
-        for date_dir in self.daily_dir.iterdir():
+        for date_dir in date_dirs:
             if date_dir.is_dir():
                 try:
                     dir_date = datetime.strptime(date_dir.name, '%Y-%m-%d').date()
@@ -167,6 +267,7 @@ class DailyPersistence:
                     continue
 
         print(f"✅ Cleanup complete: removed {removed_count} old cache directories")
+        self.compress_legacy_archives()
         return removed_count
 
     def get_cache_stats(self):
@@ -188,10 +289,10 @@ class DailyPersistence:
                     dates.append(dir_date)
                     stats['total_dates'] += 1
 
-                    for cache_file in date_dir.glob("*.json"):
+                    for cache_file in self._archives_in(date_dir):
                         stats['total_caches'] += 1
                         stats['total_size'] += cache_file.stat().st_size
-                        stats['channels'].add(f"@{cache_file.stem}")
+                        stats['channels'].add(f"@{archive_channel_name(cache_file)}")
 
                 except ValueError:
                     continue
@@ -217,13 +318,15 @@ Usage:
   python daily_persistence.py restore <channel> <date>
   python daily_persistence.py list [channel]
   python daily_persistence.py cleanup [days]
+  python daily_persistence.py compress
   python daily_persistence.py stats
 
 Examples:
   python daily_persistence.py archive @aiclubsweggs
   python daily_persistence.py restore @aiclubsweggs 2025-09-15
   python daily_persistence.py list @aiclubsweggs
-  python daily_persistence.py cleanup 30
+  python daily_persistence.py cleanup        # compress, keep all history
+  python daily_persistence.py cleanup 1825   # also drop days older than 5 years
   python daily_persistence.py stats
         """)
         sys.exit(1)
@@ -245,6 +348,9 @@ Examples:
             date = datetime.strptime(sys.argv[3], '%Y-%m-%d').date()
 
         success = dp.archive_daily_cache(channel, date)
+        if success:
+            # Archives written before the NDJSON format are converted on the way
+            dp.compress_legacy_archives()
         sys.exit(0 if success else 1)
 
     elif command == "restore":
@@ -278,13 +384,17 @@ Examples:
                 print(f"{cache['date']:<12} {cache['channel']:<20} {size_kb:>7} KB")
 
     elif command == "cleanup":
-        retention_days = 30
+        retention_days = None
         if len(sys.argv) > 2:
             retention_days = int(sys.argv[2])
 
         removed = dp.cleanup_old_caches(retention_days)
         print(f"Cleaned up {removed} old cache directories")
 
+    elif command == "compress":
+        saved = dp.compress_legacy_archives()
+        print(f"Saved {saved // 1024} KB")
+
     elif command == "stats":
         stats = dp.get_cache_stats()
         print("Daily Cache Statistics:")
@@ -8,7 +8,7 @@ import json
 from datetime import datetime, timedelta
 from pathlib import Path
 import pytz
-from temporal_anchor import TemporalAnchor
+from temporal_anchor import ESTIMATE_MARGIN, TemporalAnchor
 from daily_persistence import DailyPersistence
 
 
@@ -155,6 +155,19 @@ class GapValidator:
         prev_anchor = self.ta.get_previous_day_anchor(channel, target_date)
 
         if not prev_anchor:
+            # Anchors on both sides of the day still place its first id roughly
+            estimate = self.ta.estimate_message_id(channel, target_date)
+            if estimate and estimate['method'] == 'interpolated':
+                expected_id = estimate['message_id']
+                # A day starting well above the estimate is probably missing its early messages
+                plausible = first_message['id'] <= expected_id + ESTIMATE_MARGIN
+                return {
+                    'anchor_available': False,
+                    'validation': 'estimated' if plausible else 'suspicious',
+                    'reason': f"First message ID {first_message['id']} vs estimated day start {expected_id} "
+                              f"(±{ESTIMATE_MARGIN}, interpolated between anchor ids {estimate['lower'][1]} and {estimate['upper'][1]})",
+                    'estimate': estimate
+                }
             return {
                 'anchor_available': False,
                 'validation': 'no_anchor',
@@ -186,26 +199,24 @@ class GapValidator:
         """Validate temporal continuity with previous day's data"""
         # Get previous day's cached data
         prev_date = target_date - timedelta(days=1)
-        prev_cache = self.dp.get_daily_cache(channel, prev_date)
 
-        if not prev_cache:
+        if not self.dp.find_daily_path(channel, prev_date):
             return {
                 'continuity_check': 'no_previous_data',
                 'reason': f'No cached data available for {prev_date}',
                 'gap_detected': False
             }
 
-        prev_messages = prev_cache['messages']
-        if not prev_messages:
+        # Get last message from previous day: archives are in reverse chronological
+        # order, so only the start of the archive has to be decompressed
+        prev_last_msg = next(self.dp.iter_daily_messages(channel, prev_date), None)
+        if not prev_last_msg:
             return {
                 'continuity_check': 'empty_previous_data',
                 'reason': f'Previous day cache is empty',
                 'gap_detected': False
             }
 
-        # Get last message from previous day
-        prev_last_msg = prev_messages[0]  # Messages in reverse chronological order
-
         # Get first message from current day
         current_date_str = target_date.isoformat()
         current_messages = [m for m in messages if m['date_msk'].startswith(current_date_str)]
@@ -307,8 +318,11 @@ class GapValidator:
         if boundary_val['valid']:
             score += 30
             # Bonus for anchor validation
-            if boundary_val.get('anchor_validation', {}).get('validation') == 'valid':
+            anchor_check = boundary_val.get('anchor_validation', {}).get('validation')
+            if anchor_check == 'valid':
                 score += 10
+            elif anchor_check == 'estimated':
+                score += 5
 
         # Continuity validation (30 points max)
         if not continuity_val['gap_detected']:
@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+Hash Cache - Remember SHA-256 digests of media files between runs
+A digest is reused while the file's (path, inode, size, mtime_ns) is unchanged
+"""
+
+import atexit
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+DEFAULT_BASE_DIR = Path(__file__).parent.parent.parent.parent / "telegram_cache"
+
+# A file modified this close to being hashed could change again within the same
+# mtime tick without its stat changing, so such digests are not remembered
+RACY_WINDOW_NS = 2_000_000_000
+
+HASH_BUFFER_SIZE = 1 << 20
+
+
+def sha256_file(path, buffer_size=HASH_BUFFER_SIZE):
+    """Full SHA-256 of a file
+
+    Reads unbuffered into one reusable 1 MB buffer: no per-chunk allocations,
+    and hashlib releases the GIL while digesting large chunks, so several
+    files can be hashed in parallel threads.
+    """
+    digest = hashlib.sha256()
+    buffer = bytearray(buffer_size)
+    view = memoryview(buffer)
+    with open(path, 'rb', buffering=0) as f:
+        while True:
+            size = f.readinto(buffer)
+            if not size:
+                break
+            digest.update(view[:size])
+    return digest.hexdigest()
+
+
+class HashCache:
+    """SQLite store of path → (inode, size, mtime_ns, sha256)"""
+
+    def __init__(self, base_dir=None):
+        self.base_dir = Path(base_dir) if base_dir else DEFAULT_BASE_DIR
+        self.base_dir.mkdir(parents=True, exist_ok=True)
+        self.db_path = self.base_dir / "hash_cache.sqlite3"
+        # Shared by verification threads; statements are serialized by the lock
+        self.conn = sqlite3.connect(str(self.db_path), timeout=30, check_same_thread=False)
+        self.lock = threading.Lock()
+        # The verifier, OCR runs and the background drainer hash concurrently:
+        # WAL lets their reads proceed while another process writes
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS hashes (
+                path TEXT PRIMARY KEY,
+                inode INTEGER NOT NULL,
+                size INTEGER NOT NULL,
+                mtime_ns INTEGER NOT NULL,
+                sha256 TEXT NOT NULL
+            )
+        """)
+        self.hits = 0
+        self.misses = 0
+
+    def close(self):
+        with self.lock:
+            self.conn.commit()
+            self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def lookup(self, path, st):
+        """Stored digest if the file's stat tuple still matches, else None"""
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT sha256 FROM hashes WHERE path = ? AND inode = ? AND size = ? AND mtime_ns = ?",
+                (str(path), st.st_ino, st.st_size, st.st_mtime_ns)
+            ).fetchone()
+        return row[0] if row else None
+
+    def store(self, path, st, digest):
+        if time.time_ns() - st.st_mtime_ns < RACY_WINDOW_NS:
+            return
+        # Committed at once: an open write transaction would hold the database lock until exit
+        with self.lock, self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO hashes (path, inode, size, mtime_ns, sha256) VALUES (?, ?, ?, ?, ?)",
+                (str(path), st.st_ino, st.st_size, st.st_mtime_ns, digest)
+            )
+
+    def hash_file(self, path, deep=False):
+        """SHA-256 of a file, read from the cache unless deep or the file changed"""
+        path = Path(path).resolve()
+        st = os.stat(path)
+        if not deep:
+            digest = self.lookup(path, st)
+            if digest:
+                with self.lock:
+                    self.hits += 1
+                return digest
+
+        with self.lock:
+            self.misses += 1
+        digest = sha256_file(path)
+        # Stat again: only remember the digest if nothing changed while reading
+        if os.stat(path).st_mtime_ns == st.st_mtime_ns:
+            self.store(path, st, digest)
+        return digest
+
+
+_SHARED = None
+_SHARED_LOCK = threading.Lock()
+
+
+def cached_sha256(path, deep=False):
+    """hash_file on a process-wide HashCache, closed at exit"""
+    global _SHARED
+    with _SHARED_LOCK:
+        if _SHARED is None:
+            _SHARED = HashCache()
+            atexit.register(_SHARED.close)
+    return _SHARED.hash_file(path, deep)
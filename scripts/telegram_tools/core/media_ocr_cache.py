@@ -2,61 +2,277 @@
 """OCR cache manager for Telegram media assets."""
 
 import argparse
-import hashlib
 import json
+import os
+import sqlite3
 import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from datetime import datetime
 from pathlib import Path
-from typing import Dict, Iterable, List, Optional, Tuple
-
-DEFAULT_CACHE_PATH = Path(__file__).parent.parent.parent.parent / "telegram_cache" / "media_ocr_cache.json"
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from hash_cache import cached_sha256
+
+DEFAULT_CACHE_PATH = Path(__file__).parent.parent.parent.parent / "telegram_cache" / "media_ocr_cache.sqlite3"
+LEGACY_JSON_PATH = DEFAULT_CACHE_PATH.with_suffix(".json")
+
+SCHEMA_VERSION = 1
+
+# Longest side fed to tesseract; phone screenshots keep text well above its ~20px x-height
+OCR_MAX_SIDE = 2400
+
+# Text-presence prefilter, measured on a 400px-wide grayscale copy
+PREFILTER_WIDTH = 400
+PREFILTER_EDGE_CONTRAST = 48
+PREFILTER_ROW_TRANSITIONS = 12
+PREFILTER_MIN_LINE_ROWS = 4
+NO_TEXT_VERDICT = "no_text"
+
+# OCR output is shared by every message carrying the same image (content hash + language);
+# refs map (channel, message_id) onto those results together with the local file.
+SCHEMA = """
+    CREATE TABLE IF NOT EXISTS results (
+        content_hash TEXT NOT NULL,
+        lang TEXT NOT NULL,
+        ocr_text TEXT NOT NULL,
+        error TEXT,
+        image_metadata TEXT NOT NULL,
+        updated_at TEXT NOT NULL,
+        phash TEXT,
+        verdict TEXT,
+        PRIMARY KEY (content_hash, lang)
+    );
+    CREATE TABLE IF NOT EXISTS refs (
+        channel TEXT NOT NULL,
+        message_id INTEGER NOT NULL,
+        content_hash TEXT NOT NULL,
+        lang TEXT NOT NULL,
+        file_name TEXT,
+        file_path TEXT,
+        PRIMARY KEY (channel, message_id)
+    );
+    CREATE INDEX IF NOT EXISTS refs_content_hash ON refs (content_hash);
+"""
+
+# What an upsert compares to decide whether an entry changed; timestamps and metadata are not content
+CONTENT_FIELDS = ("content_hash", "lang", "ocr_text", "error", "verdict", "phash", "file_path")
+
+ENTRY_QUERY = """
+    SELECT refs.channel, refs.message_id, refs.content_hash, refs.lang, refs.file_name, refs.file_path,
+           results.ocr_text, results.error, results.image_metadata, results.updated_at, results.phash,
+           results.verdict
+    FROM refs JOIN results USING (content_hash, lang)
+"""
 
 
 def _now_iso() -> str:
     return datetime.utcnow().isoformat() + "Z"
 
 
+def hamming_distance(a: int, b: int) -> int:
+    return bin(a ^ b).count("1")
+
+
+class BKTree:
+    """Burkhard-Keller tree over 64-bit perceptual hashes (Hamming metric)."""
+
+    def __init__(self) -> None:
+        self.root: Optional[Tuple[int, str, Dict[int, Tuple]]] = None
+        self.size = 0
+
+    def add(self, value: int, item: str) -> None:
+        self.size += 1
+        if self.root is None:
+            self.root = (value, item, {})
+            return
+        node = self.root
+        while True:
+            distance = hamming_distance(value, node[0])
+            child = node[2].get(distance)
+            if child is None:
+                node[2][distance] = (value, item, {})
+                return
+            node = child
+
+    def search(self, value: int, max_distance: int) -> List[Tuple[int, str]]:
+        """(distance, item) pairs within max_distance of value."""
+        found: List[Tuple[int, str]] = []
+        stack = [self.root] if self.root else []
+        while stack:
+            node_value, item, children = stack.pop()
+            distance = hamming_distance(value, node_value)
+            if distance <= max_distance:
+                found.append((distance, item))
+            # Triangle inequality: only subtrees at |d - k| <= max_distance can hold matches
+            for child_distance, child in children.items():
+                if distance - max_distance <= child_distance <= distance + max_distance:
+                    stack.append(child)
+        return found
+
+
+def _content(entry: Dict) -> Tuple:
+    return tuple(entry.get(field) or None for field in CONTENT_FIELDS)
+
+
+def _entry_from_row(row: Tuple) -> Dict:
+    channel, message_id, content_hash, lang, file_name, file_path, ocr_text, error, metadata, updated_at, phash, verdict = row
+    return {
+        "content_hash": content_hash,
+        "file_name": file_name,
+        "file_path": file_path,
+        "image_metadata": json.loads(metadata),
+        "ocr_text": ocr_text,
+        "error": error,
+        "lang": lang,
+        "updated_at": updated_at,
+        "phash": phash,
+        "verdict": verdict,
+        "channel": channel,
+        "message_id": message_id
+    }
+
+
 class OCRCache:
-    """Small helper around a JSON-based OCR cache."""
+    """SQLite-backed OCR cache with per-entry upserts and indexed lookups.
+
+    OCR results are stored once per (content_hash, lang) and every
+    (channel, message_id) entry references one, so the same image posted or
+    forwarded to several channels is only OCR'd once. Writes are batched into
+    a transaction that ``save`` commits.
+    """
 
     def __init__(self, cache_path: Optional[Path] = None) -> None:
-        self.cache_path = cache_path or DEFAULT_CACHE_PATH
-        self.data: Dict[str, Dict] = {"version": 1, "entries": {}}
+        self.cache_path = Path(cache_path or DEFAULT_CACHE_PATH)
+        self.cache_path.parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(str(self.cache_path))
         self.dirty = False
-        self._load()
+        self._phash_trees: Dict[str, BKTree] = {}
+        self._init_schema()
+
+    def _init_schema(self) -> None:
+        version = self.conn.execute("PRAGMA user_version").fetchone()[0]
+        if version >= SCHEMA_VERSION:
+            return
+
+        with self.conn:
+            self.conn.executescript(SCHEMA)
+            self.conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        self._migrate_json(self.cache_path.with_suffix(".json"))
 
-    def _load(self) -> None:
-        if self.cache_path.exists():
-            try:
-                self.data = json.loads(self.cache_path.read_text(encoding="utf-8"))
-            except json.JSONDecodeError as exc:
-                print(f"⚠️  Failed to read OCR cache ({exc}), starting fresh", file=sys.stderr)
-                self.data = {"version": 1, "entries": {}}
+    def _migrate_json(self, json_path: Path) -> None:
+        """One-time import of the legacy whole-file JSON cache."""
+        if not json_path.exists():
+            return
+        try:
+            entries = json.loads(json_path.read_text(encoding="utf-8")).get("entries", {})
+        except json.JSONDecodeError as exc:
+            print(f"⚠️  Failed to read legacy OCR cache ({exc}), skipping migration", file=sys.stderr)
+            return
 
-    def _key(self, channel: str, message_id: int) -> str:
-        return f"{channel}|{message_id}"
+        with self.conn:
+            for entry in entries.values():
+                if "channel" in entry and "message_id" in entry:
+                    self._write(entry["channel"], entry["message_id"], entry)
+        print(f"📦 Migrated {len(entries)} OCR entries from {json_path.name}", file=sys.stderr)
+
+    def _write(self, channel: str, message_id: int, payload: Dict) -> None:
+        content_hash = payload.get("content_hash")
+        if not content_hash:
+            return
+        lang = payload.get("lang") or ""
+        self.conn.execute(
+            "INSERT OR REPLACE INTO results (content_hash, lang, ocr_text, error, image_metadata, updated_at, phash, verdict) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (content_hash, lang, payload.get("ocr_text") or "", payload.get("error"),
+             json.dumps(payload.get("image_metadata") or {}, ensure_ascii=False), payload.get("updated_at") or _now_iso(),
+             payload.get("phash"), payload.get("verdict"))
+        )
+        if payload.get("phash") and lang in self._phash_trees:
+            self._phash_trees[lang].add(int(payload["phash"], 16), content_hash)
+        self._link(channel, message_id, content_hash, lang, payload.get("file_path"))
+
+    def _link(self, channel: str, message_id: int, content_hash: str, lang: str, file_path: Optional[str]) -> None:
+        self.conn.execute(
+            "INSERT OR REPLACE INTO refs (channel, message_id, content_hash, lang, file_name, file_path) VALUES (?, ?, ?, ?, ?, ?)",
+            (channel, message_id, content_hash, lang, Path(file_path).name if file_path else None, file_path)
+        )
+
+    def close(self) -> None:
+        self.save()
+        self.conn.close()
 
     def get_entry(self, channel: str, message_id: int) -> Optional[Dict]:
-        return self.data.get("entries", {}).get(self._key(channel, message_id))
+        row = self.conn.execute(
+            ENTRY_QUERY + " WHERE refs.channel = ? AND refs.message_id = ?", (channel, message_id)
+        ).fetchone()
+        return _entry_from_row(row) if row else None
+
+    def get_result(self, content_hash: str, lang: str) -> Optional[Dict]:
+        """Shared OCR result for an image, whichever message it was first seen in."""
+        row = self.conn.execute(
+            "SELECT ocr_text, error, image_metadata, updated_at, verdict FROM results WHERE content_hash = ? AND lang = ?",
+            (content_hash, lang)
+        ).fetchone()
+        if not row:
+            return None
+        ocr_text, error, metadata, updated_at, verdict = row
+        return {
+            "content_hash": content_hash,
+            "lang": lang,
+            "ocr_text": ocr_text,
+            "error": error,
+            "image_metadata": json.loads(metadata),
+            "updated_at": updated_at,
+            "verdict": verdict
+        }
+
+    def find_similar(self, phash: str, lang: str, max_distance: int) -> Optional[Dict]:
+        """Closest OCR result whose perceptual hash is within max_distance bits."""
+        tree = self._phash_trees.get(lang)
+        if tree is None:
+            # Only the 64-bit hashes are loaded; OCR text is fetched for the match alone
+            tree = self._phash_trees[lang] = BKTree()
+            rows = self.conn.execute("SELECT phash, content_hash FROM results WHERE lang = ? AND phash IS NOT NULL", (lang,))
+            for value, content_hash in rows:
+                tree.add(int(value, 16), content_hash)
+
+        matches = tree.search(int(phash, 16), max_distance)
+        if not matches:
+            return None
+        distance, content_hash = min(matches)
+        result = self.get_result(content_hash, lang)
+        if result:
+            result["distance"] = distance
+        return result
+
+    def find_by_hash(self, content_hash: str) -> List[Dict]:
+        """All entries (any channel) referencing an image content hash."""
+        rows = self.conn.execute(ENTRY_QUERY + " WHERE refs.content_hash = ?", (content_hash,))
+        return [_entry_from_row(row) for row in rows]
 
     def upsert_entry(self, channel: str, message_id: int, payload: Dict) -> bool:
-        entries = self.data.setdefault("entries", {})
-        key = self._key(channel, message_id)
-        existing = entries.get(key)
-        if existing == payload:
+        """Write an entry unless its content matches what is stored; returns whether it was written."""
+        existing = self.get_entry(channel, message_id)
+        # A re-run stamps a new updated_at, so only the OCR content decides; "" is stored for missing text
+        if existing and _content(existing) == _content(payload):
+            return False
+        self._write(channel, message_id, payload)
+        self.dirty = True
+        return True
+
+    def link_entry(self, channel: str, message_id: int, content_hash: str, lang: str, file_path: Optional[str]) -> bool:
+        """Point a message at an existing shared result without touching the result."""
+        existing = self.get_entry(channel, message_id)
+        if existing and (existing["content_hash"], existing["lang"], existing["file_path"]) == (content_hash, lang, file_path):
             return False
-        payload = dict(payload)
-        payload["channel"] = channel
-        payload["message_id"] = message_id
-        entries[key] = payload
+        self._link(channel, message_id, content_hash, lang, file_path)
         self.dirty = True
         return True
 
     def save(self) -> None:
         if not self.dirty:
             return
-        self.cache_path.parent.mkdir(parents=True, exist_ok=True)
-        self.cache_path.write_text(json.dumps(self.data, ensure_ascii=False, indent=2), encoding="utf-8")
+        self.conn.commit()
         self.dirty = False
 
 
@@ -107,39 +323,190 @@ def is_image_file(path: Path) -> bool:
     return path.suffix.lower() in {".png", ".jpg", ".jpeg", ".webp", ".bmp", ".gif", ".tiff"}
 
 
-def compute_hash(path: Path) -> str:
-    digest = hashlib.sha256()
-    with path.open("rb") as fh:
-        for chunk in iter(lambda: fh.read(8192), b""):
-            digest.update(chunk)
-    return digest.hexdigest()
+def compute_hash(path: Path, deep: bool = False) -> str:
+    """SHA-256 of a media file, reused from the stat-keyed hash cache unless deep."""
+    return cached_sha256(path, deep)
+
+
+def perceptual_hash(gray: object) -> str:
+    """64-bit difference hash (dHash) of a grayscale image as hex; stable across recompression and resizing."""
+    from PIL import Image
+
+    pixels = list(gray.resize((9, 8), Image.LANCZOS).getdata())
+    value = 0
+    for row in range(8):
+        for col in range(8):
+            left = pixels[row * 9 + col]
+            value = (value << 1) | (left > pixels[row * 9 + col + 1])
+    return f"{value:016x}"
+
+
+def otsu_threshold(histogram: List[int]) -> int:
+    """Grey level that best separates a 256-bin histogram into two classes."""
+    total = sum(histogram)
+    weighted_total = sum(level * count for level, count in enumerate(histogram))
+    background = weighted_background = 0
+    best_level, best_variance = 127, -1.0
+    for level, count in enumerate(histogram):
+        background += count
+        if not background:
+            continue
+        foreground = total - background
+        if not foreground:
+            break
+        weighted_background += level * count
+        mean_background = weighted_background / background
+        mean_foreground = (weighted_total - weighted_background) / foreground
+        variance = background * foreground * (mean_background - mean_foreground) ** 2
+        if variance > best_variance:
+            best_level, best_variance = level, variance
+    return best_level
 
 
-def image_metadata(path: Path) -> Dict:
+def load_grayscale(path: Path) -> Tuple[Optional[object], Dict, Optional[str]]:
+    """Open an image once; returns (grayscale image capped at OCR_MAX_SIDE, metadata, error)."""
     try:
         from PIL import Image
     except ImportError:
-        return {}
+        return None, {}, "Pillow not installed"
 
     try:
         with Image.open(path) as img:
-            width, height = img.size
-            fmt = img.format
-        return {"width": width, "height": height, "format": fmt}
-    except Exception:
-        return {}
+            metadata = {"width": img.width, "height": img.height, "format": img.format}
+            # JPEG can decode straight at a reduced scale, skipping most of the full-size work
+            img.draft("L", (OCR_MAX_SIDE, OCR_MAX_SIDE))
+            gray = img.convert("L")
+    except Exception as exc:
+        return None, {}, str(exc)
+
+    if max(gray.size) > OCR_MAX_SIDE:
+        gray.thumbnail((OCR_MAX_SIDE, OCR_MAX_SIDE), Image.LANCZOS)
+    return gray, metadata, None
+
+
+def binarize_for_ocr(gray: object) -> object:
+    """Dark-on-light, Otsu-thresholded bitmap of a grayscale image."""
+    from PIL import ImageOps
+
+    histogram = gray.histogram()
+    pixels = sum(histogram) or 1
+    if sum(level * count for level, count in enumerate(histogram)) / pixels < 128:
+        # Dark-mode screenshot: tesseract expects dark text on a light background
+        gray = ImageOps.invert(gray)
+        histogram = histogram[::-1]
+
+    threshold = otsu_threshold(histogram)
+    return gray.point([255 if level > threshold else 0 for level in range(256)], "1")
+
+
+def preprocess_image(path: Path) -> Tuple[Optional[object], Dict, Optional[str]]:
+    """Open an image once and prepare it for OCR.
+
+    Returns (bitmap, metadata, error). Metadata describes the original file;
+    the bitmap is downscaled to at most OCR_MAX_SIDE pixels, converted to
+    grayscale, flipped to dark-on-light and Otsu-binarized, and can be fed to
+    several OCR passes (language fallback) without touching the file again.
+    """
+    gray, metadata, error = load_grayscale(path)
+    if gray is None:
+        return None, metadata, error
+    return binarize_for_ocr(gray), metadata, None
+
 
+def prefilter_copy(gray: object) -> object:
+    """PREFILTER_WIDTH-wide copy of a grayscale image, shared by the text check and the perceptual hash."""
+    height = max(1, round(gray.height * PREFILTER_WIDTH / gray.width))
+    return gray.resize((PREFILTER_WIDTH, height))
 
-def perform_ocr(path: Path, lang: str) -> Tuple[Optional[str], Optional[str]]:
+
+def likely_contains_text(small: object) -> Optional[bool]:
+    """Cheap text-presence check on a prefilter_copy; None when NumPy is unavailable.
+
+    At a fixed 400px width, a line of glyphs produces rows with many sharp
+    horizontal intensity transitions, stacked several rows high. Photos and
+    smooth graphics rarely do, so an image without such a band is classified
+    as having no text. Busy textures err on the side of running OCR.
+    """
     try:
-        from PIL import Image
+        import numpy as np
     except ImportError:
-        return None, "Pillow not installed"
+        return None
 
-    try:
+    pixels = np.asarray(small, dtype=np.int16)
+
+    strong = np.abs(np.diff(pixels, axis=1)) > PREFILTER_EDGE_CONTRAST
+    text_rows = (strong.sum(axis=1) >= PREFILTER_ROW_TRANSITIONS).astype(np.int8)
+
+    # Longest run of consecutive text-like rows
+    bounds = np.flatnonzero(np.diff(np.concatenate(([0], text_rows, [0]))))
+    runs = bounds[1::2] - bounds[::2]
+    return bool(runs.size and runs.max() >= PREFILTER_MIN_LINE_ROWS)
+
+
+class PytesseractBackend:
+    """Runs the tesseract CLI per call; always available when pytesseract is installed."""
+
+    name = "pytesseract"
+
+    def __init__(self) -> None:
         import pytesseract
-    except ImportError:
-        return None, "pytesseract not installed"
+        self._pytesseract = pytesseract
+
+    def recognize(self, image: object, lang: str) -> str:
+        return self._pytesseract.image_to_string(image, lang=lang)
+
+
+class TesserocrBackend:
+    """In-process libtesseract; one warm engine per language set, reused across images."""
+
+    name = "tesserocr"
+
+    def __init__(self) -> None:
+        import tesserocr
+        self._tesserocr = tesserocr
+        self._engines: Dict[str, object] = {}
+
+    def recognize(self, image: object, lang: str) -> str:
+        engine = self._engines.get(lang)
+        if engine is None:
+            # Loading traineddata is the expensive part, so it happens once per worker and language
+            engine = self._engines[lang] = self._tesserocr.PyTessBaseAPI(lang=lang)
+        engine.SetImage(image)
+        return engine.GetUTF8Text()
+
+
+OCR_BACKENDS = {"tesserocr": TesserocrBackend, "pytesseract": PytesseractBackend}
+
+# Per-process backend instances: pool workers keep their engines warm between jobs
+_BACKENDS: Dict[str, object] = {}
+
+
+def get_backend(name: str = "auto") -> Tuple[Optional[object], Optional[str]]:
+    """Return (backend, error); "auto" and an unavailable tesserocr fall back to pytesseract."""
+    if name in _BACKENDS:
+        return _BACKENDS[name], None
+
+    candidates = ["tesserocr", "pytesseract"] if name in ("auto", "tesserocr") else [name]
+    errors = []
+    for candidate in candidates:
+        try:
+            backend = OCR_BACKENDS[candidate]()
+        except KeyError:
+            errors.append(f"unknown OCR backend {candidate}")
+            continue
+        except ImportError:
+            errors.append(f"{candidate} not installed")
+            continue
+        _BACKENDS[name] = backend
+        return backend, None
+    return None, ", ".join(errors)
+
+
+def ocr_image(image: object, lang: str, backend: str = "auto") -> Tuple[Optional[str], Optional[str]]:
+    """OCR a prepared bitmap, retrying in English if the requested languages fail."""
+    engine, error = get_backend(backend)
+    if engine is None:
+        return None, error
 
     langs_to_try = [lang]
     if lang != "eng":
@@ -148,18 +515,94 @@ def perform_ocr(path: Path, lang: str) -> Tuple[Optional[str], Optional[str]]:
     last_error: Optional[str] = None
     for candidate in langs_to_try:
         try:
-            with Image.open(path) as img:
-                text = pytesseract.image_to_string(img, lang=candidate)
+            text = engine.recognize(image, candidate)
             return text.strip(), None
         except Exception as exc:
             last_error = str(exc)
     return None, last_error or "Unknown OCR error"
 
 
-def process_media(channel: str, messages: Iterable[Dict], cache: OCRCache, *, refresh: bool, lang: str, limit: Optional[int] = None) -> List[Dict]:
-    results: List[Dict] = []
+def perform_ocr(path: Path, lang: str, backend: str = "auto") -> Tuple[Optional[str], Optional[str]]:
+    image, _, error = preprocess_image(path)
+    if image is None:
+        return None, error
+    return ocr_image(image, lang, backend)
+
+
+# OCR cache handles for near-duplicate lookups, keyed by path and tagged with the owning pid:
+# in-process jobs use the caller's live cache, pool workers open their own read-only handle
+_SIMILAR_CACHES: Dict[str, Tuple[int, OCRCache]] = {}
+
+
+def _find_similar(job: Dict, phash: str) -> Optional[Dict]:
+    """Usable OCR result of a near-duplicate image, looked up from the worker."""
+    pid, cache = _SIMILAR_CACHES.get(job["cache_path"], (None, None))
+    if pid != os.getpid():
+        cache = OCRCache(Path(job["cache_path"]))
+        _SIMILAR_CACHES[job["cache_path"]] = (os.getpid(), cache)
+    similar = cache.find_similar(phash, job["lang"], job["phash_distance"])
+    # Images set aside by the prefilter are OCR'd for real once it is switched off
+    if similar and (job["prefilter"] or similar.get("verdict") != NO_TEXT_VERDICT):
+        return similar
+    return None
+
+
+def _ocr_job(job: Dict) -> Tuple[str, Dict]:
+    """Run OCR for one image; executed in a worker process when --jobs > 1."""
+    gray, metadata, error = load_grayscale(Path(job["file_path"]))
+    text = verdict = phash = similar = None
+    if gray is not None:
+        # The image is decoded once; the hash and the prefilter share one small copy of it.
+        # The hash is always stored so near-duplicate matching can be switched on later.
+        small = prefilter_copy(gray)
+        phash = perceptual_hash(small)
+        if job["phash_distance"] > 0 and not job["refresh"]:
+            # Recompressed/resized copy of an image OCR'd before: reuse its text under this hash
+            similar = _find_similar(job, phash)
+        if similar:
+            text, error, verdict = similar["ocr_text"], similar["error"], similar["verdict"]
+        elif job["prefilter"] and likely_contains_text(small) is False:
+            verdict = NO_TEXT_VERDICT
+        else:
+            text, error = ocr_image(binarize_for_ocr(gray), job["lang"], job["backend"])
+    result = {
+        "content_hash": job["content_hash"],
+        "image_metadata": metadata,
+        "ocr_text": text or "",
+        "error": error,
+        "lang": job["lang"],
+        "updated_at": _now_iso(),
+        "phash": phash,
+        "verdict": verdict
+    }
+    if similar:
+        result["similar"] = f"distance {similar['distance']} to {similar['content_hash'][:12]}"
+    return job["content_hash"], result
+
+
+def _run_ocr_jobs(jobs: List[Dict], workers: int) -> Iterator[Tuple[str, Dict]]:
+    """Yield (content_hash, result) as OCR finishes, in completion order."""
+    if workers <= 1 or len(jobs) <= 1:
+        for job in jobs:
+            yield _ocr_job(job)
+        return
+
+    with ProcessPoolExecutor(max_workers=min(workers, len(jobs))) as pool:
+        futures = [pool.submit(_ocr_job, job) for job in jobs]
+        for future in as_completed(futures):
+            yield future.result()
+
+
+def process_media(channel: str, messages: Iterable[Dict], cache: OCRCache, *, refresh: bool, lang: str, limit: Optional[int] = None, jobs: int = 1, phash_distance: int = 0, backend: str = "auto", prefilter: bool = True) -> List[Dict]:
+    results: List[Optional[Dict]] = []
+    # One OCR job per distinct image; every message slot showing it is filled from that result
+    pending: Dict[str, Dict] = {}
     processed = 0
 
+    def usable(cached: Dict) -> bool:
+        # Images set aside by the prefilter are OCR'd for real once it is switched off
+        return prefilter or cached.get("verdict") != NO_TEXT_VERDICT
+
     for message in messages:
         if limit is not None and processed >= limit:
             break
@@ -188,7 +631,7 @@ def process_media(channel: str, messages: Iterable[Dict], cache: OCRCache, *, re
 
         content_hash = media.get("content_hash") or compute_hash(media_path)
         existing = cache.get_entry(channel, message["id"])
-        if existing and existing.get("content_hash") == content_hash and not refresh:
+        if existing and existing.get("content_hash") == content_hash and not refresh and usable(existing):
             results.append({
                 "message_id": message["id"],
                 "status": "cache_hit",
@@ -199,28 +642,70 @@ def process_media(channel: str, messages: Iterable[Dict], cache: OCRCache, *, re
             processed += 1
             continue
 
-        text, error = perform_ocr(media_path, lang)
-        meta = image_metadata(media_path)
-        payload = {
-            "content_hash": content_hash,
-            "file_name": media_path.name,
-            "file_path": str(media_path),
-            "image_metadata": meta,
-            "ocr_text": text or "",
-            "error": error,
-            "lang": lang,
-            "updated_at": _now_iso()
-        }
-        changed = cache.upsert_entry(channel, message["id"], payload)
-        results.append({
-            "message_id": message["id"],
-            "status": "updated" if changed else "no_change",
-            "ocr_text": text or "",
-            "error": error,
-            "file": file_path
-        })
+        # Same image already OCR'd for another message or channel
+        shared = None if refresh else cache.get_result(content_hash, lang)
+        if shared and usable(shared):
+            cache.link_entry(channel, message["id"], content_hash, lang, file_path)
+            results.append({
+                "message_id": message["id"],
+                "status": "shared_hit",
+                "ocr_text": shared["ocr_text"],
+                "error": shared["error"],
+                "file": file_path
+            })
+            processed += 1
+            continue
+
+        # Reserve the result slot so output keeps message order whatever the completion order
+        if content_hash not in pending:
+            pending[content_hash] = {
+                "content_hash": content_hash,
+                "file_path": file_path,
+                "lang": lang,
+                "backend": backend,
+                "prefilter": prefilter,
+                "refresh": refresh,
+                "phash_distance": phash_distance,
+                "cache_path": str(cache.cache_path),
+                "targets": []
+            }
+        pending[content_hash]["targets"].append((len(results), message["id"], file_path))
+        results.append(None)
         processed += 1
 
+    if pending:
+        if phash_distance > 0:
+            # In-process jobs see results written moments ago, so near-duplicates later in the
+            # same run are matched; pool workers only see results committed before the run
+            _SIMILAR_CACHES[str(cache.cache_path)] = (os.getpid(), cache)
+        started = time.perf_counter()
+        skipped = 0
+        # Workers only OCR; the cache is updated here so only one process ever writes it
+        for content_hash, result in _run_ocr_jobs(list(pending.values()), jobs):
+            similar = result.pop("similar", None)
+            no_text = result["verdict"] == NO_TEXT_VERDICT and not similar
+            skipped += no_text
+            for slot, message_id, file_path in pending[content_hash]["targets"]:
+                payload = dict(result, file_name=Path(file_path).name, file_path=file_path)
+                changed = cache.upsert_entry(channel, message_id, payload)
+                if similar:
+                    status = "similar_hit"
+                else:
+                    status = "no_text" if no_text else ("updated" if changed else "no_change")
+                results[slot] = {
+                    "message_id": message_id,
+                    "status": status,
+                    "ocr_text": result["ocr_text"],
+                    "error": result["error"],
+                    "file": file_path
+                }
+                if similar:
+                    results[slot]["detail"] = similar
+        elapsed = time.perf_counter() - started
+        rate = len(pending) / elapsed if elapsed > 0 else float(len(pending))
+        print(f"⚡ Processed {len(pending)} images in {elapsed:.1f}s ({rate:.2f} images/s, jobs: {max(1, jobs)}, backend: {backend})"
+              + (f", {skipped} skipped as no-text" if skipped else ""))
+
     cache.save()
     return results
 
@@ -233,6 +718,13 @@ def main(argv: Optional[List[str]] = None) -> int:
     parser.add_argument("--lang", default="rus+eng", help="Tesseract language codes (default: rus+eng, fallback to eng)")
     parser.add_argument("--limit", type=int, help="Process at most N media messages")
     parser.add_argument("--display", action="store_true", help="Print cached OCR text after processing")
+    parser.add_argument("--jobs", type=int, default=1, help="OCR worker processes (0 = one per CPU, default: 1)")
+    parser.add_argument("--backend", choices=["auto", *OCR_BACKENDS], default="auto",
+                        help="OCR engine: tesserocr keeps models loaded per worker (default: auto, falls back to pytesseract)")
+    parser.add_argument("--no-prefilter", action="store_true",
+                        help="OCR every image, including ones the text-presence prefilter marked as no-text")
+    parser.add_argument("--phash-distance", type=int, default=0,
+                        help="Reuse OCR of images whose perceptual hash differs by at most N bits (0 = exact matches only)")
     args = parser.parse_args(argv)
 
     channel = args.channel if args.channel.startswith('@') else f"@{args.channel}"
@@ -248,16 +740,26 @@ def main(argv: Optional[List[str]] = None) -> int:
         print("📭 No media messages found for the selected filter")
         return 0
 
+    engine, backend_error = get_backend(args.backend)
+    if engine is None:
+        print(f"⚠️  No OCR backend available ({backend_error}); errors will be cached for a later --refresh")
+    elif engine.name != args.backend and args.backend != "auto":
+        print(f"⚠️  {args.backend} unavailable, using {engine.name}")
+
     cache = OCRCache()
-    results = process_media(channel, media_messages, cache, refresh=args.refresh, lang=args.lang, limit=args.limit)
+    jobs = args.jobs if args.jobs > 0 else (os.cpu_count() or 1)
+    results = process_media(channel, media_messages, cache, refresh=args.refresh, lang=args.lang, limit=args.limit, jobs=jobs, phash_distance=args.phash_distance, backend=args.backend, prefilter=not args.no_prefilter)
 
     hits = sum(1 for r in results if r["status"] == "cache_hit")
+    shared = sum(1 for r in results if r["status"] == "shared_hit")
+    similar = sum(1 for r in results if r["status"] == "similar_hit")
     updated = sum(1 for r in results if r["status"] == "updated")
+    no_text = sum(1 for r in results if r["status"] == "no_text")
     unsupported = sum(1 for r in results if r["status"] == "unsupported")
     missing = sum(1 for r in results if r["status"] == "missing_file")
     errors = sum(1 for r in results if r.get("error"))
 
-    print(f"🧾 Media messages processed: {len(results)} (cache hits: {hits}, updated: {updated}, unsupported: {unsupported}, missing files: {missing})")
+    print(f"🧾 Media messages processed: {len(results)} (cache hits: {hits}, shared: {shared}, near-duplicates: {similar}, updated: {updated}, no text: {no_text}, unsupported: {unsupported}, missing files: {missing})")
     if errors:
         print(f"⚠️  {errors} messages have OCR errors (run with --refresh after installing dependencies)")
 
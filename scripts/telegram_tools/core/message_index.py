@@ -0,0 +1,310 @@
+#!/usr/bin/env python3
+"""
+Message Index - Constant-time message lookup by id
+Maps (channel, message id) → (cache file, byte offset, length) in SQLite
+"""
+
+import codecs
+import json
+import sqlite3
+import sys
+from pathlib import Path
+
+DEFAULT_BASE_DIR = Path(__file__).parent.parent.parent.parent / "telegram_cache"
+
+_DECODER = json.JSONDecoder()
+_WHITESPACE = ' \t\n\r'
+CHUNK_SIZE = 1 << 20
+
+
+def _skip_ws(text, pos):
+    while pos < len(text) and text[pos] in _WHITESPACE:
+        pos += 1
+    return pos
+
+
+class _ChunkedJSON:
+    """Sliding text window over a UTF-8 JSON file that knows the byte offset of any position in it"""
+
+    def __init__(self, handle):
+        self.handle = handle
+        self.decoder = codecs.getincrementaldecoder('utf-8')()
+        self.text = ''
+        self.pos = 0
+        self.eof = False
+        # Byte offset in the file of text[mark], advanced lazily as positions are asked for
+        self.mark, self.mark_byte = 0, 0
+
+    def byte_offset(self, pos):
+        self.mark_byte += len(self.text[self.mark:pos].encode('utf-8'))
+        self.mark = pos
+        return self.mark_byte
+
+    def _fill(self):
+        if self.eof:
+            raise ValueError(f"unexpected end of {self.handle.name}")
+        # Drop consumed text first so the window stays around one chunk
+        self.byte_offset(self.pos)
+        self.text, self.pos, self.mark = self.text[self.pos:], 0, 0
+        chunk = self.handle.read(CHUNK_SIZE)
+        self.eof = not chunk
+        self.text += self.decoder.decode(chunk, final=self.eof)
+
+    def peek(self):
+        """Next non-whitespace character, reading ahead as needed"""
+        while True:
+            self.pos = _skip_ws(self.text, self.pos)
+            if self.pos < len(self.text):
+                return self.text[self.pos]
+            self._fill()
+
+    def decode(self):
+        """Decode the next value, returning it with its start and end positions"""
+        self.peek()
+        while True:
+            try:
+                value, end = _DECODER.raw_decode(self.text, self.pos)
+                # A value touching the window edge may be a truncated number
+                if end < len(self.text) or self.eof:
+                    break
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+            self._fill()
+        start, self.pos = self.pos, end
+        return value, start, end
+
+
+def scan_message_offsets(cache_file):
+    """Yield (message_id, byte_offset, byte_length) for every message in a cache file
+
+    Walks the top-level object with raw_decode so message texts that happen to
+    contain JSON-looking strings cannot confuse the scan. The file is read in
+    CHUNK_SIZE pieces, so memory stays flat however large the cache grows.
+    """
+    with open(cache_file, 'rb') as handle:
+        reader = _ChunkedJSON(handle)
+        if reader.peek() != '{':
+            raise ValueError(f"{cache_file} is not a JSON object")
+        reader.pos += 1
+
+        while True:
+            if reader.peek() == '}':
+                return
+            key, _, _ = reader.decode()
+            reader.peek()
+            reader.pos += 1  # ':'
+
+            if key != 'messages':
+                reader.decode()
+                if reader.peek() == ',':
+                    reader.pos += 1
+                continue
+
+            reader.peek()
+            reader.pos += 1  # '['
+            while True:
+                if reader.peek() == ']':
+                    return
+                message, start, end = reader.decode()
+                offset = reader.byte_offset(start)
+                length = reader.byte_offset(end) - offset
+                yield message['id'], offset, length
+
+                if reader.peek() == ',':
+                    reader.pos += 1
+
+
+class MessageIndex:
+    """SQLite-backed id → location index over a channel's cache files"""
+
+    def __init__(self, base_dir=None):
+        self.base_dir = Path(base_dir) if base_dir else DEFAULT_BASE_DIR
+        self.base_dir.mkdir(parents=True, exist_ok=True)
+        self.db_path = self.base_dir / "message_index.sqlite3"
+        self.conn = sqlite3.connect(str(self.db_path))
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS files (
+                channel TEXT NOT NULL,
+                file_name TEXT NOT NULL,
+                mtime_ns INTEGER NOT NULL,
+                size INTEGER NOT NULL,
+                PRIMARY KEY (channel, file_name)
+            );
+            CREATE TABLE IF NOT EXISTS messages (
+                channel TEXT NOT NULL,
+                message_id INTEGER NOT NULL,
+                file_name TEXT NOT NULL,
+                mtime_ns INTEGER NOT NULL,
+                offset INTEGER NOT NULL,
+                length INTEGER NOT NULL,
+                PRIMARY KEY (channel, message_id)
+            );
+        """)
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    @staticmethod
+    def _clean(channel):
+        return channel.replace('@', '').replace('/', '_')
+
+    def index_file(self, channel, cache_file):
+        """(Re)index one cache file; newer files win for ids present in several"""
+        clean_channel = self._clean(channel)
+        cache_file = Path(cache_file)
+        stat = cache_file.stat()
+
+        with self.conn:
+            self.conn.execute(
+                "DELETE FROM messages WHERE channel = ? AND file_name = ?",
+                (clean_channel, cache_file.name)
+            )
+            self.conn.executemany(
+                """INSERT INTO messages (channel, message_id, file_name, mtime_ns, offset, length)
+                   VALUES (?, ?, ?, ?, ?, ?)
+                   ON CONFLICT (channel, message_id) DO UPDATE SET
+                       file_name = excluded.file_name, mtime_ns = excluded.mtime_ns,
+                       offset = excluded.offset, length = excluded.length
+                   WHERE excluded.mtime_ns >= messages.mtime_ns""",
+                ((clean_channel, message_id, cache_file.name, stat.st_mtime_ns, offset, length)
+                 for message_id, offset, length in scan_message_offsets(cache_file))
+            )
+            self.conn.execute(
+                "INSERT OR REPLACE INTO files (channel, file_name, mtime_ns, size) VALUES (?, ?, ?, ?)",
+                (clean_channel, cache_file.name, stat.st_mtime_ns, stat.st_size)
+            )
+
+    def refresh(self, channel):
+        """Index new or rewritten cache files and forget deleted ones"""
+        clean_channel = self._clean(channel)
+        known = {
+            name: (mtime_ns, size) for name, mtime_ns, size in self.conn.execute(
+                "SELECT file_name, mtime_ns, size FROM files WHERE channel = ?", (clean_channel,)
+            )
+        }
+
+        present = sorted(self.base_dir.glob(f"{clean_channel}_*.json"), key=lambda p: p.stat().st_mtime_ns)
+        removed = set(known) - {p.name for p in present}
+
+        if removed:
+            with self.conn:
+                for name in removed:
+                    self.conn.execute("DELETE FROM files WHERE channel = ? AND file_name = ?", (clean_channel, name))
+                    self.conn.execute("DELETE FROM messages WHERE channel = ? AND file_name = ?", (clean_channel, name))
+            # Ids that only lived in deleted files may still exist in older ones
+            stale = present
+        else:
+            stale = [
+                p for p in present
+                if known.get(p.name) != (p.stat().st_mtime_ns, p.stat().st_size)
+            ]
+
+        for cache_file in stale:
+            self.index_file(channel, cache_file)
+        return len(stale)
+
+    def iter_file_messages(self, channel, cache_file, newest_first=True):
+        """Stream one cache file's messages via their stored offsets, never loading the whole file
+
+        Cache files are newest first; newest_first=False walks them backwards.
+        Only the (offset, length) pairs are held in memory.
+        """
+        clean_channel = self._clean(channel)
+        cache_file = Path(cache_file)
+        stat = cache_file.stat()
+        known = self.conn.execute(
+            "SELECT mtime_ns, size FROM files WHERE channel = ? AND file_name = ?",
+            (clean_channel, cache_file.name)
+        ).fetchone()
+        if known != (stat.st_mtime_ns, stat.st_size):
+            self.index_file(channel, cache_file)
+
+        # Fetched up front so no read cursor stays open while other indexes write
+        rows = self.conn.execute(
+            f"""SELECT offset, length FROM messages WHERE channel = ? AND file_name = ?
+                ORDER BY offset {'ASC' if newest_first else 'DESC'}""",
+            (clean_channel, cache_file.name)
+        ).fetchall()
+        with open(cache_file, 'rb') as f:
+            for offset, length in rows:
+                f.seek(offset)
+                yield json.loads(f.read(length).decode('utf-8'))
+
+    def get_messages(self, channel, message_ids):
+        """Return the requested messages (in request order); unknown ids are skipped"""
+        clean_channel = self._clean(channel)
+        found = []
+        for message_id in message_ids:
+            row = self.conn.execute(
+                "SELECT file_name, offset, length FROM messages WHERE channel = ? AND message_id = ?",
+                (clean_channel, message_id)
+            ).fetchone()
+            if not row:
+                continue
+
+            file_name, offset, length = row
+            with open(self.base_dir / file_name, 'rb') as f:
+                f.seek(offset)
+                found.append(json.loads(f.read(length).decode('utf-8')))
+        return found
+
+
+def main():
+    if len(sys.argv) < 3:
+        print("""
+Message Index - Constant-time message lookup by id
+
+Usage:
+  python message_index.py get <channel> <message_id> [message_id...]
+  python message_index.py rebuild <channel>
+
+Examples:
+  python message_index.py get @aiclubsweggs 72856
+  python message_index.py get @aiclubsweggs 72856 72857 | jq -r '.[].text'
+  python message_index.py rebuild @aiclubsweggs
+        """)
+        sys.exit(1)
+
+    command = sys.argv[1]
+    channel = sys.argv[2]
+    if not channel.startswith('@'):
+        channel = f'@{channel}'
+
+    with MessageIndex() as index:
+        if command == "get":
+            if len(sys.argv) < 4:
+                print("Error: get requires at least one message_id", file=sys.stderr)
+                sys.exit(1)
+
+            message_ids = [int(arg) for arg in sys.argv[3:]]
+            index.refresh(channel)
+            messages = index.get_messages(channel, message_ids)
+
+            print(json.dumps(messages, indent=2, ensure_ascii=False))
+            missing = set(message_ids) - {msg['id'] for msg in messages}
+            if missing:
+                print(f"❌ Not in cache: {', '.join(str(m) for m in sorted(missing))}", file=sys.stderr)
+                sys.exit(1)
+
+        elif command == "rebuild":
+            with index.conn:
+                clean_channel = index._clean(channel)
+                index.conn.execute("DELETE FROM files WHERE channel = ?", (clean_channel,))
+                index.conn.execute("DELETE FROM messages WHERE channel = ?", (clean_channel,))
+            indexed = index.refresh(channel)
+            print(f"✅ Indexed {indexed} cache files for {channel}")
+
+        else:
+            print(f"Unknown command: {command}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,248 @@
+#!/usr/bin/env python3
+"""
+OCR Queue - Persistent background OCR for downloaded media
+Fetches enqueue new images; a single background drainer OCRs them by priority
+"""
+
+import fcntl
+import os
+import sqlite3
+import subprocess
+import sys
+from datetime import datetime
+from itertools import groupby
+from pathlib import Path
+
+DEFAULT_BASE_DIR = Path(__file__).parent.parent.parent.parent / "telegram_cache"
+
+# Higher runs first: today's messages are what `read` is about to show
+PRIORITY_RECENT = 20
+PRIORITY_BORDER = 10
+PRIORITY_BACKFILL = 0
+
+CLAIM_BATCH = 32
+
+# An image that keeps failing (or keeps killing the drainer) is given up on after this many tries
+MAX_ATTEMPTS = 3
+
+
+class OCRQueue:
+    """SQLite work queue of (channel, message_id) images waiting for OCR"""
+
+    def __init__(self, base_dir=None):
+        self.base_dir = Path(base_dir) if base_dir else DEFAULT_BASE_DIR
+        self.base_dir.mkdir(parents=True, exist_ok=True)
+        self.db_path = self.base_dir / "ocr_queue.sqlite3"
+        self.lock_path = self.base_dir / "ocr_queue.lock"
+        self.conn = sqlite3.connect(str(self.db_path), timeout=30)
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS jobs (
+                channel TEXT NOT NULL,
+                message_id INTEGER NOT NULL,
+                file_path TEXT NOT NULL,
+                content_hash TEXT,
+                priority INTEGER NOT NULL,
+                status TEXT NOT NULL,
+                enqueued_at TEXT NOT NULL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                error TEXT,
+                PRIMARY KEY (channel, message_id)
+            );
+            CREATE INDEX IF NOT EXISTS jobs_pending ON jobs (status, priority DESC, enqueued_at);
+        """)
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def enqueue(self, channel, messages, priority=PRIORITY_BACKFILL):
+        """Queue messages that carry a downloaded file; returns how many were (re)queued
+
+        A message already done for the same content hash is left alone; anything
+        else is (re)set to pending, keeping the higher of the two priorities.
+        """
+        queued = 0
+        with self.conn:
+            for msg in messages:
+                media = msg.get('media_info') or {}
+                if not media.get('file_path'):
+                    continue
+                cursor = self.conn.execute(
+                    """INSERT INTO jobs (channel, message_id, file_path, content_hash, priority, status, enqueued_at)
+                       VALUES (?, ?, ?, ?, ?, 'pending', ?)
+                       ON CONFLICT (channel, message_id) DO UPDATE SET
+                           file_path = excluded.file_path, content_hash = excluded.content_hash,
+                           priority = MAX(jobs.priority, excluded.priority),
+                           status = 'pending', attempts = 0, error = NULL
+                       WHERE jobs.status != 'done' OR jobs.content_hash IS NOT excluded.content_hash""",
+                    (channel, msg['id'], media['file_path'], media.get('content_hash'), priority,
+                     datetime.now().isoformat())
+                )
+                queued += cursor.rowcount
+        return queued
+
+    def claim(self, limit=CLAIM_BATCH):
+        """Mark the highest-priority pending jobs as running and return them"""
+        with self.conn:
+            rows = self.conn.execute(
+                """SELECT channel, message_id, file_path, content_hash, attempts FROM jobs
+                   WHERE status = 'pending' ORDER BY priority DESC, enqueued_at LIMIT ?""",
+                (limit,)
+            ).fetchall()
+            self.conn.executemany(
+                "UPDATE jobs SET status = 'running', attempts = attempts + 1 WHERE channel = ? AND message_id = ?",
+                ((channel, message_id) for channel, message_id, _, _, _ in rows)
+            )
+        return rows
+
+    def finish(self, channel, message_id, error=None, retry=False):
+        """Record a job's outcome; a retryable error goes back to pending until MAX_ATTEMPTS"""
+        with self.conn:
+            self.conn.execute(
+                """UPDATE jobs SET error = ?, status = CASE
+                       WHEN ? IS NULL THEN 'done'
+                       WHEN ? AND attempts < ? THEN 'pending'
+                       ELSE 'failed' END
+                   WHERE channel = ? AND message_id = ?""",
+                (error, error, retry, MAX_ATTEMPTS, channel, message_id)
+            )
+
+    def requeue_running(self):
+        """Return jobs left running by a drainer that died; only call while holding the lock
+
+        Jobs that already used up MAX_ATTEMPTS are marked failed instead, so an
+        image that crashes the drainer cannot stall the queue forever.
+        """
+        with self.conn:
+            self.conn.execute(
+                "UPDATE jobs SET status = 'failed', error = ? WHERE status = 'running' AND attempts >= ?",
+                (f"drainer stopped during each of {MAX_ATTEMPTS} attempts", MAX_ATTEMPTS)
+            )
+            return self.conn.execute("UPDATE jobs SET status = 'pending' WHERE status = 'running'").rowcount
+
+    def counts(self):
+        return dict(self.conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status"))
+
+    def drain(self, lang="rus+eng", jobs=1, backend="auto"):
+        """OCR pending jobs until the queue is empty; returns processed count or None if another drainer runs"""
+        from media_ocr_cache import OCRCache, process_media
+
+        processed = None
+        # Re-check after releasing the lock: a fetch may have queued work (and seen
+        # its own drainer bail out) between our last empty claim and the release.
+        # 'running' rows count too, since a crashed drainer can leave them behind.
+        while any(self.counts().get(status) for status in ('pending', 'running')):
+            with open(self.lock_path, 'w') as lock:
+                try:
+                    fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except BlockingIOError:
+                    return processed
+
+                self.requeue_running()
+                cache = OCRCache()
+                processed = processed or 0
+                while True:
+                    claimed = self.claim()
+                    if not claimed:
+                        break
+
+                    # Retries (attempts made before this claim) bypass the OCR cache, which holds the last error
+                    by_batch = sorted(claimed, key=lambda row: (row[0], row[4] > 0))
+                    for (channel, retry), rows in groupby(by_batch, key=lambda row: (row[0], row[4] > 0)):
+                        messages = [
+                            {'id': message_id, 'media_info': {'file_path': file_path, 'content_hash': content_hash}}
+                            for _, message_id, file_path, content_hash, _ in rows
+                        ]
+                        results = process_media(channel, messages, cache, refresh=retry, lang=lang, jobs=jobs, backend=backend)
+                        reported = set()
+                        for result in results:
+                            if result['status'] in ('missing_file', 'unsupported'):
+                                self.finish(channel, result['message_id'], result.get('detail'))
+                            else:
+                                # OCR backend failures are recorded and retried, not marked done
+                                self.finish(channel, result['message_id'], result.get('error'), retry=True)
+                            reported.add(result['message_id'])
+                        for msg in messages:
+                            if msg['id'] not in reported:
+                                self.finish(channel, msg['id'], "no file to OCR")
+                        processed += len(messages)
+                cache.close()
+        return processed if processed is not None else 0
+
+
+def start_background_drain(jobs=None):
+    """Launch a detached drainer; it exits at once if another one holds the lock
+
+    By default it uses half the cores, leaving the rest to the fetch that queued the work.
+    """
+    log_file = DEFAULT_BASE_DIR / "ocr_queue.log"
+    jobs = jobs or max(1, (os.cpu_count() or 2) // 2)
+    with open(log_file, 'a') as log:
+        subprocess.Popen(
+            [sys.executable, str(Path(__file__).resolve()), "drain", f"--jobs={jobs}"],
+            cwd=str(Path(__file__).parent),
+            stdout=log,
+            stderr=subprocess.STDOUT,
+            stdin=subprocess.DEVNULL,
+            start_new_session=True
+        )
+    return log_file
+
+
+def enqueue_and_drain(channel, *batches):
+    """Queue (messages, priority) batches of downloaded images, then start one background drainer"""
+    try:
+        with OCRQueue() as queue:
+            queued = sum(queue.enqueue(channel, messages, priority) for messages, priority in batches)
+        if queued:
+            start_background_drain()
+            print(f"📝 Queued {queued} images for background OCR")
+        return queued
+    except Exception as e:
+        print(f"⚠️  Could not queue media for OCR: {e}")
+        return 0
+
+
+def main():
+    args = [a for a in sys.argv[1:] if not a.startswith('--')]
+    options = dict(a[2:].split('=', 1) for a in sys.argv[1:] if a.startswith('--') and '=' in a)
+
+    if not args or args[0] not in ("drain", "status"):
+        print("""
+OCR Queue - Background OCR for downloaded media
+
+Usage:
+  python ocr_queue.py status
+  python ocr_queue.py drain [--jobs=N] [--lang=LANG] [--backend=NAME]
+
+Jobs are queued automatically by fetches with --fetch-media and by the
+border validator; a drainer is started in the background when needed.
+        """)
+        sys.exit(1)
+
+    with OCRQueue() as queue:
+        if args[0] == "status":
+            counts = queue.counts()
+            print(f"📝 OCR queue: {counts.get('pending', 0)} pending, {counts.get('running', 0)} running, "
+                  f"{counts.get('done', 0)} done, {counts.get('failed', 0)} failed")
+            return
+
+        started = datetime.now()
+        processed = queue.drain(
+            lang=options.get('lang', 'rus+eng'),
+            jobs=int(options.get('jobs', 1)),
+            backend=options.get('backend', 'auto')
+        )
+        if processed is None:
+            print("⏳ Another OCR drainer is already running")
+        else:
+            print(f"[{started.isoformat(timespec='seconds')}] ✅ Drained {processed} OCR jobs")
+
+
+if __name__ == "__main__":
+    main()
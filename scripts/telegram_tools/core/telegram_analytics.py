@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+"""
+Telegram Analytics - Vectorized activity statistics over cached messages
+Loads message fields into NumPy columns and aggregates them without Python loops
+"""
+
+import json
+import sys
+import time
+from datetime import datetime
+
+try:
+    import numpy as np
+except ImportError:
+    print("ERROR: numpy not found. Install with: pip install numpy", file=sys.stderr)
+    sys.exit(1)
+
+from telegram_filter import find_latest_cache, message_matcher
+
+MEDIA_MARKERS = ('📷 [Photo]', '📎 [File]', '📦 [Media]')
+WEEKDAYS = ['Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun']
+
+
+def load_messages(channel, filter_type="all", include_archives=False):
+    """Collect filtered messages from the latest cache (and daily archives), unique by id"""
+    matches = message_matcher(filter_type)
+    by_id = {}
+
+    if include_archives:
+        from daily_persistence import DailyPersistence
+
+        dp = DailyPersistence()
+        for entry in dp.list_daily_caches(channel):
+            archive_date = datetime.strptime(entry['date'], '%Y-%m-%d').date()
+            for msg in dp.iter_daily_messages(channel, archive_date):
+                if matches(msg):
+                    by_id[msg['id']] = msg
+
+    cache_file = find_latest_cache(channel)
+    if cache_file:
+        with open(cache_file, 'r', encoding='utf-8') as f:
+            for msg in json.load(f)['messages']:
+                if matches(msg):
+                    by_id[msg['id']] = msg
+
+    return list(by_id.values())
+
+
+def build_columns(messages):
+    """Convert message dicts into typed NumPy columns"""
+    count = len(messages)
+
+    # date_msk is already Moscow wall-clock time, so hour/day buckets need no tz math
+    ts = np.array([m['date_msk'] for m in messages], dtype='datetime64[s]')
+    views = np.fromiter((m.get('views') if m.get('views') is not None else np.nan for m in messages),
+                        dtype=np.float64, count=count)
+    forwards = np.fromiter((m.get('forwards') or 0 for m in messages), dtype=np.int64, count=count)
+    reply_to = np.fromiter((m.get('reply_to_id') or 0 for m in messages), dtype=np.int64, count=count)
+    has_media = np.fromiter((bool(m.get('media_info')) or m.get('text', '').startswith(MEDIA_MARKERS)
+                             for m in messages), dtype=bool, count=count)
+    ids = np.fromiter((m['id'] for m in messages), dtype=np.int64, count=count)
+
+    # Prefer the numeric sender id; older caches only carry the display name
+    sender_keys = np.array([str(m.get('sender_id') or m.get('sender', 'Unknown')) for m in messages])
+    sender_ids, sender_codes = np.unique(sender_keys, return_inverse=True)
+    names = {}
+    for m in messages:
+        names.setdefault(str(m.get('sender_id') or m.get('sender', 'Unknown')), m.get('sender', 'Unknown'))
+
+    return {
+        'id': ids,
+        'ts': ts,
+        'views': views,
+        'forwards': forwards,
+        'reply_to': reply_to,
+        'has_media': has_media,
+        'sender_code': sender_codes,
+        'sender_keys': sender_ids,
+        'sender_names': [names[key] for key in sender_ids],
+    }
+
+
+def compute_report(columns, top_senders=10):
+    """Aggregate histograms, percentiles and the weekday/hour heatmap"""
+    ts = columns['ts']
+    total = len(ts)
+    if total == 0:
+        return {'total_messages': 0}
+
+    days = ts.astype('datetime64[D]')
+    hours = (ts.astype('datetime64[h]') - days).astype(np.int64)
+    # 1970-01-01 was a Thursday (weekday 3 with Monday = 0)
+    weekdays = (days.astype(np.int64) + 3) % 7
+
+    per_hour = np.bincount(hours, minlength=24)
+    heatmap = np.bincount(weekdays * 24 + hours, minlength=7 * 24).reshape(7, 24)
+    unique_days, per_day = np.unique(days, return_counts=True)
+
+    sender_counts = np.bincount(columns['sender_code'], minlength=len(columns['sender_keys']))
+    order = np.argsort(sender_counts)[::-1][:top_senders]
+
+    views = columns['views']
+    known_views = views[~np.isnan(views)]
+    view_stats = None
+    if known_views.size:
+        p50, p90, p99 = np.percentile(known_views, [50, 90, 99])
+        view_stats = {
+            'messages_with_views': int(known_views.size),
+            'mean': float(known_views.mean()),
+            'p50': float(p50),
+            'p90': float(p90),
+            'p99': float(p99),
+            'max': int(known_views.max()),
+        }
+
+    return {
+        'total_messages': total,
+        'time_range': {'start': str(ts.min()).replace('T', ' '), 'end': str(ts.max()).replace('T', ' ')},
+        'id_range': {'min': int(columns['id'].min()), 'max': int(columns['id'].max())},
+        'per_hour': per_hour.tolist(),
+        'per_day': {str(day): int(n) for day, n in zip(unique_days, per_day)},
+        'heatmap': heatmap.tolist(),
+        'top_senders': [
+            {'sender': columns['sender_names'][i], 'key': str(columns['sender_keys'][i]), 'messages': int(sender_counts[i])}
+            for i in order
+        ],
+        'views': view_stats,
+        'forwards_total': int(columns['forwards'].sum()),
+        'media_messages': int(columns['has_media'].sum()),
+        'replies': int(np.count_nonzero(columns['reply_to'])),
+    }
+
+
+def print_report(channel, filter_type, report, elapsed):
+    """Human-readable rendering of compute_report output"""
+    print(f"📊 Analytics for {channel} ({filter_type})")
+    if not report['total_messages']:
+        print("📭 No messages found")
+        return
+
+    total = report['total_messages']
+    print(f"   Messages: {total}  ({report['time_range']['start']} → {report['time_range']['end']})")
+    print(f"   IDs: {report['id_range']['min']} → {report['id_range']['max']}")
+    print(f"   Media: {report['media_messages']}  Replies: {report['replies']}  Forwards: {report['forwards_total']}")
+
+    views = report['views']
+    if views:
+        print(f"   Views: mean {views['mean']:.0f}, p50 {views['p50']:.0f}, p90 {views['p90']:.0f}, "
+              f"p99 {views['p99']:.0f}, max {views['max']}")
+
+    print("\n🕐 Messages per hour (MSK):")
+    peak = max(report['per_hour']) or 1
+    for hour, n in enumerate(report['per_hour']):
+        bar = '█' * round(30 * n / peak)
+        print(f"   {hour:02d}:00 {n:>6} {bar}")
+
+    print("\n📅 Messages per day:")
+    for day, n in report['per_day'].items():
+        print(f"   {day} {n:>6}")
+
+    print("\n👥 Top senders:")
+    for sender in report['top_senders']:
+        print(f"   {sender['messages']:>6}  {sender['sender']}")
+
+    print("\n🔥 Activity heatmap (weekday × hour):")
+    shades = ' ░▒▓█'
+    cell_peak = max(max(row) for row in report['heatmap']) or 1
+    print("        " + ''.join(f"{h:<6}" for h in range(0, 24, 6)))
+    for name, row in zip(WEEKDAYS, report['heatmap']):
+        cells = ''.join(shades[min(4, -(-4 * n // cell_peak))] for n in row)
+        print(f"   {name}  {cells}")
+
+    print(f"\n⏱️  Computed in {elapsed * 1000:.1f} ms")
+
+
+def main():
+    args = [a for a in sys.argv[1:] if not a.startswith('--')]
+
+    if not args:
+        print("Usage: python telegram_analytics.py <channel> [filter] [--archives] [--json]")
+        print("\nFilters: today, yesterday, last:N, YYYY-MM-DD, all (default)")
+        print("\nOptions:")
+        print("  --archives  Include daily archives in addition to the latest cache")
+        print("  --json      Print the report as JSON")
+        print("\nExamples:")
+        print("  python telegram_analytics.py aiclubsweggs last:7")
+        print("  python telegram_analytics.py aiclubsweggs all --archives --json")
+        sys.exit(1)
+
+    channel = args[0] if args[0].startswith('@') else f'@{args[0]}'
+    filter_type = args[1] if len(args) > 1 else "all"
+
+    try:
+        messages = load_messages(channel, filter_type, include_archives="--archives" in sys.argv)
+
+        started = time.perf_counter()
+        report = compute_report(build_columns(messages))
+        elapsed = time.perf_counter() - started
+
+        if "--json" in sys.argv:
+            report['channel'] = channel
+            report['filter'] = filter_type
+            report['compute_ms'] = round(elapsed * 1000, 2)
+            print(json.dumps(report, indent=2, ensure_ascii=False))
+        else:
+            print_report(channel, filter_type, report, elapsed)
+    except Exception as e:
+        print(f"❌ Error: {str(e)}", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
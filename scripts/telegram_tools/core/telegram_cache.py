@@ -84,6 +84,104 @@ def clean_old_caches(channel=None, keep_latest=3):
                     old_file.unlink()
                     print(f"🧹 Removed old cache: {old_file.name}")
 
+def merge_messages_into_cache(cache_file, new_messages, source="merge"):
+    """Merge extra messages into an existing cache file, keyed by message id
+
+    Existing entries are refreshed with the new data but keep their downloaded
+    media_info. Messages stay in the cache's newest-first order.
+    Returns the merged message list.
+    """
+    cache_file = Path(cache_file)
+    with open(cache_file, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+
+    by_id = {msg['id']: msg for msg in data.get('messages', [])}
+    added = 0
+    for msg in new_messages:
+        existing = by_id.get(msg['id'])
+        if existing is None:
+            added += 1
+        elif existing.get('media_info') and not msg.get('media_info'):
+            msg = dict(msg, media_info=existing['media_info'])
+        by_id[msg['id']] = msg
+
+    merged = sorted(by_id.values(), key=lambda m: m['id'], reverse=True)
+    data['messages'] = merged
+    meta = data.setdefault('meta', {})
+    meta['total_messages'] = len(merged)
+    meta.setdefault('merges', []).append({
+        'source': source,
+        'added': added,
+        'merged_at': datetime.now().isoformat()
+    })
+
+    with open(cache_file, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=2, ensure_ascii=False)
+
+    channel = meta.get('channel')
+    if channel:
+        from thread_index import ThreadIndex
+
+        thread_index = ThreadIndex(channel, cache_file.parent)
+        if thread_index.add_messages(new_messages):
+            thread_index.save()
+
+        # Offsets of every message shift when the file is rewritten
+        from message_index import MessageIndex
+
+        with MessageIndex(cache_file.parent) as message_index:
+            message_index.index_file(channel, cache_file)
+
+    return merged
+
+def side_cache_path(channel, cache_dir=None):
+    """Side cache file holding a channel's out-of-range messages"""
+    cache_dir = Path(cache_dir) if cache_dir else Path(__file__).parent.parent.parent.parent / "telegram_cache"
+    clean_channel = channel.replace('@', '').replace('/', '_')
+    return cache_dir / "side" / f"{clean_channel}.json"
+
+def load_side_cache(channel, cache_dir=None):
+    """Messages fetched outside the contiguous history (search hits, thread parents)
+
+    They are kept apart from the channel's cache files so id/date coverage and
+    border checks only ever see the unbroken fetched range. Returns a dict with
+    'messages' keyed by id and the 'searches' already sent to the server.
+    """
+    path = side_cache_path(channel, cache_dir)
+    if not path.exists():
+        return {'channel': channel, 'messages': {}, 'searches': []}
+
+    with open(path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    data['messages'] = {int(message_id): msg for message_id, msg in data.get('messages', {}).items()}
+    data.setdefault('searches', [])
+    return data
+
+def save_side_messages(channel, new_messages, source, cache_dir=None, search=None):
+    """Add messages (and optionally a search record) to the channel's side cache"""
+    side = load_side_cache(channel, cache_dir)
+    for msg in new_messages:
+        existing = side['messages'].get(msg['id'])
+        if existing and existing.get('media_info') and not msg.get('media_info'):
+            msg = dict(msg, media_info=existing['media_info'])
+        side['messages'][msg['id']] = dict(msg, source=source)
+    if search:
+        side['searches'].append(search)
+
+    path = side_cache_path(channel, cache_dir)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(side, f, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+    from thread_index import ThreadIndex
+
+    thread_index = ThreadIndex(channel, path.parent.parent)
+    if thread_index.add_messages(new_messages):
+        thread_index.save()
+    return side
+
 def cache_info():
     """Show cache information and statistics"""
     cache_dir = Path(__file__).parent.parent.parent.parent / "telegram_cache"
@@ -8,20 +8,162 @@ import asyncio
 import json
 import os
 import sys
-from datetime import datetime, timezone
+from datetime import datetime, timedelta, timezone
 from pathlib import Path
 import pytz
-from temporal_anchor import TemporalAnchor
+from temporal_anchor import ESTIMATE_MARGIN, TemporalAnchor
 from daily_persistence import DailyPersistence
+from thread_index import ThreadIndex
+from message_index import MessageIndex
+from hash_cache import sha256_file
+from ocr_queue import PRIORITY_BACKFILL, PRIORITY_RECENT, enqueue_and_drain
 
 try:
     from telethon import TelegramClient
     from telethon.sessions import StringSession
-    from telethon.tl.functions.messages import GetHistoryRequest
+    from telethon.tl.functions.messages import GetHistoryRequest, SearchRequest
+    from telethon.tl.types import InputMessagesFilterEmpty
 except ImportError:
     print("ERROR: telethon not found. Install with: pip install telethon", file=sys.stderr)
     sys.exit(1)
 
+PROJECT_ROOT = Path(__file__).parent.parent.parent.parent
+CACHE_DIR = PROJECT_ROOT / "telegram_cache"
+# Single-day fetches live apart so the latest-cache lookups never mistake one for the full history
+DAY_CACHE_DIR = CACHE_DIR / "days"
+
+
+def load_credentials():
+    """Load Telegram credentials from the unified .env file"""
+    env_file = PROJECT_ROOT / ".env"
+    creds = {}
+    with open(env_file, 'r') as f:
+        for line in f:
+            if '=' in line and not line.startswith('#'):
+                key, value = line.strip().split('=', 1)
+                creds[key] = value.strip('"')
+    return creds
+
+
+def create_client():
+    """Build a (not yet connected) Telegram client from .env credentials"""
+    creds = load_credentials()
+    return TelegramClient(
+        StringSession(creds['TELEGRAM_SESSION']),
+        int(creds['TELEGRAM_API_ID']),
+        creds['TELEGRAM_API_HASH']
+    )
+
+
+def format_message_text(message):
+    """Message text with the media marker prefix used across the cache"""
+    text_content = message.message or ''
+    if hasattr(message, 'media') and message.media:
+        if hasattr(message.media, 'photo'):
+            text_content = f'📷 [Photo] {text_content}'.strip()
+        elif hasattr(message.media, 'document'):
+            text_content = f'📎 [File] {text_content}'.strip()
+        else:
+            text_content = f'📦 [Media] {text_content}'.strip()
+    return text_content
+
+
+def serialize_message(message, moscow_tz, media_info=None):
+    """Convert a Telethon message into the cache JSON schema (Moscow time)"""
+    msk_date = message.date.astimezone(moscow_tz)
+
+    # Extract sender name
+    sender_name = 'Unknown'
+    if hasattr(message, 'sender') and message.sender:
+        if hasattr(message.sender, 'first_name'):
+            sender_name = message.sender.first_name or 'Unknown'
+            if hasattr(message.sender, 'last_name') and message.sender.last_name:
+                sender_name += f' {message.sender.last_name}'
+
+    return {
+        'id': message.id,
+        'date_utc': message.date.isoformat(),
+        'date_msk': msk_date.strftime('%Y-%m-%d %H:%M:%S'),
+        'text': format_message_text(message),
+        'sender': sender_name,
+        'sender_id': getattr(message, 'sender_id', None),
+        'views': getattr(message, 'views', None),
+        'forwards': getattr(message, 'forwards', None),
+        'reply_to_id': getattr(message.reply_to, 'reply_to_msg_id', None) if hasattr(message, 'reply_to') and message.reply_to else None,
+        'media_info': media_info
+    }
+
+
+async def download_message_media(client, message, moscow_tz):
+    """Download a message's media into telegram_media/msg_<id>; returns media_info or None"""
+    if not (hasattr(message, 'media') and message.media):
+        return None
+
+    try:
+        media_dir = PROJECT_ROOT / "telegram_media" / f"msg_{message.id}"
+        media_dir.mkdir(parents=True, exist_ok=True)
+
+        media_path = await client.download_media(message, str(media_dir))
+        if media_path:
+            media_path = Path(media_path)
+            print(f"📎 Downloaded: {media_path.name}")
+            return {
+                'file_path': str(media_path),
+                'file_name': media_path.name,
+                'file_size': media_path.stat().st_size,
+                'content_hash': sha256_file(media_path),
+                'download_time': datetime.now(moscow_tz).isoformat()
+            }
+    except Exception as e:
+        print(f"❌ Failed to download media for message {message.id}: {e}")
+    return None
+
+
+def save_fetched_messages(channel, messages_data, meta, suffix="", fetch_media=False, cache_dir=None):
+    """Write a fetch to a new cache file and update the indexes and OCR queue
+
+    cache_dir defaults to CACHE_DIR; the reply-thread index is always the
+    channel-wide one there. Returns the cache file path.
+    """
+    moscow_tz = pytz.timezone('Europe/Moscow')
+    cache_dir = Path(cache_dir) if cache_dir else CACHE_DIR
+    cache_dir.mkdir(parents=True, exist_ok=True)
+
+    clean_channel = channel.replace('@', '').replace('/', '_')
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    suffix_part = f"_{suffix}" if suffix else ""
+    cache_file = cache_dir / f"{clean_channel}_{timestamp}{suffix_part}.json"
+
+    cache_data = {
+        'meta': {
+            'channel': channel,
+            'cached_at': datetime.now(moscow_tz).isoformat(),
+            'total_messages': len(messages_data),
+            **meta
+        },
+        'messages': messages_data
+    }
+
+    with open(cache_file, 'w', encoding='utf-8') as f:
+        json.dump(cache_data, f, indent=2, ensure_ascii=False)
+
+    # Keep the reply-thread and id indexes current with every fetch
+    thread_index = ThreadIndex(channel, CACHE_DIR)
+    if thread_index.add_messages(messages_data):
+        thread_index.save()
+    with MessageIndex(cache_dir) as message_index:
+        message_index.index_file(channel, cache_file)
+
+    # OCR new downloads in the background, today's messages first
+    if fetch_media:
+        today = datetime.now(moscow_tz).strftime('%Y-%m-%d')
+        recent = [msg for msg in messages_data if msg['date_msk'].startswith(today)]
+        older = [msg for msg in messages_data if not msg['date_msk'].startswith(today)]
+        enqueue_and_drain(channel, (recent, PRIORITY_RECENT), (older, PRIORITY_BACKFILL))
+
+    return cache_file
+
+
 async def fetch_and_cache(channel, limit=100, offset_id=0, suffix="", use_anchor=True, fetch_media=False):
     """Fetch messages and save to cache with full metadata
 
@@ -54,22 +196,7 @@ async def fetch_and_cache(channel, limit=100, offset_id=0, suffix="", use_anchor
             anchor = offset_info['anchor_data']
             print(f"   Using anchor: message {anchor['message_id']} from {anchor['date']} at {anchor['timestamp']}")
 
-    # Load credentials from unified .env file
-    env_file = Path(__file__).parent.parent.parent.parent / ".env"
-    creds = {}
-    with open(env_file, 'r') as f:
-        for line in f:
-            if '=' in line and not line.startswith('#'):
-                key, value = line.strip().split('=', 1)
-                creds[key] = value.strip('"')
-
-    # Connect to Telegram
-    client = TelegramClient(
-        StringSession(creds['TELEGRAM_SESSION']),
-        int(creds['TELEGRAM_API_ID']),
-        creds['TELEGRAM_API_HASH']
-    )
-
+    client = create_client()
     await client.connect()
     entity = await client.get_entity(channel)
 
@@ -88,100 +215,22 @@ async def fetch_and_cache(channel, limit=100, offset_id=0, suffix="", use_anchor
     # Convert to JSON with Moscow time
     messages_data = []
     for message in history.messages:
-        # Convert to Moscow time (UTC+3)
-        msk_date = message.date.astimezone(moscow_tz)
-        msk_timestamp = msk_date.strftime('%Y-%m-%d %H:%M:%S')
-
-        # Extract sender name
-        sender_name = 'Unknown'
-        if hasattr(message, 'sender') and message.sender:
-            if hasattr(message.sender, 'first_name'):
-                sender_name = message.sender.first_name or 'Unknown'
-                if hasattr(message.sender, 'last_name') and message.sender.last_name:
-                    sender_name += f' {message.sender.last_name}'
-
-        # Handle media
-        text_content = message.message or ''
         media_info = None
-
-        if hasattr(message, 'media') and message.media:
-            if hasattr(message.media, 'photo'):
-                text_content = f'📷 [Photo] {text_content}'.strip()
-            elif hasattr(message.media, 'document'):
-                text_content = f'📎 [File] {text_content}'.strip()
-            else:
-                text_content = f'📦 [Media] {text_content}'.strip()
-
-            # Download media if requested
-            if fetch_media:
-                try:
-                    media_dir = Path(__file__).parent.parent.parent.parent / "telegram_media" / f"msg_{message.id}"
-                    media_dir.mkdir(parents=True, exist_ok=True)
-
-                    media_path = await client.download_media(message, str(media_dir))
-                    if media_path:
-                        import hashlib
-                        media_path = Path(media_path)
-
-                        # Generate content hash
-                        content_hash = hashlib.sha256()
-                        with open(media_path, 'rb') as f:
-                            for chunk in iter(lambda: f.read(4096), b""):
-                                content_hash.update(chunk)
-
-                        media_info = {
-                            'file_path': str(media_path),
-                            'file_name': media_path.name,
-                            'file_size': media_path.stat().st_size,
-                            'content_hash': content_hash.hexdigest(),
-                            'download_time': datetime.now(moscow_tz).isoformat()
-                        }
-                        print(f"📎 Downloaded: {media_path.name}")
-                except Exception as e:
-                    print(f"❌ Failed to download media for message {message.id}: {e}")
-
-        msg_data = {
-            'id': message.id,
-            'date_utc': message.date.isoformat(),
-            'date_msk': msk_timestamp,
-            'text': text_content,
-            'sender': sender_name,
-            'views': getattr(message, 'views', None),
-            'forwards': getattr(message, 'forwards', None),
-            'reply_to_id': getattr(message.reply_to, 'reply_to_msg_id', None) if hasattr(message, 'reply_to') and message.reply_to else None,
-            'media_info': media_info
-        }
-        messages_data.append(msg_data)
-
-    # Save to cache
-    cache_dir = Path(__file__).parent.parent.parent.parent / "telegram_cache"
-    cache_dir.mkdir(exist_ok=True)
-
-    clean_channel = channel.replace('@', '').replace('/', '_')
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    suffix_part = f"_{suffix}" if suffix else ""
-    cache_file = cache_dir / f"{clean_channel}_{timestamp}{suffix_part}.json"
-
-    cache_data = {
-        'meta': {
-            'channel': channel,
-            'cached_at': datetime.now(moscow_tz).isoformat(),
-            'total_messages': len(messages_data),
-            'limit_requested': limit,
-            'offset_id': actual_offset_id,
-            'original_offset_id': offset_id,
-            'fetch_strategy': fetch_strategy,
-            'suffix': suffix,
-            'temporal_anchor_version': '1.0'
-        },
-        'messages': messages_data
-    }
-
-    with open(cache_file, 'w', encoding='utf-8') as f:
-        json.dump(cache_data, f, indent=2, ensure_ascii=False)
+        if fetch_media:
+            media_info = await download_message_media(client, message, moscow_tz)
+        messages_data.append(serialize_message(message, moscow_tz, media_info))
 
     await client.disconnect()
 
+    cache_file = save_fetched_messages(channel, messages_data, {
+        'limit_requested': limit,
+        'offset_id': actual_offset_id,
+        'original_offset_id': offset_id,
+        'fetch_strategy': fetch_strategy,
+        'suffix': suffix,
+        'temporal_anchor_version': '1.0'
+    }, suffix, fetch_media)
+
     # Update temporal anchor if we fetched current day's data
     if use_anchor and messages_data:
         current_date = datetime.now(moscow_tz).date()
@@ -198,9 +247,202 @@ async def fetch_and_cache(channel, limit=100, offset_id=0, suffix="", use_anchor
         print(f"📎 Downloaded media for {media_count} messages")
     return str(cache_file)
 
+async def fetch_day(channel, target_date, fetch_media=False, batch_size=100):
+    """Fetch every message of one Moscow day and cache it
+
+    The id window between the nearest anchors before and after the day is
+    paged with GetHistoryRequest (min_id/max_id) until it is exhausted or a
+    message from an earlier day shows up, so the day is complete without
+    guessing a limit. The file goes to DAY_CACHE_DIR. Returns the cache file path.
+    """
+    ta = TemporalAnchor()
+    moscow_tz = pytz.timezone('Europe/Moscow')
+    day_str = target_date.isoformat()
+
+    window = ta.day_id_window(channel, target_date)
+    print(f"🎯 Fetching {channel} for {day_str} within ids ({window['min_id'] or '-'}, {window['max_id'] or '-'})")
+
+    # Far-apart anchors leave a wide window: start just above the interpolated end of the day instead
+    start_id = window['max_id']
+    if not window['complete'] and window['max_id'] - window['min_id'] > 2 * ESTIMATE_MARGIN:
+        estimate = ta.estimate_message_id(channel, target_date + timedelta(days=1))
+        if estimate and estimate['method'] == 'interpolated':
+            start_id = min(window['max_id'], estimate['message_id'] + ESTIMATE_MARGIN + 1)
+            print(f"🧭 Anchors place the end of {day_str} near ID {estimate['message_id']}, starting at {start_id}")
+
+    client = create_client()
+    await client.connect()
+
+    messages_data = []
+    requests = 0
+    try:
+        entity = await client.get_entity(channel)
+        offset_id = start_id
+        while True:
+            history = await client(GetHistoryRequest(
+                peer=entity,
+                offset_id=offset_id,
+                offset_date=None,
+                add_offset=0,
+                limit=batch_size,
+                max_id=window['max_id'],
+                min_id=window['min_id'],
+                hash=0
+            ))
+            requests += 1
+
+            batch = [m for m in history.messages if getattr(m, 'date', None)]
+            if requests == 1 and start_id != window['max_id'] and (
+                    not batch or batch[0].date.astimezone(moscow_tz).date().isoformat() <= day_str):
+                # The estimate was low and the day may reach above it: page from the anchor bound
+                print(f"⚠️  Estimate fell inside {day_str}, restarting from ID {window['max_id'] or 'latest'}")
+                start_id = offset_id = window['max_id']
+                continue
+
+            reached_earlier_day = False
+            for message in batch:
+                msk_day = message.date.astimezone(moscow_tz).date().isoformat()
+                if msk_day < day_str:
+                    reached_earlier_day = True
+                elif msk_day == day_str:
+                    media_info = await download_message_media(client, message, moscow_tz) if fetch_media else None
+                    messages_data.append(serialize_message(message, moscow_tz, media_info))
+
+            if reached_earlier_day or len(history.messages) < batch_size:
+                break
+            offset_id = history.messages[-1].id
+            # Nothing can be left between the oldest id we have and the lower bound
+            if offset_id <= window['min_id'] + 1:
+                break
+    finally:
+        await client.disconnect()
+
+    cache_file = save_fetched_messages(channel, messages_data, {
+        'fetch_strategy': 'day_window',
+        'date': day_str,
+        'min_id': window['min_id'],
+        'max_id': window['max_id'],
+        'requests': requests,
+        'suffix': f"day_{day_str}",
+        'temporal_anchor_version': '1.0'
+    }, f"day_{day_str}", fetch_media, DAY_CACHE_DIR)
+
+    # A past day fetched in full is complete; today may still grow
+    if messages_data:
+        is_past = target_date < datetime.now(moscow_tz).date()
+        if ta.update_anchor_from_messages(channel, messages_data, target_date, complete_dates=[target_date] if is_past else ()):
+            print(f"🔗 Updated temporal anchor for {channel}")
+
+    print(f"✅ Cached {len(messages_data)} messages from {channel} for {day_str} in {requests} requests")
+    print(f"📁 Cache file: {cache_file}")
+    return str(cache_file)
+
+
+async def fetch_older_messages(channel, max_id, limit):
+    """Fetch up to `limit` messages older than `max_id` with a single request
+
+    Used to top up a cache by a handful of messages (e.g. for border checks)
+    without refetching the whole history window.
+    """
+    moscow_tz = pytz.timezone('Europe/Moscow')
+    client = create_client()
+    await client.connect()
+
+    try:
+        entity = await client.get_entity(channel)
+        history = await client(GetHistoryRequest(
+            peer=entity,
+            offset_id=0,
+            offset_date=None,
+            add_offset=0,
+            limit=limit,
+            max_id=max_id,
+            min_id=0,
+            hash=0
+        ))
+    finally:
+        await client.disconnect()
+
+    return [serialize_message(m, moscow_tz) for m in history.messages if getattr(m, 'date', None)]
+
+
+async def fetch_messages_by_id(channel, message_ids, batch_size=100):
+    """Fetch specific messages by id, batching ids into as few requests as possible"""
+    moscow_tz = pytz.timezone('Europe/Moscow')
+    client = create_client()
+    await client.connect()
+
+    found = []
+    try:
+        entity = await client.get_entity(channel)
+        ids = sorted(set(message_ids))
+        for start in range(0, len(ids), batch_size):
+            batch = await client.get_messages(entity, ids=ids[start:start + batch_size])
+            found.extend(serialize_message(m, moscow_tz) for m in batch if m and getattr(m, 'date', None))
+    finally:
+        await client.disconnect()
+
+    return found
+
+
+async def search_messages(channel, query, min_date=None, max_date=None, min_id=0, max_id=0, batch_size=100):
+    """Server-side search (messages.Search) within date/id bounds
+
+    Pages through SearchRequest until the window is exhausted and returns the
+    hits in the cache JSON schema, newest first. Dates are timezone-aware
+    datetimes or None for an open bound.
+    """
+    moscow_tz = pytz.timezone('Europe/Moscow')
+    client = create_client()
+    await client.connect()
+
+    found = []
+    try:
+        entity = await client.get_entity(channel)
+        offset_id = 0
+        while True:
+            result = await client(SearchRequest(
+                peer=entity,
+                q=query,
+                filter=InputMessagesFilterEmpty(),
+                min_date=min_date,
+                max_date=max_date,
+                offset_id=offset_id,
+                add_offset=0,
+                limit=batch_size,
+                max_id=max_id,
+                min_id=min_id,
+                hash=0
+            ))
+            batch = [m for m in result.messages if getattr(m, 'date', None)]
+            found.extend(serialize_message(m, moscow_tz) for m in batch)
+
+            if len(result.messages) < batch_size:
+                break
+            offset_id = result.messages[-1].id
+    finally:
+        await client.disconnect()
+
+    return found
+
+
 async def main():
+    if len(sys.argv) > 1 and sys.argv[1] == "fetch-day":
+        if len(sys.argv) < 4:
+            print("Usage: python telegram_fetch.py fetch-day <channel> <YYYY-MM-DD> [--fetch-media]")
+            sys.exit(1)
+        channel = sys.argv[2] if sys.argv[2].startswith('@') else f'@{sys.argv[2]}'
+        try:
+            target_date = datetime.strptime(sys.argv[3], '%Y-%m-%d').date()
+            await fetch_day(channel, target_date, fetch_media="--fetch-media" in sys.argv)
+        except Exception as e:
+            print(f"❌ Error: {str(e)}", file=sys.stderr)
+            sys.exit(1)
+        return
+
     if len(sys.argv) < 2:
         print("Usage: python telegram_fetch.py <channel> [limit] [offset_id] [suffix] [--no-anchor] [--fetch-media]")
+        print("       python telegram_fetch.py fetch-day <channel> <YYYY-MM-DD> [--fetch-media]")
         print("Example: python telegram_fetch.py aiclubsweggs 100")
         print("Example: python telegram_fetch.py aiclubsweggs 100 72857 older")
         print("Example: python telegram_fetch.py aiclubsweggs 100 0 today --no-anchor")
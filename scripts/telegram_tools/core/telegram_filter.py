@@ -33,7 +33,7 @@ def find_latest_cache(channel):
     )
     return cache_files[-1] if cache_files else None
 
-def validate_border_detection(messages, filtered, target_date, channel=None):
+def validate_border_detection(messages, filtered, target_date, channel=None, cache_file=None):
     """Fallback border detection: check 3-7 messages before first filtered message"""
     if not filtered:
         print("🔍 Fallback border detection: No filtered messages found")
@@ -62,47 +62,35 @@ def validate_border_detection(messages, filtered, target_date, channel=None):
     if available_prev_messages < min_check:
         print(f"🔍 Fallback border detection: Not enough previous messages to validate (need min {min_check}, have {available_prev_messages})")
 
-        # CRITICAL: Auto-fetch more messages for proper validation
-        if channel:
-            print(f"🚀 Auto-fetching more messages to ensure proper border validation...")
-            print(f"🕐 Using timezone-aware Moscow time validation...")
-            import subprocess
-            import os
-
-            # Calculate how many more messages we need (fetch extra to be safe)
-            needed_messages = min_check - available_prev_messages
-            fetch_limit = max(500, len(messages) + needed_messages + 100)  # Fetch significantly more
+        # CRITICAL: Top up the cache with exactly the missing older messages
+        if channel and cache_file:
+            # Continue below the unbroken id run under the first filtered message,
+            # not below the global minimum, which may be an unrelated older message
+            oldest_id = first_filtered_id
+            run_length = 0
+            for msg in messages[first_index + 1:]:
+                if msg['id'] != oldest_id - 1:
+                    break
+                oldest_id = msg['id']
+                run_length += 1
+            needed_messages = max_check - run_length
+            print(f"🚀 Fetching {needed_messages} messages older than {oldest_id} for border validation...")
 
             try:
-                # Get the script directory
-                script_dir = Path(__file__).parent.parent.parent.parent
-
-                # Run telegram fetch to get more messages
-                result = subprocess.run([
-                    'python3',
-                    str(script_dir / 'scripts/telegram_tools/core/telegram_fetch.py'),
-                    channel,
-                    str(fetch_limit)
-                ], cwd=str(script_dir), capture_output=True, text=True)
-
-                if result.returncode == 0:
-                    print(f"✅ Auto-fetched {fetch_limit} messages with timezone-aware timestamps")
-
-                    # Reload the new cache and retry validation
-                    new_cache_file = find_latest_cache(channel)
-                    if new_cache_file:
-                        with open(new_cache_file, 'r', encoding='utf-8') as f:
-                            new_data = json.load(f)
-                        new_messages = new_data['messages']
-
-                        print(f"🔄 Retrying border validation with {len(new_messages)} timezone-corrected messages...")
-                        return validate_border_detection(new_messages, filtered, target_date, channel=None)  # Prevent infinite recursion
-
-                else:
-                    print(f"❌ Failed to auto-fetch messages: {result.stderr}")
+                import asyncio
+                from telegram_cache import merge_messages_into_cache
+                from telegram_fetch import fetch_older_messages
+
+                older = asyncio.run(fetch_older_messages(channel, oldest_id, needed_messages))
+                if older:
+                    new_messages = merge_messages_into_cache(cache_file, older, source="border_topup")
+                    print(f"✅ Merged {len(older)} older messages into {Path(cache_file).name}")
+                    print(f"🔄 Retrying border validation with {len(new_messages)} messages...")
+                    return validate_border_detection(new_messages, filtered, target_date)  # Prevent infinite recursion
+                print("❌ Telegram returned no older messages")
 
             except Exception as e:
-                print(f"❌ Error during auto-fetch: {str(e)}")
+                print(f"❌ Error during border top-up: {str(e)}")
 
         print("⚠️  Proceeding with incomplete validation - border detection may be inaccurate")
         return True  # Can't validate, assume correct
@@ -135,8 +123,158 @@ def validate_border_detection(messages, filtered, target_date, channel=None):
         print(f"✅ Border detection confirmed: All {total_checked} previous messages are from different date")
         return True
 
-def filter_messages(channel, filter_type="today", pattern=None, limit=None):
-    """Filter cached messages with various criteria"""
+def requested_range(filter_type):
+    """Moscow-time [start, end) window a filter asks for (start None = unbounded)"""
+    now = datetime.now()
+    today = datetime.strptime(now.strftime('%Y-%m-%d'), '%Y-%m-%d')
+
+    if filter_type == "today":
+        return today, today + timedelta(days=1)
+    if filter_type == "yesterday":
+        return today - timedelta(days=1), today
+    if filter_type.startswith("last:"):
+        days = int(filter_type.split(':')[1])
+        return now - timedelta(days=days), now
+    if filter_type == "all":
+        return None, now
+
+    start = datetime.strptime(filter_type, '%Y-%m-%d')
+    return start, start + timedelta(days=1)
+
+def uncovered_ranges(data, filter_type):
+    """Parts of the requested window the cache file does not hold
+
+    Returns a list of search windows as dicts with min/max Moscow datetimes
+    and the message id bound that keeps them disjoint from cached messages.
+    """
+    messages = data.get('messages', [])
+    start, end = requested_range(filter_type)
+
+    if not messages:
+        return [{'min_date': start, 'max_date': end, 'min_id': 0, 'max_id': 0}]
+
+    oldest = min(messages, key=lambda m: m['id'])
+    newest = max(messages, key=lambda m: m['id'])
+    covered_from = datetime.strptime(oldest['date_msk'], '%Y-%m-%d %H:%M:%S')
+    covered_to = datetime.strptime(newest['date_msk'], '%Y-%m-%d %H:%M:%S')
+
+    cached_at = data.get('meta', {}).get('cached_at')
+    if cached_at:
+        # cached_at is an aware Moscow timestamp; compare as naive MSK
+        covered_to = max(covered_to, datetime.fromisoformat(cached_at).replace(tzinfo=None))
+
+    ranges = []
+    if start is None or start < covered_from:
+        ranges.append({'min_date': start, 'max_date': min(end, covered_from), 'min_id': 0, 'max_id': oldest['id']})
+    if end > covered_to:
+        ranges.append({'min_date': max(start or covered_to, covered_to), 'max_date': end, 'min_id': newest['id'], 'max_id': 0})
+    return ranges
+
+def _search_covers(search, window):
+    """Whether an earlier search record spans a whole search window"""
+    searched_from = datetime.fromisoformat(search['min_date']) if search.get('min_date') else None
+    searched_to = datetime.fromisoformat(search['max_date'])
+    if searched_from is not None and (window['min_date'] is None or window['min_date'] < searched_from):
+        return False
+    return window['max_date'] <= searched_to
+
+def _in_window(msg, window):
+    msg_date = datetime.strptime(msg['date_msk'], '%Y-%m-%d %H:%M:%S')
+    return (window['min_date'] is None or msg_date >= window['min_date']) and msg_date < window['max_date']
+
+def hybrid_search(channel, cache_file, data, filter_type, pattern):
+    """Fill uncovered parts of a pattern query with Telegram server-side search
+
+    Hits are stored in the channel's side cache, never in the contiguous cache
+    file, so they cannot make a range look covered. A window already searched
+    for the same pattern is answered from the side cache.
+    Returns the search hits (newest first).
+    """
+    ranges = uncovered_ranges(data, filter_type)
+    if not ranges:
+        print("🔎 Hybrid search: cache covers the requested range")
+        return []
+
+    import asyncio
+    import pytz
+    from telegram_cache import load_side_cache, save_side_messages
+    from telegram_fetch import search_messages
+
+    moscow_tz = pytz.timezone('Europe/Moscow')
+    cache_dir = Path(cache_file).parent
+    side = load_side_cache(channel, cache_dir)
+
+    def to_aware(dt):
+        return moscow_tz.localize(dt) if dt else None
+
+    found = {}
+    for window in ranges:
+        label_from = window['min_date'] or 'beginning'
+        earlier = next((s for s in side['searches'] if s['pattern'] == pattern and _search_covers(s, window)), None)
+        if earlier:
+            hits = [side['messages'][mid] for mid in earlier['ids'] if mid in side['messages']]
+            hits = [msg for msg in hits if _in_window(msg, window)]
+            print(f"🔎 Hybrid search: '{pattern}' from {label_from} to {window['max_date']} already searched, {len(hits)} stored matches")
+            found.update((msg['id'], msg) for msg in hits)
+            continue
+
+        print(f"🔎 Hybrid search: querying Telegram for '{pattern}' from {label_from} to {window['max_date']}")
+        hits = asyncio.run(search_messages(
+            channel,
+            pattern,
+            min_date=to_aware(window['min_date']),
+            max_date=to_aware(window['max_date']),
+            min_id=window['min_id'],
+            max_id=window['max_id']
+        ))
+        print(f"    {len(hits)} server-side matches")
+        side = save_side_messages(channel, hits, "search", cache_dir, search={
+            'pattern': pattern,
+            'min_date': window['min_date'].isoformat() if window['min_date'] else None,
+            'max_date': window['max_date'].isoformat(),
+            'ids': [msg['id'] for msg in hits],
+            'searched_at': datetime.now().isoformat()
+        })
+        found.update((msg['id'], msg) for msg in hits)
+
+    return sorted(found.values(), key=lambda m: m['id'], reverse=True)
+
+def filter_target_date(filter_type):
+    """Single Moscow date (YYYY-MM-DD) a filter selects, or None for ranges"""
+    if filter_type == "today":
+        return datetime.now().strftime('%Y-%m-%d')
+    if filter_type == "yesterday":
+        return (datetime.now() - timedelta(days=1)).strftime('%Y-%m-%d')
+    if filter_type.startswith("last:") or filter_type == "all":
+        return None
+    # Assume it's a date in YYYY-MM-DD format
+    return filter_type
+
+def message_matcher(filter_type="today", pattern=None):
+    """Build a predicate for a filter/pattern pair; the one place filter rules live"""
+    target_date = filter_target_date(filter_type)
+    if target_date:
+        date_ok = lambda m: m['date_msk'].startswith(target_date)
+    elif filter_type.startswith("last:"):
+        days = int(filter_type.split(':')[1])
+        cutoff = (datetime.now() - timedelta(days=days)).strftime('%Y-%m-%d %H:%M:%S')
+        date_ok = lambda m: m['date_msk'] >= cutoff
+    else:
+        date_ok = lambda m: True
+
+    if not pattern:
+        return date_ok
+
+    regex = re.compile(pattern, re.IGNORECASE)
+    return lambda m: date_ok(m) and regex.search(m['text']) is not None
+
+def filter_messages(channel, filter_type="today", pattern=None, limit=None, hybrid=False):
+    """Filter cached messages with various criteria
+
+    With hybrid=True and a pattern, date ranges the cache does not cover are
+    resolved via server-side search; the hits are added to the results only
+    after border detection, which must see the contiguous cache alone.
+    """
 
     cache_file = find_latest_cache(channel)
     if not cache_file:
@@ -150,37 +288,32 @@ def filter_messages(channel, filter_type="today", pattern=None, limit=None):
     messages = data['messages']
     print(f"📁 Using cache: {cache_file.name} ({len(messages)} messages)")
 
-    # Date filtering
-    filtered = []
-    target_date = None
+    search_hits = []
+    if hybrid and pattern:
+        search_hits = hybrid_search(channel, cache_file, data, filter_type, pattern)
 
-    if filter_type == "today":
-        target_date = datetime.now().strftime('%Y-%m-%d')
-        filtered = [m for m in messages if m['date_msk'].startswith(target_date)]
-    elif filter_type == "yesterday":
-        target_date = (datetime.now() - timedelta(days=1)).strftime('%Y-%m-%d')
-        filtered = [m for m in messages if m['date_msk'].startswith(target_date)]
-    elif filter_type.startswith("last:"):
-        days = int(filter_type.split(':')[1])
-        cutoff = datetime.now() - timedelta(days=days)
-        filtered = [m for m in messages
-                   if datetime.strptime(m['date_msk'], '%Y-%m-%d %H:%M:%S') >= cutoff]
-    elif filter_type == "all":
-        filtered = messages
-    else:
-        # Assume it's a date in YYYY-MM-DD format
-        target_date = filter_type
-        filtered = [m for m in messages if m['date_msk'].startswith(filter_type)]
+    # Date filtering
+    target_date = filter_target_date(filter_type)
+    matches_date = message_matcher(filter_type)
+    filtered = [m for m in messages if matches_date(m)]
 
     # Perform fallback border detection for single-date filters
     if target_date and filtered:
         print(f"📍 Border detection triggered for {target_date} with {len(filtered)} filtered messages")
-        validate_border_detection(messages, filtered, target_date, channel)
+        validate_border_detection(messages, filtered, target_date, channel, cache_file)
+
+    if search_hits:
+        known = {m['id'] for m in filtered}
+        filtered = sorted(
+            filtered + [m for m in search_hits if m['id'] not in known and matches_date(m)],
+            key=lambda m: m['id'],
+            reverse=True
+        )
 
     # Pattern filtering
     if pattern:
-        filtered = [m for m in filtered
-                   if re.search(pattern, m['text'], re.IGNORECASE)]
+        matches_text = message_matcher("all", pattern)
+        filtered = [m for m in filtered if matches_text(m)]
 
     # Limit results
     if limit:
@@ -240,32 +373,73 @@ def display_messages(messages, channel=None, group_by_date=True):
 
     print(f"\n📊 Total: {len(messages)} messages")
 
+def display_threads(messages, channel):
+    """Display messages grouped into reply threads, oldest thread first"""
+    if not messages:
+        print("📭 No messages found")
+        return
+
+    from thread_index import ThreadIndex
+
+    index = ThreadIndex(channel)
+    index.add_messages(messages)  # In-memory only: covers replies not indexed yet
+
+    by_id = {msg['id']: msg for msg in messages}
+    groups = {}
+    for message_id in sorted(by_id):
+        groups.setdefault(index.root_of(message_id), set()).add(message_id)
+
+    for root, members in groups.items():
+        root_msg = by_id.get(root)
+        label = root_msg['date_msk'] if root_msg else "root not in selection"
+        print(f"\n🧵 Thread #{root} ({len(members)} messages, {label})")
+
+        for message_id, depth in index.thread_ids(root):
+            if message_id not in members:
+                continue
+            msg = by_id[message_id]
+            indent = "    " * (depth + 1)
+            print(f"{indent}[{msg['date_msk']}] #{message_id} {msg['sender']}: {msg['text']}")
+
+    print(f"\n📊 Total: {len(messages)} messages in {len(groups)} threads")
+
 def main():
-    if len(sys.argv) < 2:
-        print("Usage: python telegram_filter.py <channel> [filter] [pattern] [limit]")
+    args = [a for a in sys.argv[1:] if not a.startswith('--')]
+    hybrid = "--hybrid" in sys.argv
+    threads = "--threads" in sys.argv
+
+    if not args:
+        print("Usage: python telegram_filter.py <channel> [filter] [pattern] [limit] [--hybrid] [--threads]")
         print("\nFilters:")
         print("  today      - Messages from today")
         print("  yesterday  - Messages from yesterday")
         print("  last:7     - Messages from last 7 days")
         print("  2025-09-15 - Messages from specific date")
         print("  all        - All cached messages")
+        print("\nOptions:")
+        print("  --hybrid   - Search Telegram server-side for ranges the cache does not cover")
+        print("  --threads  - Group messages into reply threads")
         print("\nExamples:")
         print("  python telegram_filter.py aiclubsweggs today")
         print("  python telegram_filter.py aiclubsweggs last:3 'gemini'")
         print("  python telegram_filter.py aiclubsweggs 2025-09-15")
+        print("  python telegram_filter.py aiclubsweggs all 'gemini' '' --hybrid")
         sys.exit(1)
 
-    channel = sys.argv[1]
+    channel = args[0]
     if not channel.startswith('@'):
         channel = f'@{channel}'
 
-    filter_type = sys.argv[2] if len(sys.argv) > 2 else "today"
-    pattern = sys.argv[3] if len(sys.argv) > 3 and sys.argv[3] else None
-    limit = int(sys.argv[4]) if len(sys.argv) > 4 and sys.argv[4] else None
+    filter_type = args[1] if len(args) > 1 else "today"
+    pattern = args[2] if len(args) > 2 and args[2] else None
+    limit = int(args[3]) if len(args) > 3 and args[3] else None
 
     try:
-        messages = filter_messages(channel, filter_type, pattern, limit)
-        display_messages(messages, channel)
+        messages = filter_messages(channel, filter_type, pattern, limit, hybrid=hybrid)
+        if threads:
+            display_threads(messages, channel)
+        else:
+            display_messages(messages, channel)
     except Exception as e:
         print(f"❌ Error: {str(e)}", file=sys.stderr)
         sys.exit(1)
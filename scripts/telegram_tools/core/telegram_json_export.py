@@ -4,11 +4,33 @@ Telegram JSON Export - Raw JSON message range extractor
 Export filtered messages as raw JSON for analysis and verification
 """
 
+import csv
 import json
 import sys
-from datetime import datetime, timedelta
+from collections import Counter
+from datetime import datetime
 from pathlib import Path
 
+from message_index import MessageIndex
+from telegram_filter import message_matcher
+
+EXPORT_FORMATS = ("json", "ndjson", "csv", "parquet", "arrow", "chunks")
+
+# Column order for csv/columnar exports when --fields is not given
+DEFAULT_FIELDS = [
+    "id", "date_utc", "date_msk", "text", "sender", "sender_id",
+    "views", "forwards", "reply_to_id", "media_info"
+]
+
+# Rows per Arrow record batch written from the filter stream
+RECORD_BATCH_SIZE = 10000
+
+# Default token budget per chunk for LLM analysis exports
+DEFAULT_TOKEN_BUDGET = 8000
+OCR_SNIPPET_CHARS = 300
+
+MEDIA_MARKERS = ('📷 [Photo]', '📎 [File]', '📦 [Media]')
+
 def find_latest_cache(channel):
     """Find the most recent cache file for a channel"""
     cache_dir = Path(__file__).parent.parent.parent.parent / "telegram_cache"
@@ -17,66 +39,315 @@ def find_latest_cache(channel):
     cache_files = sorted(cache_dir.glob(f"{clean_channel}_*.json"))
     return cache_files[-1] if cache_files else None
 
-def filter_messages_json(channel, filter_type="today"):
-    """Filter cached messages and return raw JSON"""
+def iter_filtered_messages(channel, filter_type="today"):
+    """Yield cached messages matching the filter, in cache order (newest first)"""
 
     cache_file = find_latest_cache(channel)
     if not cache_file:
         print(f"❌ No cache found for {channel}. Run: python telegram_fetch.py {channel}", file=sys.stderr)
-        return []
-
-    # Load cache
-    with open(cache_file, 'r', encoding='utf-8') as f:
-        data = json.load(f)
-
-    messages = data['messages']
-
-    # Date filtering
-    filtered = []
-    if filter_type == "today":
-        today = datetime.now().strftime('%Y-%m-%d')
-        filtered = [m for m in messages if m['date_msk'].startswith(today)]
-    elif filter_type == "yesterday":
-        yesterday = (datetime.now() - timedelta(days=1)).strftime('%Y-%m-%d')
-        filtered = [m for m in messages if m['date_msk'].startswith(yesterday)]
-    elif filter_type.startswith("last:"):
-        days = int(filter_type.split(':')[1])
-        cutoff = datetime.now() - timedelta(days=days)
-        filtered = [m for m in messages
-                   if datetime.strptime(m['date_msk'], '%Y-%m-%d %H:%M:%S') >= cutoff]
-    elif filter_type == "all":
-        filtered = messages
-    else:
-        # Assume it's a date in YYYY-MM-DD format
-        filtered = [m for m in messages if m['date_msk'].startswith(filter_type)]
+        return
+
+    # Read message by message through the offset index instead of loading the whole cache
+    matches = message_matcher(filter_type)
+    with MessageIndex(cache_file.parent) as index:
+        for message in index.iter_file_messages(channel, cache_file):
+            if matches(message):
+                yield message
+
+def stream_full_export(channel, filter_type, messages, out=None):
+    """Write the --full export incrementally: meta header, then one message at a time
+
+    Output is the same indented JSON document shape as before, except that the
+    message count is written after the array (it is only known at the end).
+    """
+    out = out or sys.stdout
+    meta = {
+        "channel": channel,
+        "filter": filter_type,
+        "exported_at": datetime.now().isoformat()
+    }
+    meta_json = json.dumps(meta, indent=2, ensure_ascii=False).replace('\n', '\n  ')
+    out.write(f'{{\n  "meta": {meta_json},\n  "messages": [')
+    out.flush()
+
+    total = 0
+    for message in messages:
+        encoded = json.dumps(message, indent=2, ensure_ascii=False).replace('\n', '\n    ')
+        out.write(f'{"," if total else ""}\n    {encoded}')
+        out.flush()
+        total += 1
+
+    closing = "\n  ]" if total else "]"
+    out.write(f'{closing},\n  "total_messages": {total}\n}}\n')
+    out.flush()
+    return total
+
+def export_range_summary(messages, top_senders=5):
+    """Single-pass range summary over any message iterable (no sorting)
+
+    Tracks first/last message, per-day and media counts, top senders, max
+    views and the id range with the number of ids missing inside it.
+    """
+    total = 0
+    first = last = None
+    per_day = Counter()
+    senders = Counter()
+    media_count = 0
+    max_views = None
+    min_id = max_id = None
 
-    return filtered
+    for message in messages:
+        total += 1
+        date_msk = message['date_msk']
+        if first is None or date_msk < first['date_msk']:
+            first = message
+        if last is None or date_msk >= last['date_msk']:
+            last = message
 
-def export_range_summary(messages):
-    """Export first/last message summary from raw JSON"""
-    if not messages:
+        per_day[date_msk[:10]] += 1
+        senders[message.get('sender', 'Unknown')] += 1
+        if message.get('media_info') or message.get('text', '').startswith(MEDIA_MARKERS):
+            media_count += 1
+
+        views = message.get('views')
+        if views is not None and (max_views is None or views > max_views):
+            max_views = views
+
+        message_id = message['id']
+        min_id = message_id if min_id is None else min(min_id, message_id)
+        max_id = message_id if max_id is None else max(max_id, message_id)
+
+    if not total:
         return {
             "total": 0,
             "first_message": None,
             "last_message": None
         }
 
-    # Messages are sorted newest first, so reverse for chronological order
-    chronological = sorted(messages, key=lambda x: x['date_msk'])
-
     return {
-        "total": len(messages),
-        "first_message": chronological[0],
-        "last_message": chronological[-1],
+        "total": total,
+        "first_message": first,
+        "last_message": last,
         "time_range": {
-            "start": chronological[0]['date_msk'],
-            "end": chronological[-1]['date_msk']
+            "start": first['date_msk'],
+            "end": last['date_msk']
+        },
+        "per_day": dict(sorted(per_day.items())),
+        "media_messages": media_count,
+        "top_senders": [{"sender": name, "messages": n} for name, n in senders.most_common(top_senders)],
+        "max_views": max_views,
+        "id_range": {
+            "min": min_id,
+            "max": max_id,
+            # Ids are unique within a cache file, so this counts the holes
+            "missing_ids": max_id - min_id + 1 - total
         }
     }
 
+def project(message, fields):
+    """Keep only the requested fields (all of them when fields is None)"""
+    if not fields:
+        return message
+    return {field: message.get(field) for field in fields}
+
+def write_ndjson(messages, fields, out):
+    """One compact JSON object per line"""
+    total = 0
+    for message in messages:
+        out.write(json.dumps(project(message, fields), ensure_ascii=False) + "\n")
+        total += 1
+    return total
+
+def write_csv(messages, fields, out):
+    """CSV with a header row; nested values (media_info) are JSON-encoded"""
+    fields = fields or DEFAULT_FIELDS
+    writer = csv.DictWriter(out, fieldnames=fields, extrasaction='ignore')
+    writer.writeheader()
+
+    total = 0
+    for message in messages:
+        row = project(message, fields)
+        writer.writerow({
+            key: json.dumps(value, ensure_ascii=False) if isinstance(value, (dict, list)) else value
+            for key, value in row.items()
+        })
+        total += 1
+    return total
+
+def arrow_schema(fields):
+    """Typed Arrow schema for the cache message fields"""
+    import pyarrow as pa
+
+    types = {
+        "id": pa.int64(),
+        "date_utc": pa.timestamp("s", tz="UTC"),
+        "date_msk": pa.timestamp("s"),
+        "sender_id": pa.int64(),
+        "views": pa.int64(),
+        "forwards": pa.int64(),
+        "reply_to_id": pa.int64(),
+    }
+    return pa.schema([(field, types.get(field, pa.string())) for field in fields])
+
+def arrow_value(field, value):
+    """Convert a cache value into something Arrow accepts for the schema type"""
+    if value is None:
+        return None
+    if field == "date_utc":
+        return datetime.fromisoformat(value.replace('Z', '+00:00'))
+    if field == "date_msk":
+        return datetime.strptime(value, '%Y-%m-%d %H:%M:%S')
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, ensure_ascii=False)
+    return value
+
+def write_columnar(messages, fields, output, fmt):
+    """Write Parquet or Arrow IPC in record batches straight from the message stream"""
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise RuntimeError("pyarrow not found. Install with: pip install pyarrow")
+
+    fields = fields or DEFAULT_FIELDS
+    schema = arrow_schema(fields)
+
+    if fmt == "parquet":
+        writer = pq.ParquetWriter(output, schema, compression="zstd")
+    else:
+        writer = pa.ipc.new_file(output, schema)
+
+    total = 0
+    batch = {field: [] for field in fields}
+    try:
+        for message in messages:
+            for field in fields:
+                batch[field].append(arrow_value(field, message.get(field)))
+            total += 1
+
+            if total % RECORD_BATCH_SIZE == 0:
+                writer.write_batch(pa.RecordBatch.from_pydict(batch, schema=schema))
+                batch = {field: [] for field in fields}
+
+        if batch[fields[0]]:
+            writer.write_batch(pa.RecordBatch.from_pydict(batch, schema=schema))
+    finally:
+        writer.close()
+
+    return total
+
+def export_messages(messages, fmt, fields=None, output=None):
+    """Export a message stream in one of the flat/columnar formats"""
+    if fmt in ("parquet", "arrow"):
+        if not output:
+            raise ValueError(f"--format={fmt} requires --output=PATH")
+        return write_columnar(messages, fields, output, fmt)
+
+    out = open(output, 'w', encoding='utf-8', newline='') if output else sys.stdout
+    try:
+        if fmt == "ndjson":
+            return write_ndjson(messages, fields, out)
+        return write_csv(messages, fields, out)
+    finally:
+        if output:
+            out.close()
+
+def estimate_tokens(text):
+    """Cheap local token estimate: ~4 chars/token for ASCII, ~2 for other scripts
+
+    Deliberately errs on the high side so chunks stay under real model limits.
+    """
+    ascii_chars = sum(1 for ch in text if ord(ch) < 128)
+    other_chars = len(text) - ascii_chars
+    return ascii_chars // 4 + other_chars // 2 + 1
+
+def render_compact(message, ocr_entry=None):
+    """Compact one-message text rendering for LLM prompts"""
+    line = f"[{message['date_msk'][:16]}] #{message['id']} {message.get('sender', 'Unknown')}: {message.get('text', '')}"
+    if message.get('reply_to_id'):
+        line += f" (reply to #{message['reply_to_id']})"
+    if ocr_entry:
+        ocr_text = ' '.join((ocr_entry.get('ocr_text') or '').split())
+        if ocr_text:
+            if len(ocr_text) > OCR_SNIPPET_CHARS:
+                ocr_text = ocr_text[:OCR_SNIPPET_CHARS - 3] + '...'
+            line += f"\n  OCR: {ocr_text}"
+    return line
+
+def write_llm_chunks(channel, filter_type, messages, output_dir, token_budget=DEFAULT_TOKEN_BUDGET):
+    """Split a compact chronological rendering into chunks under a token budget
+
+    Writes chunk_NNN.txt files plus manifest.json and returns the manifest path.
+    A single message larger than the budget is truncated to fit its own chunk.
+    """
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    ocr_cache = None
+    try:
+        from telegram_filter import get_ocr_cache
+        ocr_cache = get_ocr_cache()
+    except Exception as exc:
+        print(f"⚠️  Unable to load OCR cache: {exc}", file=sys.stderr)
+
+    chunks = []
+    current, current_tokens, current_meta = [], 0, []
+
+    def flush():
+        if not current:
+            return
+        path = output_dir / f"chunk_{len(chunks) + 1:03d}.txt"
+        path.write_text("\n".join(current) + "\n", encoding='utf-8')
+        chunks.append({
+            "path": str(path),
+            "messages": len(current),
+            "tokens": current_tokens,
+            "first_id": current_meta[0]['id'],
+            "last_id": current_meta[-1]['id'],
+            "start": current_meta[0]['date_msk'],
+            "end": current_meta[-1]['date_msk']
+        })
+
+    # Cache order is newest first; LLM prompts read better chronologically
+    for message in sorted(messages, key=lambda m: m['id']):
+        entry = ocr_cache.get_entry(channel, message['id']) if ocr_cache and message.get('media_info') else None
+        line = render_compact(message, entry)
+        tokens = estimate_tokens(line)
+
+        if tokens > token_budget:
+            keep = max(1, len(line) * token_budget // tokens - 3)
+            line = line[:keep] + '...'
+            tokens = estimate_tokens(line)
+
+        if current and current_tokens + tokens > token_budget:
+            flush()
+            current, current_tokens, current_meta = [], 0, []
+
+        current.append(line)
+        current_tokens += tokens
+        current_meta.append(message)
+    flush()
+
+    manifest = {
+        "channel": channel,
+        "filter": filter_type,
+        "exported_at": datetime.now().isoformat(),
+        "token_budget": token_budget,
+        "token_estimator": "chars/4 ascii + chars/2 non-ascii",
+        "total_messages": sum(c['messages'] for c in chunks),
+        "total_tokens": sum(c['tokens'] for c in chunks),
+        "chunks": chunks
+    }
+    manifest_path = output_dir / "manifest.json"
+    manifest_path.write_text(json.dumps(manifest, indent=2, ensure_ascii=False), encoding='utf-8')
+    return manifest_path
+
 def main():
-    if len(sys.argv) < 2:
-        print("Usage: python telegram_json_export.py <channel> [filter] [--summary|--full]")
+    args = [a for a in sys.argv[1:] if not a.startswith('--')]
+    options = dict(a[2:].split('=', 1) for a in sys.argv[1:] if a.startswith('--') and '=' in a)
+
+    if not args:
+        print("Usage: python telegram_json_export.py <channel> [filter] [--summary|--full] [--format=FORMAT] [--fields=a,b] [--output=PATH]")
         print("\nFilters:")
         print("  today      - Messages from today")
         print("  yesterday  - Messages from yesterday")
@@ -85,37 +356,56 @@ def main():
         print("  all        - All cached messages")
         print("\nOutput modes:")
         print("  --summary  - First/last message summary (default)")
-        print("  --full     - Complete JSON export")
+        print("  --full     - Complete JSON export (streamed, total_messages follows the array)")
+        print("\nExport formats (imply a full export):")
+        print("  --format=ndjson|csv|parquet|arrow")
+        print("  --fields=id,date_utc,text,views   Column projection")
+        print("  --output=PATH                      Required for parquet/arrow (needs pyarrow)")
+        print("\nLLM chunks:")
+        print("  --format=chunks [--token-budget=N] [--output=DIR]")
+        print("      Compact text chunks under N estimated tokens + manifest.json (path printed on stdout)")
         print("\nExamples:")
         print("  python telegram_json_export.py aiclubsweggs today --summary")
         print("  python telegram_json_export.py aiclubsweggs today --full")
+        print("  python telegram_json_export.py aiclubsweggs all --format=ndjson --fields=id,date_utc,text")
+        print("  python telegram_json_export.py aiclubsweggs last:30 --format=parquet --output=aiclub.parquet")
+        print("  python telegram_json_export.py aiclubsweggs today --format=chunks --token-budget=6000")
         sys.exit(1)
 
-    channel = sys.argv[1]
+    channel = args[0]
     if not channel.startswith('@'):
         channel = f'@{channel}'
 
-    filter_type = sys.argv[2] if len(sys.argv) > 2 else "today"
-    output_mode = sys.argv[3] if len(sys.argv) > 3 else "--summary"
+    filter_type = args[1] if len(args) > 1 else "today"
+    fmt = options.get('format', 'json')
+    fields = [f.strip() for f in options['fields'].split(',') if f.strip()] if options.get('fields') else None
 
-    try:
-        messages = filter_messages_json(channel, filter_type)
+    if fmt not in EXPORT_FORMATS:
+        print(f"❌ Unknown format: {fmt} (choose from {', '.join(EXPORT_FORMATS)})", file=sys.stderr)
+        sys.exit(1)
 
-        if output_mode == "--summary":
-            summary = export_range_summary(messages)
+    try:
+        if fmt == "chunks":
+            output_dir = options.get('output') or (
+                Path(__file__).parent.parent.parent.parent / "telegram_cache" / "llm_chunks"
+                / f"{channel.replace('@', '')}_{filter_type.replace(':', '_')}_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+            )
+            token_budget = int(options.get('token-budget', DEFAULT_TOKEN_BUDGET))
+            manifest_path = write_llm_chunks(
+                channel, filter_type, iter_filtered_messages(channel, filter_type), output_dir, token_budget
+            )
+            print(manifest_path)
+        elif fmt != "json":
+            total = export_messages(iter_filtered_messages(channel, filter_type), fmt, fields, options.get('output'))
+            if options.get('output'):
+                print(f"✅ Exported {total} messages to {options['output']} ({fmt})", file=sys.stderr)
+        elif "--full" not in sys.argv:
+            summary = export_range_summary(iter_filtered_messages(channel, filter_type))
             print(json.dumps(summary, indent=2, ensure_ascii=False))
         else:
-            # Full JSON export
-            export_data = {
-                "meta": {
-                    "channel": channel,
-                    "filter": filter_type,
-                    "exported_at": datetime.now().isoformat(),
-                    "total_messages": len(messages)
-                },
-                "messages": messages
-            }
-            print(json.dumps(export_data, indent=2, ensure_ascii=False))
+            # Full JSON export, streamed so consumers can start reading immediately
+            messages = (project(m, fields) for m in iter_filtered_messages(channel, filter_type))
+            stream_full_export(channel, filter_type, messages)
 
     except Exception as e:
         print(f"❌ Error: {str(e)}", file=sys.stderr)
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Telegram Timeline - Chronologically merged view over several channels
+k-way heap merge of per-channel sorted streams from the cache
+"""
+
+import heapq
+import json
+import sys
+from datetime import datetime
+
+from message_index import MessageIndex
+from telegram_filter import find_latest_cache, message_matcher
+
+
+def iter_channel_messages(channel, matches):
+    """Yield one channel's cached messages oldest first, tagged with the channel"""
+    cache_file = find_latest_cache(channel)
+    if not cache_file:
+        print(f"⚠️  No cache found for {channel}, skipping", file=sys.stderr)
+        return
+
+    # Cache files are newest first; walk the indexed offsets backwards for chronological order
+    with MessageIndex(cache_file.parent) as index:
+        for msg in index.iter_file_messages(channel, cache_file, newest_first=False):
+            if matches(msg):
+                yield dict(msg, channel=channel)
+
+
+def merge_streams(streams):
+    """k-way merge of chronologically sorted message streams
+
+    Only the current head of each stream sits on the heap, so the merge holds
+    one message per channel regardless of how many messages flow through.
+    """
+    return heapq.merge(*streams, key=lambda m: (m['date_utc'], m['id']))
+
+
+def merged_timeline(channels, filter_type="today", pattern=None):
+    """Chronologically merged stream of filtered messages from several channels"""
+    matches = message_matcher(filter_type, pattern)
+    return merge_streams(iter_channel_messages(channel, matches) for channel in channels)
+
+
+def display_timeline(messages, limit=None):
+    """Print a merged timeline grouped by Moscow date"""
+    current_date = None
+    total = 0
+
+    for msg in messages:
+        if limit is not None and total >= limit:
+            break
+
+        msg_date, time_part = msg['date_msk'].split()
+        if current_date != msg_date:
+            current_date = msg_date
+            weekday = datetime.strptime(msg_date, '%Y-%m-%d').strftime('%A')
+            print(f"\n==== {msg_date} ({weekday}) ====")
+
+        print(f"[{time_part}] {msg['channel']} | {msg['sender']}: {msg['text']}")
+        total += 1
+
+    if total == 0:
+        print("📭 No messages found")
+        return
+
+    print(f"\n📊 Total: {total} messages")
+
+
+def main():
+    args = [a for a in sys.argv[1:] if not a.startswith('--')]
+    options = dict(a[2:].split('=', 1) for a in sys.argv[1:] if a.startswith('--') and '=' in a)
+    as_json = "--json" in sys.argv
+
+    if len(args) < 2:
+        print("Usage: python telegram_timeline.py <filter> <channel> [channel...] [--pattern=REGEX] [--limit=N] [--json]")
+        print("\nFilters: today, yesterday, last:N, YYYY-MM-DD, all")
+        print("\nExamples:")
+        print("  python telegram_timeline.py today aiclubsweggs llm_under_hood")
+        print("  python telegram_timeline.py last:3 aiclubsweggs llm_under_hood --pattern=gemini --json")
+        sys.exit(1)
+
+    filter_type = args[0]
+    channels = [c if c.startswith('@') else f'@{c}' for c in args[1:]]
+    pattern = options.get('pattern')
+    limit = int(options['limit']) if options.get('limit') else None
+
+    try:
+        timeline = merged_timeline(channels, filter_type, pattern)
+        if as_json:
+            # One JSON object per line so consumers can stream the timeline
+            for count, msg in enumerate(timeline):
+                if limit is not None and count >= limit:
+                    break
+                print(json.dumps(msg, ensure_ascii=False))
+        else:
+            display_timeline(timeline, limit)
+    except Exception as e:
+        print(f"❌ Error: {str(e)}", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
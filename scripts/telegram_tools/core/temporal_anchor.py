@@ -6,64 +6,133 @@ Implements RTM requirements FR-003, TR-003
 
 import json
 import os
-from datetime import datetime, timedelta
+from bisect import bisect_left
+from datetime import datetime, time, timedelta
 from pathlib import Path
 import pytz
 
 
+# Above this many anchors the store switches to one file per channel
+SHARD_THRESHOLD = 2000
+
+# Slack (in message ids) around an interpolated estimate: start this far above
+# an estimated end of day so a low estimate cannot cut off the day's newest messages
+ESTIMATE_MARGIN = 200
+
+
+def _write_json_atomic(path, data):
+    """Write JSON to a temp file beside `path` and rename it over the original"""
+    tmp_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    try:
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, indent=2, ensure_ascii=False)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    finally:
+        if tmp_path.exists():
+            tmp_path.unlink()
+
+
 class TemporalAnchor:
-    """Manages temporal anchor points for message fetching"""
+    """Manages temporal anchor points for message fetching
 
-    def __init__(self, base_dir=None):
+    Changes are kept in memory and written by flush(); batch updates
+    (update_anchor_from_messages, cleanup_old_anchors) flush once per batch.
+    """
+
+    def __init__(self, base_dir=None, sharded=None):
         if base_dir is None:
             base_dir = Path(__file__).parent.parent.parent.parent / "telegram_cache"
 
         self.base_dir = Path(base_dir)
         self.anchors_file = self.base_dir / "anchors.json"
+        self.shard_dir = self.base_dir / "anchors"
         self.moscow_tz = pytz.timezone('Europe/Moscow')
 
         # Ensure base directory exists
         self.base_dir.mkdir(parents=True, exist_ok=True)
 
+        # Channels changed in memory since the last flush
+        self._dirty = set()
+
         # Load existing anchors
         self.anchors = self._load_anchors()
+        self._id_index = {}
 
-    def _load_anchors(self):
-        """Load anchor data from file"""
-        if not self.anchors_file.exists():
-            return {}
+        if sharded is None:
+            sharded = self.shard_dir.is_dir() or sum(map(len, self.anchors.values())) >= SHARD_THRESHOLD
+        self.sharded = sharded
+        if self.sharded and self.anchors_file.exists():
+            # Move everything out of the single file on the next flush
+            self._dirty.update(self.anchors)
+
+    def _shard_path(self, clean_channel):
+        return self.shard_dir / f"{clean_channel.replace('/', '_')}.json"
 
+    def _read_json(self, path):
         try:
-            with open(self.anchors_file, 'r', encoding='utf-8') as f:
+            with open(path, 'r', encoding='utf-8') as f:
                 return json.load(f)
         except (json.JSONDecodeError, IOError) as e:
-            print(f"⚠️  Warning: Could not load anchors.json: {e}")
-            return {}
+            print(f"⚠️  Warning: Could not load {path.name}: {e}")
+            return None
 
-    def _save_anchors(self):
-        """Save anchor data to file"""
-        try:
-            # Create backup first
-            if self.anchors_file.exists():
-                backup_file = self.anchors_file.with_suffix('.json.backup')
-                self.anchors_file.rename(backup_file)
+    def _load_anchors(self):
+        """Load anchor data from anchors.json and any per-channel shards"""
+        anchors = {}
+        backup_file = self.anchors_file.with_suffix('.json.backup')
+        if self.anchors_file.exists():
+            anchors = self._read_json(self.anchors_file) or {}
+        elif backup_file.exists():
+            # Left behind by a save that died before writes were atomic
+            anchors = self._read_json(backup_file) or {}
+            self._dirty.update(anchors)
+
+        if self.shard_dir.is_dir():
+            for shard_file in sorted(self.shard_dir.glob('*.json')):
+                shard = self._read_json(shard_file)
+                if shard:
+                    anchors[shard['channel']] = shard['anchors']
+        return anchors
+
+    def flush(self):
+        """Write changed channels to disk; returns False if the write failed"""
+        if not self._dirty:
+            return True
 
-            with open(self.anchors_file, 'w', encoding='utf-8') as f:
-                json.dump(self.anchors, f, indent=2, ensure_ascii=False)
+        try:
+            if self.sharded:
+                self.shard_dir.mkdir(exist_ok=True)
+                for clean_channel in self._dirty:
+                    shard_path = self._shard_path(clean_channel)
+                    if self.anchors.get(clean_channel):
+                        _write_json_atomic(shard_path, {'channel': clean_channel, 'anchors': self.anchors[clean_channel]})
+                    elif shard_path.exists():
+                        shard_path.unlink()
+                if self.anchors_file.exists():
+                    self.anchors_file.unlink()
+            else:
+                # Re-read so channels saved by other processes since we loaded survive
+                on_disk = (self._read_json(self.anchors_file) if self.anchors_file.exists() else None) or {}
+                for clean_channel in self._dirty:
+                    if self.anchors.get(clean_channel):
+                        on_disk[clean_channel] = self.anchors[clean_channel]
+                    else:
+                        on_disk.pop(clean_channel, None)
+                _write_json_atomic(self.anchors_file, on_disk)
+                self.anchors = on_disk
+                self._id_index.clear()
 
-            # Remove backup on successful save
             backup_file = self.anchors_file.with_suffix('.json.backup')
             if backup_file.exists():
                 backup_file.unlink()
 
+            self._dirty.clear()
             return True
 
-        except Exception as e:
+        except OSError as e:
             print(f"❌ Failed to save anchors: {e}")
-            # Restore backup if available
-            backup_file = self.anchors_file.with_suffix('.json.backup')
-            if backup_file.exists():
-                backup_file.rename(self.anchors_file)
             return False
 
     def get_moscow_date(self, dt=None):
@@ -76,6 +145,26 @@ class TemporalAnchor:
 
         return dt.date()
 
+    def _put_anchor(self, clean_channel, date, message_id, timestamp_str, **extra):
+        """Store an anchor in memory (no save); returns False if it was already identical"""
+        channel_anchors = self.anchors.setdefault(clean_channel, {})
+        existing = channel_anchors.get(date.isoformat())
+        if existing and existing.get('message_id') == message_id and all(existing.get(k) == v for k, v in extra.items()):
+            return False
+
+        self._id_index.pop(clean_channel, None)
+        self._dirty.add(clean_channel)
+
+        channel_anchors[date.isoformat()] = {
+            'message_id': message_id,
+            'timestamp': timestamp_str,
+            'date': date.isoformat(),
+            'created_at': datetime.now(self.moscow_tz).isoformat(),
+            'anchor_version': '1.1' if extra else '1.0',
+            **extra
+        }
+        return True
+
     def set_anchor(self, channel, message_id, timestamp, date=None):
         """Set anchor point for a channel"""
         if date is None:
@@ -83,27 +172,15 @@ class TemporalAnchor:
 
         clean_channel = channel.replace('@', '')
 
-        # Ensure channel entry exists
-        if clean_channel not in self.anchors:
-            self.anchors[clean_channel] = {}
-
         # Convert timestamp to string if it's a datetime
         if isinstance(timestamp, datetime):
             timestamp_str = timestamp.strftime('%H:%M:%S')
         else:
             timestamp_str = str(timestamp)
 
-        anchor_data = {
-            'message_id': message_id,
-            'timestamp': timestamp_str,
-            'date': date.isoformat(),
-            'created_at': datetime.now(self.moscow_tz).isoformat(),
-            'anchor_version': '1.0'
-        }
-
-        self.anchors[clean_channel][date.isoformat()] = anchor_data
+        self._put_anchor(clean_channel, date, message_id, timestamp_str)
 
-        if self._save_anchors():
+        if self.flush():
             print(f"✅ Set anchor for {channel} on {date}: message {message_id} at {timestamp_str}")
             return True
         else:
@@ -134,6 +211,96 @@ class TemporalAnchor:
         prev_date = date - timedelta(days=1)
         return self.get_anchor(channel, prev_date)
 
+    def day_id_window(self, channel, date):
+        """Exclusive (min_id, max_id) bounds for the messages of `date`
+
+        Ids grow with time, so any message of an earlier day bounds the date
+        from below and any message of a later day bounds it from above; the
+        nearest anchors give the tightest window. A complete anchor for the
+        date itself gives the exact window. 0 means unbounded.
+        """
+        clean_channel = channel.replace('@', '')
+        channel_anchors = self.anchors.get(clean_channel, {})
+        date_str = date.isoformat()
+
+        anchor = channel_anchors.get(date_str)
+        if anchor and anchor.get('complete'):
+            return {
+                'min_id': anchor['first_message_id'] - 1,
+                'max_id': anchor['last_message_id'] + 1,
+                'complete': True
+            }
+
+        min_id = max_id = 0
+        earlier = [d for d in channel_anchors if d < date_str]
+        later = [d for d in channel_anchors if d > date_str]
+        if earlier:
+            before = channel_anchors[max(earlier)]
+            min_id = before['last_message_id'] if before.get('complete') else before['message_id']
+        if later:
+            max_id = channel_anchors[min(later)]['message_id']
+
+        return {'min_id': min_id, 'max_id': max_id, 'complete': False}
+
+    def id_index(self, channel):
+        """Sorted [(unix_seconds, message_id)] from every anchor point of a channel
+
+        Complete anchors contribute both their first and last message; older
+        anchors contribute their single message.
+        """
+        clean_channel = channel.replace('@', '')
+        if clean_channel in self._id_index:
+            return self._id_index[clean_channel]
+
+        points = set()
+        for date_str, anchor in self.anchors.get(clean_channel, {}).items():
+            pairs = [(anchor.get('timestamp'), anchor.get('message_id'))]
+            if anchor.get('complete'):
+                pairs = [
+                    (anchor.get('first_timestamp'), anchor.get('first_message_id')),
+                    (anchor.get('last_timestamp'), anchor.get('last_message_id'))
+                ]
+            for timestamp_str, message_id in pairs:
+                try:
+                    moment = self.moscow_tz.localize(datetime.strptime(f"{date_str} {timestamp_str}", '%Y-%m-%d %H:%M:%S'))
+                except (TypeError, ValueError):
+                    continue
+                points.add((int(moment.timestamp()), int(message_id)))
+
+        index = sorted(points)
+        self._id_index[clean_channel] = index
+        return index
+
+    def estimate_message_id(self, channel, when):
+        """Estimate the id of the message posted at `when` from surrounding anchors
+
+        Interpolates linearly between the anchors just before and after `when`;
+        outside the anchored range the nearest anchor id is returned. `when` is a
+        datetime (naive values are Moscow time) or a date (its 00:00 MSK).
+        Returns None without anchors.
+        """
+        index = self.id_index(channel)
+        if not index:
+            return None
+
+        if not isinstance(when, datetime):
+            when = datetime.combine(when, time.min)
+        if when.tzinfo is None:
+            when = self.moscow_tz.localize(when)
+        target = when.timestamp()
+
+        pos = bisect_left(index, (target, -1))
+        if pos < len(index) and index[pos][0] == target:
+            return {'message_id': index[pos][1], 'method': 'exact', 'lower': index[pos], 'upper': index[pos]}
+        if pos == 0:
+            return {'message_id': index[0][1], 'method': 'before_range', 'lower': None, 'upper': index[0]}
+        if pos == len(index):
+            return {'message_id': index[-1][1], 'method': 'after_range', 'lower': index[-1], 'upper': None}
+
+        (t0, id0), (t1, id1) = index[pos - 1], index[pos]
+        estimate = id0 + (id1 - id0) * (target - t0) / (t1 - t0)
+        return {'message_id': int(round(estimate)), 'method': 'interpolated', 'lower': index[pos - 1], 'upper': index[pos]}
+
     def calculate_fetch_offset(self, channel, target_date=None):
         """Calculate the best offset for fetching messages"""
         if target_date is None:
@@ -151,6 +318,16 @@ class TemporalAnchor:
                 'anchor_data': prev_anchor
             }
 
+        # Between two anchors: estimate the id where the target day ends and page back from there
+        estimate = self.estimate_message_id(channel, target_date + timedelta(days=1))
+        if estimate and estimate['method'] == 'interpolated':
+            return {
+                'strategy': 'interpolated',
+                'offset_id': estimate['message_id'] + ESTIMATE_MARGIN + 1,
+                'reason': f"Interpolated end of {target_date} between anchor ids {estimate['lower'][1]} and {estimate['upper'][1]}",
+                'anchor_data': None
+            }
+
         # If no anchor available, try to find the closest available anchor
         clean_channel = channel.replace('@', '')
         if clean_channel in self.anchors:
@@ -177,33 +354,68 @@ class TemporalAnchor:
             'anchor_data': None
         }
 
-    def update_anchor_from_messages(self, channel, messages, date=None):
-        """Update anchor based on fetched messages"""
+    def update_anchor_from_messages(self, channel, messages, date=None, complete_dates=()):
+        """Update anchors from a fetched batch in one pass and a single save
+
+        Every day that lies strictly inside the batch (an earlier and a later
+        day are both present) is complete, so its first and last message ids
+        are exact and recorded. So is any day in `complete_dates`, for callers
+        that fetched a whole day on their own. The requested date (today by
+        default) keeps getting its first-message anchor even while the day is
+        still running. Returns the number of anchors that changed.
+        """
         if not messages:
-            return False
+            return 0
 
         if date is None:
             date = self.get_moscow_date()
 
-        # Find the last message from the specified date
-        last_message = None
-        for msg in reversed(messages):  # Messages in reverse chronological order
-            msg_date_str = msg.get('date_msk', '').split()[0]
-            if msg_date_str == date.isoformat():
-                last_message = msg
-                break
-
-        if last_message:
-            # Extract time from timestamp
-            time_part = last_message['date_msk'].split()[1]
-            return self.set_anchor(
-                channel,
-                last_message['id'],
-                time_part,
-                date
+        # day -> [first_id, first_time, last_id, last_time]
+        days = {}
+        for msg in messages:
+            day_str, _, time_part = msg.get('date_msk', '').partition(' ')
+            if not time_part:
+                continue
+            bounds = days.get(day_str)
+            if bounds is None:
+                days[day_str] = [msg['id'], time_part, msg['id'], time_part]
+                continue
+            if msg['id'] < bounds[0]:
+                bounds[0], bounds[1] = msg['id'], time_part
+            if msg['id'] > bounds[2]:
+                bounds[2], bounds[3] = msg['id'], time_part
+
+        clean_channel = channel.replace('@', '')
+        ordered = sorted(days)
+        complete = set(ordered[1:-1]) | {d.isoformat() for d in complete_dates if d.isoformat() in days}
+        updated = 0
+        for day_str in sorted(complete):
+            first_id, first_time, last_id, last_time = days[day_str]
+            updated += self._put_anchor(
+                clean_channel,
+                datetime.strptime(day_str, '%Y-%m-%d').date(),
+                first_id,
+                first_time,
+                first_message_id=first_id,
+                first_timestamp=first_time,
+                last_message_id=last_id,
+                last_timestamp=last_time,
+                complete=True
             )
 
-        return False
+        current = days.get(date.isoformat())
+        if current and date.isoformat() not in complete:
+            existing = self.get_anchor(channel, date)
+            # Never replace a complete anchor with a partial view of the same day
+            if not (existing and existing.get('complete')):
+                updated += self._put_anchor(clean_channel, date, current[0], current[1])
+
+        if updated:
+            if not self.flush():
+                print(f"❌ Failed to save anchors for {channel}")
+                return 0
+            print(f"✅ Updated {updated} anchors for {channel} ({ordered[0]} → {ordered[-1]})")
+        return updated
 
     def validate_anchor(self, channel, date=None):
         """Validate an anchor by checking message continuity"""
@@ -276,17 +488,20 @@ class TemporalAnchor:
                     if anchor_date < cutoff_date:
                         del channel_data[date_str]
                         removed_count += 1
+                        self._dirty.add(clean_channel)
                 except ValueError:
                     # Remove invalid date entries
                     del channel_data[date_str]
                     removed_count += 1
+                    self._dirty.add(clean_channel)
 
             # Remove empty channel entries
             if not channel_data:
                 del self.anchors[clean_channel]
 
         if removed_count > 0:
-            self._save_anchors()
+            self._id_index.clear()
+            self.flush()
             print(f"✅ Cleaned up {removed_count} old anchors")
 
         return removed_count
@@ -338,15 +553,18 @@ Usage:
   python temporal_anchor.py set <channel> <message_id> <timestamp> [date]
   python temporal_anchor.py get <channel> [date]
   python temporal_anchor.py offset <channel> [date]
+  python temporal_anchor.py estimate <channel> <date> [HH:MM:SS]
   python temporal_anchor.py list [channel]
   python temporal_anchor.py validate <channel> [date]
   python temporal_anchor.py cleanup [days]
   python temporal_anchor.py stats
+  python temporal_anchor.py shard
 
 Examples:
   python temporal_anchor.py set @aiclubsweggs 72856 00:58:11
   python temporal_anchor.py get @aiclubsweggs 2025-09-15
   python temporal_anchor.py offset @aiclubsweggs
+  python temporal_anchor.py estimate @aiclubsweggs 2025-09-15 12:00:00
   python temporal_anchor.py list @aiclubsweggs
   python temporal_anchor.py validate @aiclubsweggs
   python temporal_anchor.py cleanup 90
@@ -419,6 +637,28 @@ Examples:
         print(f"  Offset ID: {offset_info['offset_id']}")
         print(f"  Reason: {offset_info['reason']}")
 
+    elif command == "estimate":
+        if len(sys.argv) < 4:
+            print("Error: estimate requires channel and date parameters")
+            sys.exit(1)
+
+        channel = sys.argv[2]
+        if not channel.startswith('@'):
+            channel = f'@{channel}'
+
+        clock = sys.argv[4] if len(sys.argv) > 4 else "00:00:00"
+        when = datetime.strptime(f"{sys.argv[3]} {clock}", '%Y-%m-%d %H:%M:%S')
+
+        estimate = ta.estimate_message_id(channel, when)
+        if not estimate:
+            print(f"No anchors found for {channel}")
+            sys.exit(1)
+        print(f"Estimated message ID for {channel} at {when}: {estimate['message_id']} ({estimate['method']})")
+        for side in ('lower', 'upper'):
+            if estimate[side]:
+                moment = datetime.fromtimestamp(estimate[side][0], ta.moscow_tz)
+                print(f"  {side.capitalize()} anchor: {estimate[side][1]} at {moment.strftime('%Y-%m-%d %H:%M:%S')}")
+
     elif command == "list":
         channel = None
         if len(sys.argv) > 2:
@@ -461,6 +701,16 @@ Examples:
         removed = ta.cleanup_old_anchors(retention_days)
         print(f"Cleaned up {removed} old anchors")
 
+    elif command == "shard":
+        if ta.sharded:
+            print(f"Anchors are already stored per channel in {ta.shard_dir}")
+        else:
+            ta.sharded = True
+            ta._dirty.update(ta.anchors)
+            if not ta.flush():
+                sys.exit(1)
+            print(f"Moved anchors for {len(ta.anchors)} channels to {ta.shard_dir}")
+
     elif command == "stats":
         stats = ta.get_anchor_stats()
         print("Temporal Anchor Statistics:")
@@ -0,0 +1,236 @@
+#!/usr/bin/env python3
+"""
+Thread Index - Reply-thread reconstruction for cached messages
+Persistent parent → children adjacency per channel, updated on every fetch
+"""
+
+import json
+import sys
+from datetime import datetime
+from pathlib import Path
+
+DEFAULT_BASE_DIR = Path(__file__).parent.parent.parent.parent / "telegram_cache"
+
+
+class ThreadIndex:
+    """Reply graph for one channel: child → parent plus parent → children"""
+
+    def __init__(self, channel, base_dir=None):
+        base_dir = Path(base_dir) if base_dir else DEFAULT_BASE_DIR
+        clean_channel = channel.replace('@', '').replace('/', '_')
+
+        self.channel = channel
+        self.index_file = base_dir / "threads" / f"{clean_channel}.json"
+        self.parents = {}
+        self.children = {}
+        self.dirty = False
+        self._load()
+
+    def _load(self):
+        """Load the adjacency lists (JSON keys are strings on disk)"""
+        if not self.index_file.exists():
+            return
+
+        try:
+            with open(self.index_file, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (json.JSONDecodeError, IOError) as e:
+            print(f"⚠️  Warning: Could not load thread index: {e}")
+            return
+
+        self.parents = {int(child): parent for child, parent in data.get('parents', {}).items()}
+        self.children = {int(parent): kids for parent, kids in data.get('children', {}).items()}
+
+    def save(self):
+        """Persist the index if anything changed"""
+        if not self.dirty:
+            return
+
+        self.index_file.parent.mkdir(parents=True, exist_ok=True)
+        data = {
+            'channel': self.channel,
+            'updated_at': datetime.now().isoformat(),
+            'parents': self.parents,
+            'children': self.children
+        }
+        with open(self.index_file, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False)
+        self.dirty = False
+
+    def add_messages(self, messages):
+        """Record reply edges from a batch of messages; returns new edge count"""
+        added = 0
+        for msg in messages:
+            parent_id = msg.get('reply_to_id')
+            if not parent_id or self.parents.get(msg['id']) == parent_id:
+                continue
+
+            self.parents[msg['id']] = parent_id
+            kids = self.children.setdefault(parent_id, [])
+            if msg['id'] not in kids:
+                kids.append(msg['id'])
+                kids.sort()
+            added += 1
+
+        if added:
+            self.dirty = True
+        return added
+
+    def root_of(self, message_id):
+        """Walk reply links up to the thread root"""
+        seen = {message_id}
+        current = message_id
+        while current in self.parents:
+            parent = self.parents[current]
+            if parent in seen:  # Defensive: never loop on corrupted data
+                break
+            seen.add(parent)
+            current = parent
+        return current
+
+    def depth_of(self, message_id, root=None):
+        """Number of reply hops between a message and its root"""
+        depth = 0
+        current = message_id
+        while current in self.parents and current != root and depth <= len(self.parents):
+            current = self.parents[current]
+            depth += 1
+        return depth
+
+    def thread_ids(self, root_id):
+        """Message ids of a thread in (depth-first) reading order with their depth"""
+        ordered = []
+        stack = [(root_id, 0)]
+        seen = set()
+        while stack:
+            message_id, depth = stack.pop()
+            if message_id in seen:
+                continue
+            seen.add(message_id)
+            ordered.append((message_id, depth))
+            for child in reversed(self.children.get(message_id, [])):
+                stack.append((child, depth + 1))
+        return ordered
+
+
+def load_cached_messages(channel):
+    """Latest cache file for a channel plus its messages keyed by id
+
+    Thread members fetched earlier live in the side cache and are included.
+    """
+    from telegram_cache import load_side_cache
+    from telegram_filter import find_latest_cache
+
+    cache_file = find_latest_cache(channel)
+    cache_dir = cache_file.parent if cache_file else DEFAULT_BASE_DIR
+    by_id = dict(load_side_cache(channel, cache_dir)['messages'])
+    if not cache_file:
+        return None, by_id
+
+    with open(cache_file, 'r', encoding='utf-8') as f:
+        messages = json.load(f)['messages']
+    by_id.update((msg['id'], msg) for msg in messages)
+    return cache_file, by_id
+
+
+def fill_missing_messages(channel, index, cache_file, by_id, message_id, max_rounds=10):
+    """Batch-fetch thread members (typically parents) that are not cached yet
+
+    Each round fetches every missing id of the current thread in one request,
+    which can reveal older parents; stops when the thread is complete. Fetched
+    messages go to the side cache: they are scattered by id, and merging them
+    into the contiguous cache would make its coverage look wider than it is.
+    """
+    import asyncio
+    from telegram_cache import save_side_messages
+    from telegram_fetch import fetch_messages_by_id
+
+    for _ in range(max_rounds):
+        root = index.root_of(message_id)
+        missing = [mid for mid, _ in index.thread_ids(root) if mid not in by_id]
+        if not missing:
+            break
+
+        print(f"📥 Fetching {len(missing)} uncached thread messages...")
+        fetched = [msg for msg in asyncio.run(fetch_messages_by_id(channel, missing)) if msg['id'] not in by_id]
+        if not fetched:
+            break
+
+        index.add_messages(fetched)
+        save_side_messages(channel, fetched, "thread", cache_file.parent if cache_file else None)
+        for msg in fetched:
+            by_id[msg['id']] = msg
+
+
+def display_thread(index, by_id, root_id):
+    """Print a thread as an indented reply tree"""
+    entries = index.thread_ids(root_id)
+    for message_id, depth in entries:
+        indent = "    " * depth
+        msg = by_id.get(message_id)
+        if msg:
+            print(f"{indent}[{msg['date_msk']}] #{message_id} {msg['sender']}: {msg['text']}")
+        else:
+            print(f"{indent}#{message_id} (not available)")
+    print(f"\n🧵 Thread size: {len(entries)} messages")
+
+
+def main():
+    if len(sys.argv) < 3:
+        print("""
+Thread Index - Reply thread reconstruction
+
+Usage:
+  python thread_index.py thread <channel> <message_id> [--no-fetch]
+  python thread_index.py rebuild <channel>
+
+Examples:
+  python thread_index.py thread @aiclubsweggs 72856
+  python thread_index.py rebuild @aiclubsweggs
+        """)
+        sys.exit(1)
+
+    command = sys.argv[1]
+    channel = sys.argv[2]
+    if not channel.startswith('@'):
+        channel = f'@{channel}'
+
+    index = ThreadIndex(channel)
+
+    if command == "rebuild":
+        cache_file, by_id = load_cached_messages(channel)
+        if not cache_file:
+            print(f"❌ No cache found for {channel}")
+            sys.exit(1)
+        added = index.add_messages(by_id.values())
+        index.save()
+        print(f"✅ Indexed {added} reply links from {cache_file.name}")
+
+    elif command == "thread":
+        if len(sys.argv) < 4:
+            print("Error: thread requires channel and message_id parameters")
+            sys.exit(1)
+
+        message_id = int(sys.argv[3])
+        cache_file, by_id = load_cached_messages(channel)
+
+        # The message itself may reply to something the index has not seen yet
+        if message_id in by_id:
+            index.add_messages([by_id[message_id]])
+
+        if "--no-fetch" not in sys.argv:
+            try:
+                fill_missing_messages(channel, index, cache_file, by_id, message_id)
+            except Exception as e:
+                print(f"⚠️  Could not fetch missing thread messages: {e}")
+
+        index.save()
+        display_thread(index, by_id, index.root_of(message_id))
+
+    else:
+        print(f"Unknown command: {command}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -273,6 +273,9 @@ class BoundaryTestSuite:
         if cache_file and Path(cache_file).exists():
             cache_validation_results = await self.run_cache_validation_tests(cache_file)
 
+        # OCR every downloaded border image in one background drain
+        self.validator.queue_media_ocr()
+
         # Generate report
         report = self.generate_test_report()
         if cache_validation_results:
@@ -5,6 +5,107 @@ set -euo pipefail
 SCRIPT_DIR="$(cd "$(dirname "${BASH_SOURCE[0]}")" && pwd)"
 TELEGRAM_DIR="$SCRIPT_DIR/scripts/telegram_tools/core"
 
+# Run one prompt through the selected LLM CLI
+llm_prompt() {
+    case "$1" in
+        gemini) gemini -p "$2" ;;
+        claude) claude --print "$2" ;;
+    esac
+}
+
+# Run one LLM prompt in the background (at most LLM_JOBS at a time); the
+# exit status is written to "$out.status" because wait -n cannot be tied to a job
+llm_job() {
+    local llm="$1" prompt="$2" out="$3"
+    while (( $(jobs -rp | wc -l) >= ${LLM_JOBS:-4} )); do
+        wait -n || true
+    done
+    (
+        if llm_prompt "$llm" "$prompt" > "$out"; then echo 0; else echo $?; fi > "$out.status"
+    ) &
+}
+
+# Wait for all LLM jobs; report and fail if any errored or produced no output
+check_llm_jobs() {
+    local out status failed=0
+    wait || true
+    for out in "$@"; do
+        status=$(cat "$out.status" 2>/dev/null || echo "none")
+        if [[ "$status" != "0" ]] || [[ ! -s "$out" ]]; then
+            echo "❌ LLM job for $(basename "$out") failed (exit status: $status)" >&2
+            failed=1
+        fi
+    done
+    return $failed
+}
+
+# Map-reduce LLM analysis: export token-budgeted chunks, analyze them in
+# parallel (LLM_JOBS at a time), then merge the partial analyses in rounds
+# whose prompts stay under LLM_TOKEN_BUDGET until one analysis is left
+analyze_in_chunks() {
+    local llm="$1" channel="$2" filter="$3"
+    local budget="${LLM_TOKEN_BUDGET:-8000}"
+    local manifest chunk_dir chunk partial tokens group_tokens round=0
+    local -a chunks partials next group
+
+    manifest=$(cd "$TELEGRAM_DIR" && python3 telegram_json_export.py "$channel" "$filter" --format=chunks --token-budget="$budget")
+    [[ -f "$manifest" ]] || { echo "❌ Chunk export failed" >&2; return 1; }
+    chunk_dir=$(dirname "$manifest")
+    trap "rm -rf '$chunk_dir'" EXIT
+
+    mapfile -t chunks < <(jq -r '.chunks[].path' "$manifest")
+    if [[ ${#chunks[@]} -eq 0 ]]; then
+        echo "📭 No messages found"
+        return 1
+    fi
+    echo "🧩 ${#chunks[@]} chunk(s), ~$(jq -r '.total_tokens' "$manifest") tokens"
+
+    partials=()
+    for chunk in "${chunks[@]}"; do
+        llm_job "$llm" "Analyze these Telegram messages (one part of a larger set) and provide a detailed summary and insights:
+$(cat "$chunk")" "$chunk.analysis"
+        partials+=("$chunk.analysis")
+    done
+    check_llm_jobs "${partials[@]}" || return 1
+
+    # Reduce: group consecutive partials while the group fits the budget
+    # (~4 bytes per token, as the chunk estimator); a lone leftover waits a round
+    while [[ ${#partials[@]} -gt 1 ]]; do
+        round=$((round + 1))
+        next=()
+        group=()
+        group_tokens=0
+        for partial in "${partials[@]}" ""; do
+            tokens=0
+            [[ -n "$partial" ]] && tokens=$(( $(wc -c < "$partial") / 4 + 1 ))
+            if [[ -z "$partial" || ( ${#group[@]} -ge 2 && $((group_tokens + tokens)) -gt $budget ) ]]; then
+                if [[ ${#group[@]} -eq 1 ]]; then
+                    next+=("${group[0]}")
+                elif [[ ${#group[@]} -gt 1 ]]; then
+                    local combined="" out="$chunk_dir/reduce_${round}_${#next[@]}.txt"
+                    for chunk in "${group[@]}"; do
+                        combined+="--- $(basename "$chunk") ---"$'\n'"$(cat "$chunk")"$'\n'
+                    done
+                    llm_job "$llm" "Combine these partial analyses of consecutive parts of one Telegram channel export into a single detailed summary with insights:
+$combined" "$out"
+                    next+=("$out")
+                fi
+                group=()
+                group_tokens=0
+            fi
+            if [[ -n "$partial" ]]; then
+                group+=("$partial")
+                group_tokens=$((group_tokens + tokens))
+            fi
+        done
+        echo "🔗 Reduce round $round: ${#partials[@]} → ${#next[@]} analyses" >&2
+        check_llm_jobs "${next[@]}" || return 1
+        partials=("${next[@]}")
+    done
+
+    cat "${partials[0]}"
+}
+
 case "${1:-help}" in
     fetch)
         [[ -z "${2:-}" ]] && echo "Usage: $0 fetch <channel> [limit]" && exit 1
@@ -41,6 +142,18 @@ case "${1:-help}" in
 
         python3 "$TELEGRAM_DIR/telegram_filter.py" "$2" "$filter_arg"
         ;;
+    search)
+        [[ -z "${2:-}" ]] || [[ -z "${3:-}" ]] && echo "Usage: $0 search <channel> <pattern> [filter]" && exit 1
+        cd "$TELEGRAM_DIR" && python3 telegram_filter.py "$2" "${4:-all}" "$3" "" --hybrid
+        ;;
+    timeline)
+        [[ -z "${2:-}" ]] || [[ -z "${3:-}" ]] && echo "Usage: $0 timeline <filter> <channel> [channel...] [--pattern=REGEX] [--limit=N] [--json]" && exit 1
+        cd "$TELEGRAM_DIR" && python3 telegram_timeline.py "${@:2}"
+        ;;
+    thread)
+        [[ -z "${2:-}" ]] || [[ -z "${3:-}" ]] && echo "Usage: $0 thread <channel> <message_id> [--no-fetch]" && exit 1
+        cd "$TELEGRAM_DIR" && python3 thread_index.py thread "$2" "$3" "${@:4}"
+        ;;
     send)
         [[ -z "${2:-}" ]] || [[ -z "${3:-}" ]] && echo "Usage: $0 send <target> <message>" && exit 1
         python3 -c "
@@ -116,6 +229,10 @@ async def send_file_to_telegram():
 asyncio.run(send_file_to_telegram())
 " "$2" "$3" "${4:-}"
         ;;
+    get)
+        [[ -z "${2:-}" ]] || [[ -z "${3:-}" ]] && echo "Usage: $0 get <channel> <message_id> [message_id...]" && exit 1
+        cd "$TELEGRAM_DIR" && python3 message_index.py get "$2" "${@:3}"
+        ;;
     cache)
         cd "$TELEGRAM_DIR" && python3 telegram_cache.py info
         ;;
@@ -123,8 +240,16 @@ asyncio.run(send_file_to_telegram())
         cd "$TELEGRAM_DIR" && python3 telegram_cache.py clean "${2:-}"
         ;;
     json)
-        [[ -z "${2:-}" ]] && echo "Usage: $0 json <channel> [filter] [--summary|--full]" && exit 1
-        cd "$TELEGRAM_DIR" && python3 telegram_json_export.py "$2" "${3:-today}" "${4:---summary}"
+        [[ -z "${2:-}" ]] && echo "Usage: $0 json <channel> [filter] [--summary|--full] [--format=ndjson|csv|parquet|arrow] [--fields=a,b] [--output=PATH]" && exit 1
+        if [[ $# -ge 4 ]]; then
+            cd "$TELEGRAM_DIR" && python3 telegram_json_export.py "$2" "${3:-today}" "${@:4}"
+        else
+            cd "$TELEGRAM_DIR" && python3 telegram_json_export.py "$2" "${3:-today}" --summary
+        fi
+        ;;
+    analytics)
+        [[ -z "${2:-}" ]] && echo "Usage: $0 analytics <channel> [filter] [--archives] [--json]" && exit 1
+        cd "$TELEGRAM_DIR" && python3 telegram_analytics.py "${@:2}"
         ;;
     archive)
         [[ -z "${2:-}" ]] && echo "Usage: $0 archive <channel> [date]" && exit 1
@@ -179,20 +304,23 @@ asyncio.run(send_file_to_telegram())
         cd "$SCRIPT_DIR/scripts/telegram_tools" && python3 test_boundaries.py "$2" "${3:-}" "${4:-7}"
         ;;
     verify-content)
-        [[ -z "${2:-}" ]] && echo "Usage: $0 verify-content <cache_file> [--auto-correct]" && exit 1
+        [[ -z "${2:-}" ]] && echo "Usage: $0 verify-content <cache_file> [--deep] [--media-only] [--auto-correct]" && exit 1
         cd "$TELEGRAM_DIR"
-        if [[ "${3:-}" == "--auto-correct" ]]; then
-            python3 content_verifier.py "$2" --auto-correct
-        else
-            python3 content_verifier.py "$2"
-        fi
+        python3 content_verifier.py "$2" "${@:3}"
+        ;;
+    fetch-day)
+        [[ -z "${2:-}" ]] || [[ -z "${3:-}" ]] && echo "Usage: $0 fetch-day <channel> <YYYY-MM-DD> [--fetch-media]" && exit 1
+        cd "$TELEGRAM_DIR" && python3 telegram_fetch.py fetch-day "$2" "$3" "${@:4}"
         ;;
     fetch-media)
         [[ -z "${2:-}" ]] && echo "Usage: $0 fetch-media <channel> [limit]" && exit 1
         cd "$TELEGRAM_DIR" && python3 telegram_fetch.py "$2" "${3:-100}" 0 "media" --fetch-media
         ;;
+    ocr-queue)
+        cd "$TELEGRAM_DIR" && python3 ocr_queue.py "${2:-status}" "${@:3}"
+        ;;
     ocr-cache)
-        [[ -z "${2:-}" ]] && echo "Usage: $0 ocr-cache <channel> [filter] [--refresh] [--lang=LANG] [--limit N] [--display]" && exit 1
+        [[ -z "${2:-}" ]] && echo "Usage: $0 ocr-cache <channel> [filter] [--refresh] [--lang=LANG] [--limit N] [--jobs N] [--backend NAME] [--phash-distance N] [--no-prefilter] [--display]" && exit 1
         cd "$TELEGRAM_DIR" && python3 media_ocr_cache.py "$2" "${@:3}"
         ;;
     verify-boundaries-cache)
@@ -207,7 +335,7 @@ asyncio.run(send_file_to_telegram())
 
         if [[ -n "$message_id" ]]; then
             # Analyze specific message by ID
-            message_content=$(cd "$TELEGRAM_DIR" && python3 telegram_json_export.py "$channel" all --full | jq -r ".messages[] | select(.id == $message_id) | .text")
+            message_content=$(cd "$TELEGRAM_DIR" && python3 message_index.py get "$channel" "$message_id" 2>/dev/null | jq -r ".[0].text // empty" || true)
             if [[ "$message_content" == "null" || -z "$message_content" ]]; then
                 echo "❌ Message ID $message_id not found"
                 exit 1
@@ -217,8 +345,7 @@ asyncio.run(send_file_to_telegram())
         else
             # Analyze all messages in filter
             echo "🤖 Analyzing $channel messages ($filter) with Gemini..."
-            messages_json=$(cd "$TELEGRAM_DIR" && python3 telegram_json_export.py "$channel" "$filter" --full)
-            gemini -p "Analyze these Telegram messages and provide a detailed summary and insights: $messages_json"
+            analyze_in_chunks gemini "$channel" "$filter"
         fi
         ;;
     analyze-with-claude)
@@ -229,7 +356,7 @@ asyncio.run(send_file_to_telegram())
 
         if [[ -n "$message_id" ]]; then
             # Analyze specific message by ID
-            message_content=$(cd "$TELEGRAM_DIR" && python3 telegram_json_export.py "$channel" all --full | jq -r ".messages[] | select(.id == $message_id) | .text")
+            message_content=$(cd "$TELEGRAM_DIR" && python3 message_index.py get "$channel" "$message_id" 2>/dev/null | jq -r ".[0].text // empty" || true)
             if [[ "$message_content" == "null" || -z "$message_content" ]]; then
                 echo "❌ Message ID $message_id not found"
                 exit 1
@@ -239,8 +366,7 @@ asyncio.run(send_file_to_telegram())
         else
             # Analyze all messages in filter
             echo "🧠 Analyzing $channel messages ($filter) with Claude..."
-            messages_json=$(cd "$TELEGRAM_DIR" && python3 telegram_json_export.py "$channel" "$filter" --full)
-            claude --print "Analyze these Telegram messages and provide a detailed summary and insights: $messages_json"
+            analyze_in_chunks claude "$channel" "$filter"
         fi
         ;;
     *)
@@ -250,23 +376,33 @@ telegram_manager.sh - Advanced Telegram Manager with 10/10 Confidence Border Det
 BASIC COMMANDS:
   fetch <channel> [limit]                    Fetch messages from Telegram
   read <channel> [filter] [--clean]         Read cached messages (--clean to clear cache first)
+  search <channel> <pattern> [filter]       Search cache + Telegram server-side for uncovered dates
+  timeline <filter> <channel> [channel...]  Merged chronological view over several channels
+  thread <channel> <message_id>             Show the full reply thread around a message
   send <target> <message>                   Send message
   send_file <target> <file_path> [caption]  Send file attachment
   json <channel> [filter] [--summary|--full] Export raw JSON
+       [--format=ndjson|csv|parquet|arrow] [--fields=a,b] [--output=PATH]  Flat/columnar export
+  get <channel> <message_id> [message_id...] Print specific cached messages as JSON (indexed lookup)
+  analytics <channel> [filter] [--archives] Hourly/daily/sender histograms, view percentiles, heatmap
   cache                                     Show cache info
   clean [channel]                           Clean old cache
 
 ADVANCED VERIFICATION (NEW - 10/10 CONFIDENCE):
   verify-boundaries <channel> <date>        🎯 Ultimate boundary detection with triple verification
   test-boundaries <channel> [start_date] [days] 🧪 Comprehensive multi-day boundary testing
-  verify-content <cache_file> [--auto-correct]  🔍 Verify cache against live data with auto-fix
+  verify-content <cache_file> [--deep] [--auto-correct]  🔍 Verify cache against live data with auto-fix
+  fetch-day <channel> <date>                📅 Fetch exactly one day using anchor id bounds
   fetch-media <channel> [limit]             📎 Fetch messages with automatic media download
   ocr-cache <channel> [filter] [options]   📝 Generate & reuse OCR descriptions for media
+  ocr-queue [status|drain] [--jobs=N]       📝 Background OCR queue fed by media downloads
   verify-boundaries-cache <channel> <date> <cache> Compare cached vs live boundaries
 
 AI ANALYSIS:
   analyze-with-gemini <channel> [filter] [message_id] 🤖 Detailed message analysis using Gemini
   analyze-with-claude <channel> [filter] [message_id] 🧠 Detailed message analysis using Claude
+  (filters are split into chunks of LLM_TOKEN_BUDGET tokens, default 8000,
+   analyzed LLM_JOBS at a time, default 4, then merged)
 
 PERSISTENCE & ANCHORING:
   archive <channel> [date]                  Archive daily cache for permanent storage
@@ -280,7 +416,12 @@ BASIC EXAMPLES:
   ./telegram_manager.sh fetch aiclubsweggs 100
   ./telegram_manager.sh read aiclubsweggs today
   ./telegram_manager.sh read aiclubsweggs today --clean
+  ./telegram_manager.sh search aiclubsweggs "gemini" last:365
+  ./telegram_manager.sh timeline today aiclubsweggs llm_under_hood --pattern=gemini
+  ./telegram_manager.sh thread aiclubsweggs 72856
   ./telegram_manager.sh json aiclubsweggs yesterday --summary
+  ./telegram_manager.sh json aiclubsweggs last:30 --format=parquet --output=aiclub.parquet
+  ./telegram_manager.sh get aiclubsweggs 72856
   ./telegram_manager.sh send @almazom "Hello"
   ./telegram_manager.sh send_file @almazom /path/to/file.pdf "📎 Document attached"
 
@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+"""
+Shared fixtures for the unit tests: core modules on sys.path, a cached-message
+factory and a test case with a scratch directory.
+"""
+
+import json
+import sys
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+from pathlib import Path
+
+CORE_DIR = Path(__file__).parent.parent / "scripts" / "telegram_tools" / "core"
+if str(CORE_DIR) not in sys.path:
+    sys.path.insert(0, str(CORE_DIR))
+
+
+def make_message(msg_id, date_msk="2025-09-10 12:00:00", text="hello", **fields):
+    """Message dict as the cache files store it; date_utc is derived from date_msk"""
+    date_utc = datetime.strptime(date_msk, '%Y-%m-%d %H:%M:%S') - timedelta(hours=3)
+    message = {
+        'id': msg_id,
+        'date_msk': date_msk,
+        'date_utc': date_utc.strftime('%Y-%m-%dT%H:%M:%S+00:00'),
+        'text': text,
+        'sender': 'User',
+        'reply_to_id': None,
+    }
+    message.update(fields)
+    return message
+
+
+def write_cache(path, messages, **meta):
+    """Write a {meta, messages} cache file and return its path"""
+    path = Path(path)
+    path.write_text(json.dumps({'meta': meta, 'messages': messages}, indent=2, ensure_ascii=False), encoding='utf-8')
+    return path
+
+
+class TempDirTestCase(unittest.TestCase):
+    """Test case with a fresh temporary directory in self.base, removed after tearDown"""
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.base = Path(tmp.name)
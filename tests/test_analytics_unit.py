@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the vectorized analytics report.
+"""
+
+import unittest
+
+from helpers import make_message
+from telegram_analytics import build_columns, compute_report
+
+
+class TestComputeReport(unittest.TestCase):
+    """Hour/day buckets use Moscow wall-clock time from date_msk"""
+
+    def setUp(self):
+        # 2025-09-15 was a Monday
+        self.messages = [
+            make_message(4, "2025-09-16 08:30:00", sender="Bob", views=40),
+            make_message(3, "2025-09-15 23:59:59", sender="Alice", views=30),
+            make_message(2, "2025-09-15 08:45:00", "📷 [Photo]", sender="Alice"),
+            make_message(1, "2025-09-15 08:00:00", sender="Alice", views=10),
+        ]
+        self.report = compute_report(build_columns(self.messages))
+
+    def test_hourly_and_daily_counts(self):
+        expected_hours = [0] * 24
+        expected_hours[8], expected_hours[23] = 3, 1
+        self.assertEqual(self.report['per_hour'], expected_hours)
+        self.assertEqual(self.report['per_day'], {'2025-09-15': 3, '2025-09-16': 1})
+
+    def test_heatmap_weekday_rows(self):
+        heatmap = self.report['heatmap']
+        self.assertEqual((heatmap[0][8], heatmap[0][23], heatmap[1][8]), (2, 1, 1))
+        self.assertEqual(sum(map(sum, heatmap)), 4)
+
+    def test_totals_senders_and_views(self):
+        self.assertEqual(self.report['total_messages'], 4)
+        self.assertEqual(self.report['id_range'], {'min': 1, 'max': 4})
+        self.assertEqual(self.report['time_range'], {'start': '2025-09-15 08:00:00', 'end': '2025-09-16 08:30:00'})
+        self.assertEqual([(s['sender'], s['messages']) for s in self.report['top_senders']], [('Alice', 3), ('Bob', 1)])
+        self.assertEqual(self.report['media_messages'], 1)
+        self.assertEqual((self.report['views']['messages_with_views'], self.report['views']['p50']), (3, 30.0))
+
+    def test_empty_selection(self):
+        self.assertEqual(compute_report(build_columns([])), {'total_messages': 0})
+
+
+if __name__ == "__main__":
+    unittest.main()
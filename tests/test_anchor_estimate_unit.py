@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+Unit tests for estimating message ids from temporal anchors.
+"""
+
+import unittest
+from datetime import date, datetime
+
+from helpers import TempDirTestCase, make_message
+from gap_validator import GapValidator
+from temporal_anchor import ESTIMATE_MARGIN, TemporalAnchor
+
+
+class TestEstimateMessageId(TempDirTestCase):
+    """Ids between anchors are interpolated by time, outside they clamp"""
+
+    def setUp(self):
+        super().setUp()
+        self.ta = TemporalAnchor(self.base)
+        self.ta.set_anchor('@chan', 1000, '00:00:00', date(2025, 9, 10))
+        self.ta.set_anchor('@chan', 3000, '00:00:00', date(2025, 9, 12))
+
+    def test_interpolates_between_anchors(self):
+        estimate = self.ta.estimate_message_id('@chan', datetime(2025, 9, 11, 12, 0, 0))
+        self.assertEqual(estimate['method'], 'interpolated')
+        self.assertEqual(estimate['message_id'], 2500)
+
+    def test_exact_and_clamped(self):
+        self.assertEqual(self.ta.estimate_message_id('@chan', date(2025, 9, 12))['method'], 'exact')
+        after = self.ta.estimate_message_id('@chan', date(2025, 9, 20))
+        self.assertEqual((after['method'], after['message_id']), ('after_range', 3000))
+        self.assertIsNone(self.ta.estimate_message_id('@other', date(2025, 9, 11)))
+
+    def test_index_follows_new_anchors(self):
+        self.ta.set_anchor('@chan', 1200, '00:00:00', date(2025, 9, 11))
+        estimate = self.ta.estimate_message_id('@chan', datetime(2025, 9, 11, 12, 0, 0))
+        self.assertEqual(estimate['message_id'], 2100)
+
+    def test_fetch_offset_uses_interpolation(self):
+        offset = self.ta.calculate_fetch_offset('@chan', date(2025, 9, 10))
+        self.assertEqual(offset['strategy'], 'interpolated')
+        # Starts a margin above the estimated end of the day so a low estimate loses nothing
+        self.assertEqual(offset['offset_id'], 2001 + ESTIMATE_MARGIN)
+
+    def test_gap_check_uses_estimate_without_previous_anchor(self):
+        validator = GapValidator(self.base)
+        validator.ta.set_anchor('@far', 1000, '00:00:00', date(2025, 9, 9))
+        validator.ta.set_anchor('@far', 3000, '00:00:00', date(2025, 9, 13))
+        # 2025-09-11 00:00 interpolates to id 2000
+        plausible = validator._validate_with_anchor('@far', {'id': 2050}, date(2025, 9, 11))
+        self.assertEqual(plausible['validation'], 'estimated')
+        late_start = validator._validate_with_anchor('@far', {'id': 2001 + ESTIMATE_MARGIN}, date(2025, 9, 11))
+        self.assertEqual(late_start['validation'], 'suspicious')
+
+
+class TestDayIdWindow(TempDirTestCase):
+    """Neighbouring anchors bound a day's ids; a complete anchor makes them exact"""
+
+    def setUp(self):
+        super().setUp()
+        self.ta = TemporalAnchor(self.base)
+
+    def test_bounded_by_nearest_anchors(self):
+        self.ta.set_anchor('@chan', 500, '00:01:00', date(2025, 9, 5))
+        self.ta.set_anchor('@chan', 1000, '00:01:00', date(2025, 9, 10))
+        self.ta.set_anchor('@chan', 3000, '00:02:00', date(2025, 9, 12))
+        self.assertEqual(self.ta.day_id_window('@chan', date(2025, 9, 11)),
+                         {'min_id': 1000, 'max_id': 3000, 'complete': False})
+        self.assertEqual(self.ta.day_id_window('@chan', date(2025, 9, 20))['max_id'], 0)
+
+    def test_complete_day_is_exact(self):
+        messages = [make_message(i, f"2025-09-{10 + i // 10:02d} {i % 10:02d}:00:00") for i in range(30, 0, -1)]
+        self.ta.update_anchor_from_messages('@chan', messages, date(2025, 9, 12), complete_dates=[date(2025, 9, 10)])
+        self.assertEqual(self.ta.day_id_window('@chan', date(2025, 9, 11)),
+                         {'min_id': 9, 'max_id': 20, 'complete': True})
+        self.assertEqual(self.ta.day_id_window('@chan', date(2025, 9, 10)),
+                         {'min_id': 0, 'max_id': 10, 'complete': True})
+
+
+
+class TestAnchorCompleteness(TempDirTestCase):
+    """Only days seen in full are marked complete, and complete anchors stick"""
+
+    def setUp(self):
+        super().setUp()
+        self.ta = TemporalAnchor(self.base)
+        # Ids 1-9 on 09-10, 10-19 on 09-11, 20-24 on 09-12
+        self.messages = [make_message(i, f"2025-09-{10 + i // 10:02d} {i % 10 + 8:02d}:00:00") for i in range(24, 0, -1)]
+
+    def test_interior_days_are_complete(self):
+        self.assertEqual(self.ta.update_anchor_from_messages('@chan', self.messages, date(2025, 9, 12)), 2)
+
+        interior = self.ta.get_anchor('@chan', date(2025, 9, 11))
+        self.assertTrue(interior['complete'])
+        self.assertEqual((interior['first_message_id'], interior['last_message_id']), (10, 19))
+        self.assertEqual(interior['last_timestamp'], '17:00:00')
+        # The oldest day may have started before the batch
+        self.assertIsNone(self.ta.get_anchor('@chan', date(2025, 9, 10)))
+        # The requested day gets a first-message anchor but is still running
+        today = self.ta.get_anchor('@chan', date(2025, 9, 12))
+        self.assertEqual(today['message_id'], 20)
+        self.assertNotIn('complete', today)
+
+    def test_complete_anchor_is_not_replaced_by_partial_view(self):
+        self.ta.update_anchor_from_messages('@chan', self.messages, date(2025, 9, 12))
+        partial = [m for m in self.messages if 15 <= m['id'] <= 19]
+        self.assertEqual(self.ta.update_anchor_from_messages('@chan', partial, date(2025, 9, 11)), 0)
+
+        anchor = TemporalAnchor(self.base).get_anchor('@chan', date(2025, 9, 11))
+        self.assertTrue(anchor['complete'])
+        self.assertEqual(anchor['message_id'], 10)
+
+    def test_complete_dates_mark_single_day_fetches(self):
+        day = [m for m in self.messages if m['date_msk'].startswith('2025-09-10')]
+        updated = self.ta.update_anchor_from_messages('@chan', day, date(2025, 9, 10),
+                                                      complete_dates=[date(2025, 9, 10), date(2025, 9, 11)])
+        self.assertEqual(updated, 1)
+        self.assertEqual(self.ta.get_anchor('@chan', date(2025, 9, 10))['last_message_id'], 9)
+        # A date named complete but absent from the batch is not invented
+        self.assertIsNone(self.ta.get_anchor('@chan', date(2025, 9, 11)))
+
+    def test_repeated_batch_changes_nothing(self):
+        self.ta.update_anchor_from_messages('@chan', self.messages, date(2025, 9, 12))
+        self.assertEqual(self.ta.update_anchor_from_messages('@chan', self.messages, date(2025, 9, 12)), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,44 @@
+#!/usr/bin/env python3
+"""
+Unit tests for coalesced, atomic anchor persistence.
+"""
+
+import json
+import unittest
+from datetime import date
+from unittest import mock
+
+from helpers import TempDirTestCase, make_message
+import temporal_anchor
+from temporal_anchor import TemporalAnchor
+
+
+class TestAnchorStore(TempDirTestCase):
+    """Anchors are written once per batch and never leave a missing file"""
+
+    def test_batch_writes_once(self):
+        ta = TemporalAnchor(self.base)
+        messages = [make_message(i, f"2025-09-{1 + i // 10:02d} {i % 10:02d}:00:00") for i in range(60, 0, -1)]
+        with mock.patch.object(temporal_anchor, '_write_json_atomic', wraps=temporal_anchor._write_json_atomic) as write:
+            self.assertEqual(ta.update_anchor_from_messages('@chan', messages, date(2025, 9, 7)), 6)
+            self.assertEqual(write.call_count, 1)
+        self.assertEqual(len(json.loads((self.base / "anchors.json").read_text())['chan']), 6)
+
+    def test_keeps_channels_saved_by_another_instance(self):
+        first = TemporalAnchor(self.base)
+        TemporalAnchor(self.base).set_anchor('@other', 1, '00:00:00', date(2025, 9, 1))
+        first.set_anchor('@chan', 2, '00:00:00', date(2025, 9, 1))
+        self.assertEqual(sorted(TemporalAnchor(self.base).anchors), ['chan', 'other'])
+
+    def test_sharded_store_round_trips(self):
+        TemporalAnchor(self.base).set_anchor('@chan', 1, '00:00:00', date(2025, 9, 1))
+        TemporalAnchor(self.base, sharded=True).set_anchor('@other', 2, '00:00:00', date(2025, 9, 1))
+        self.assertFalse((self.base / "anchors.json").exists())
+        reloaded = TemporalAnchor(self.base)
+        self.assertTrue(reloaded.sharded)
+        self.assertEqual(reloaded.get_anchor('@chan', date(2025, 9, 1))['message_id'], 1)
+        self.assertEqual(reloaded.get_anchor('@other', date(2025, 9, 1))['message_id'], 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+"""
+Unit tests for compressed NDJSON daily archives.
+"""
+
+import json
+import unittest
+from datetime import date
+
+from helpers import TempDirTestCase, make_message, write_cache
+from daily_persistence import DailyPersistence
+
+
+class TestDailyArchive(TempDirTestCase):
+    """Archives round-trip through gzip NDJSON and legacy .json stays readable"""
+
+    def setUp(self):
+        super().setUp()
+        self.dp = DailyPersistence(self.base)
+        self.messages = [make_message(i, f"2025-09-10 {i % 24:02d}:00:00", f"сообщение {i}") for i in range(50, 0, -1)]
+        write_cache(self.base / "chan_20250910_120000.json", self.messages, channel='@chan')
+
+    def test_archive_round_trip(self):
+        self.assertTrue(self.dp.archive_daily_cache('@chan', date(2025, 9, 10)))
+        self.assertEqual(self.dp.find_daily_path('@chan', date(2025, 9, 10)).name, "chan.ndjson.gz")
+        self.assertEqual(self.dp.get_daily_cache('@chan', date(2025, 9, 10))['messages'], self.messages)
+
+        restored = self.dp.restore_daily_cache('@chan', date(2025, 9, 10))
+        with open(restored, encoding='utf-8') as f:
+            self.assertEqual(json.load(f)['messages'], self.messages)
+
+    def test_reads_and_compresses_legacy_json(self):
+        legacy = self.dp.get_daily_path('@chan', date(2025, 9, 9), '.json')
+        legacy.parent.mkdir(parents=True)
+        legacy.write_text(json.dumps({'meta': {}, 'messages': self.messages[:2]}, indent=2), encoding='utf-8')
+
+        self.assertEqual(next(self.dp.iter_daily_messages('@chan', date(2025, 9, 9)))['id'], 50)
+        self.dp.cleanup_old_caches()
+        self.assertFalse(legacy.exists())
+        self.assertEqual(list(self.dp.iter_daily_messages('@chan', date(2025, 9, 9))), self.messages[:2])
+
+    def test_cleanup_keeps_history_unless_retention_given(self):
+        self.assertTrue(self.dp.archive_daily_cache('@chan', date(2020, 1, 1)))
+        self.dp.cleanup_old_caches()
+        self.assertIsNotNone(self.dp.find_daily_path('@chan', date(2020, 1, 1)))
+
+        self.assertEqual(self.dp.cleanup_old_caches(retention_days=365), 1)
+        self.assertIsNone(self.dp.find_daily_path('@chan', date(2020, 1, 1)))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the stat-keyed media hash cache.
+"""
+
+import hashlib
+import os
+import time
+import unittest
+
+from helpers import TempDirTestCase
+from hash_cache import HashCache
+
+
+class TestHashCache(TempDirTestCase):
+    """Digests are reused only while the file's stat tuple is unchanged"""
+
+    def setUp(self):
+        super().setUp()
+        self.media = self.base / "photo.jpg"
+        self.write(b"first version")
+
+    def write(self, data, age_seconds=60):
+        self.media.write_bytes(data)
+        # Outside the racy window, as a file downloaded earlier would be
+        stamp = time.time_ns() - age_seconds * 1_000_000_000
+        os.utime(self.media, ns=(stamp, stamp))
+
+    def test_reuses_digest_for_unchanged_file(self):
+        with HashCache(self.base) as cache:
+            first = cache.hash_file(self.media)
+        with HashCache(self.base) as cache:
+            self.assertEqual(cache.hash_file(self.media), first)
+            self.assertEqual((cache.hits, cache.misses), (1, 0))
+        self.assertEqual(first, hashlib.sha256(b"first version").hexdigest())
+
+    def test_rehashes_modified_file(self):
+        with HashCache(self.base) as cache:
+            cache.hash_file(self.media)
+            self.write(b"second version, longer", age_seconds=30)
+            self.assertEqual(cache.hash_file(self.media), hashlib.sha256(b"second version, longer").hexdigest())
+            self.assertEqual(cache.misses, 2)
+
+    def test_deep_forces_rehash(self):
+        with HashCache(self.base) as cache:
+            cache.hash_file(self.media)
+            cache.hash_file(self.media, deep=True)
+            self.assertEqual((cache.hits, cache.misses), (0, 2))
+
+    def test_recently_modified_file_is_not_remembered(self):
+        self.write(b"just downloaded", age_seconds=0)
+        with HashCache(self.base) as cache:
+            cache.hash_file(self.media)
+            cache.hash_file(self.media)
+            self.assertEqual(cache.hits, 0)
+
+    def test_store_does_not_hold_the_write_lock(self):
+        with HashCache(self.base) as cache:
+            cache.hash_file(self.media)
+            other = self.base / "other.jpg"
+            other.write_bytes(b"another file")
+            stamp = time.time_ns() - 60 * 1_000_000_000
+            os.utime(other, ns=(stamp, stamp))
+            # A second process's connection can write while the first is still open
+            with HashCache(self.base) as second:
+                second.conn.execute("PRAGMA busy_timeout = 0")
+                second.hash_file(other)
+                self.assertEqual(second.hash_file(self.media), cache.hash_file(self.media))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+Unit tests for hybrid search coverage and the side cache of search hits.
+"""
+
+import json
+import sys
+import types
+import unittest
+from datetime import datetime
+from unittest import mock
+
+from helpers import TempDirTestCase, make_message, write_cache
+from telegram_filter import hybrid_search
+
+
+class TestHybridSearch(TempDirTestCase):
+    """Search hits must not widen the range the cache claims to cover"""
+
+    def setUp(self):
+        super().setUp()
+        self.messages = [make_message(i, f"2025-09-10 {i - 80:02d}:00:00") for i in range(100, 89, -1)]
+        self.cache_file = write_cache(self.base / "chan_20250910_120000.json", self.messages,
+                                      channel='@chan', cached_at=datetime.now().isoformat())
+        self.data = json.loads(self.cache_file.read_text(encoding='utf-8'))
+
+        self.calls = []
+        self.hits = {}
+
+        async def search_messages(channel, query, min_date=None, max_date=None, min_id=0, max_id=0):
+            self.calls.append({'query': query, 'min_id': min_id, 'max_id': max_id})
+            return self.hits.get(query, [])
+
+        fake_fetch = types.ModuleType("telegram_fetch")
+        fake_fetch.search_messages = search_messages
+        patcher = mock.patch.dict(sys.modules, {"telegram_fetch": fake_fetch})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_second_search_over_uncovered_window_goes_to_server(self):
+        self.hits['alpha'] = [make_message(5, "2025-09-01 12:00:00", "alpha")]
+        found = hybrid_search('@chan', self.cache_file, self.data, '2025-09-01', 'alpha')
+        self.assertEqual([m['id'] for m in found], [5])
+
+        # The contiguous cache is untouched by the stray old hit
+        stored = json.loads(self.cache_file.read_text(encoding='utf-8'))
+        self.assertEqual([m['id'] for m in stored['messages']], [m['id'] for m in self.messages])
+
+        hybrid_search('@chan', self.cache_file, stored, 'all', 'beta')
+        self.assertEqual(self.calls[1], {'query': 'beta', 'min_id': 0, 'max_id': 90})
+
+    def test_same_pattern_window_is_answered_from_side_cache(self):
+        self.hits['alpha'] = [make_message(5, "2025-09-01 12:00:00", "alpha")]
+        hybrid_search('@chan', self.cache_file, self.data, '2025-09-01', 'alpha')
+        found = hybrid_search('@chan', self.cache_file, self.data, '2025-09-01', 'alpha')
+        self.assertEqual(len(self.calls), 1)
+        self.assertEqual([m['id'] for m in found], [5])
+
+
+if __name__ == "__main__":
+    unittest.main()
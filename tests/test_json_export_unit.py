@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the flat, columnar and LLM-chunk exports.
+"""
+
+import csv
+import io
+import json
+import unittest
+from unittest import mock
+
+from helpers import TempDirTestCase, make_message
+from telegram_json_export import estimate_tokens, export_messages, write_csv, write_llm_chunks, write_ndjson
+
+try:
+    import pyarrow.parquet as pq
+except ImportError:
+    pq = None
+
+MEDIA = {'file_path': '/media/1.jpg', 'content_hash': 'abc'}
+
+
+def sample_messages():
+    return [
+        make_message(3, "2025-09-10 12:00:00", "Привет, мир", views=30, media_info=MEDIA),
+        make_message(2, "2025-09-10 11:00:00", "second", views=None, reply_to_id=1),
+        make_message(1, "2025-09-10 10:00:00", "first, with \"quotes\"", views=10),
+    ]
+
+
+class TestFlatExports(unittest.TestCase):
+    """NDJSON and CSV keep one record per message and only the requested fields"""
+
+    def test_ndjson_projects_fields(self):
+        out = io.StringIO()
+        self.assertEqual(write_ndjson(iter(sample_messages()), ['id', 'text'], out), 3)
+        rows = [json.loads(line) for line in out.getvalue().splitlines()]
+        self.assertEqual(rows[0], {'id': 3, 'text': "Привет, мир"})
+
+    def test_csv_round_trips_nested_values(self):
+        out = io.StringIO()
+        self.assertEqual(write_csv(iter(sample_messages()), ['id', 'text', 'views', 'media_info'], out), 3)
+        rows = list(csv.DictReader(io.StringIO(out.getvalue())))
+        self.assertEqual([row['id'] for row in rows], ['3', '2', '1'])
+        self.assertEqual(rows[2]['text'], 'first, with "quotes"')
+        self.assertEqual(json.loads(rows[0]['media_info']), MEDIA)
+        self.assertEqual(rows[1]['views'], '')
+
+
+@unittest.skipIf(pq is None, "pyarrow not installed")
+class TestColumnarExport(TempDirTestCase):
+    """Parquet is written in record batches with typed columns"""
+
+    def test_parquet_round_trip_across_batches(self):
+        messages = [make_message(i, f"2025-09-10 {i % 24:02d}:00:00", views=i) for i in range(25, 0, -1)]
+        output = self.base / "out.parquet"
+        with mock.patch('telegram_json_export.RECORD_BATCH_SIZE', 10):
+            self.assertEqual(export_messages(iter(messages), "parquet", ['id', 'date_msk', 'views'], str(output)), 25)
+
+        table = pq.read_table(output)
+        self.assertEqual(table.column('id').to_pylist(), list(range(25, 0, -1)))
+        self.assertEqual(str(table.schema.field('views').type), 'int64')
+        self.assertEqual(table.column('date_msk').to_pylist()[0].hour, 1)
+
+    def test_columnar_requires_output(self):
+        with self.assertRaises(ValueError):
+            export_messages(iter([]), "parquet")
+
+
+class TestLLMChunks(TempDirTestCase):
+    """Chunks stay under the token budget and the manifest describes them"""
+
+    def setUp(self):
+        super().setUp()
+        patcher = mock.patch('telegram_filter.get_ocr_cache', return_value=None)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_chunks_respect_budget_and_order(self):
+        messages = [make_message(i, f"2025-09-10 {i % 24:02d}:{i % 60:02d}:00", "word " * 40) for i in range(60, 0, -1)]
+        manifest = json.loads(write_llm_chunks('@chan', 'all', messages, self.base, token_budget=300).read_text())
+
+        self.assertGreater(len(manifest['chunks']), 1)
+        self.assertEqual(manifest['total_messages'], 60)
+        self.assertTrue(all(chunk['tokens'] <= 300 for chunk in manifest['chunks']))
+        # Chronological across chunk boundaries
+        self.assertEqual(manifest['chunks'][0]['first_id'], 1)
+        for previous, chunk in zip(manifest['chunks'], manifest['chunks'][1:]):
+            self.assertEqual(chunk['first_id'], previous['last_id'] + 1)
+
+        first_chunk = (self.base / "chunk_001.txt").read_text(encoding='utf-8').splitlines()
+        self.assertEqual(len(first_chunk), manifest['chunks'][0]['messages'])
+        self.assertTrue(first_chunk[0].startswith("[2025-09-10 01:01] #1 User:"))
+
+    def test_oversized_message_is_truncated_into_its_own_chunk(self):
+        messages = [make_message(2, text="x" * 10000), make_message(1, text="short")]
+        manifest = json.loads(write_llm_chunks('@chan', 'all', messages, self.base, token_budget=200).read_text())
+
+        self.assertEqual([chunk['messages'] for chunk in manifest['chunks']], [1, 1])
+        self.assertTrue(all(chunk['tokens'] <= 200 for chunk in manifest['chunks']))
+        self.assertTrue((self.base / "chunk_002.txt").read_text(encoding='utf-8').rstrip().endswith('...'))
+
+    def test_estimate_counts_non_ascii_denser(self):
+        self.assertGreater(estimate_tokens("п" * 400), estimate_tokens("p" * 400))
+
+
+if __name__ == "__main__":
+    unittest.main()
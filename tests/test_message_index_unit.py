@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the byte-offset message index.
+"""
+
+import json
+import unittest
+from unittest import mock
+
+from helpers import TempDirTestCase, make_message, write_cache
+import message_index
+from message_index import MessageIndex, scan_message_offsets
+
+
+class TestScanMessageOffsets(TempDirTestCase):
+    """Offsets point at each message's bytes whatever the chunk boundaries"""
+
+    def setUp(self):
+        super().setUp()
+        self.messages = [
+            make_message(300 - i, text=f"Сообщение {i} 🚀 with {{\"id\": 1}} inside" * (i % 4 + 1))
+            for i in range(40)
+        ]
+        self.cache_file = write_cache(self.base / "chan_20250910_120000.json", self.messages,
+                                      channel='@chan', total=12345)
+
+    def read_back(self):
+        raw = self.cache_file.read_bytes()
+        return [
+            (message_id, json.loads(raw[offset:offset + length].decode('utf-8')))
+            for message_id, offset, length in scan_message_offsets(self.cache_file)
+        ]
+
+    def test_offsets_match_file_bytes(self):
+        found = self.read_back()
+        self.assertEqual([message_id for message_id, _ in found], [m['id'] for m in self.messages])
+        self.assertEqual([message for _, message in found], self.messages)
+
+    def test_small_chunks_split_messages_and_characters(self):
+        expected = self.read_back()
+        for chunk_size in (1, 7, 64, 1000):
+            with self.subTest(chunk_size=chunk_size), mock.patch.object(message_index, 'CHUNK_SIZE', chunk_size):
+                self.assertEqual(self.read_back(), expected)
+
+    def test_index_lookup_by_id(self):
+        with mock.patch.object(message_index, 'CHUNK_SIZE', 50), MessageIndex(self.base) as index:
+            index.refresh('@chan')
+            self.assertEqual(index.get_messages('@chan', [290, 1]), [self.messages[10]])
+
+    def test_truncated_file_is_an_error(self):
+        self.cache_file.write_bytes(self.cache_file.read_bytes()[:-200])
+        with self.assertRaises(ValueError):
+            list(scan_message_offsets(self.cache_file))
+
+
+if __name__ == "__main__":
+    unittest.main()
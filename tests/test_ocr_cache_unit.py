@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+"""
+Unit tests for OCR cache upserts.
+"""
+
+import unittest
+
+from helpers import TempDirTestCase
+from media_ocr_cache import OCRCache
+
+
+def ocr_payload(text="hello", updated_at="2025-09-10T10:00:00Z"):
+    return {
+        "content_hash": "abc123",
+        "file_name": "photo.jpg",
+        "file_path": "/media/photo.jpg",
+        "image_metadata": {"width": 640, "height": 480, "format": "JPEG"},
+        "ocr_text": text,
+        "error": None,
+        "lang": "rus+eng",
+        "updated_at": updated_at,
+        "phash": None,
+        "verdict": None
+    }
+
+
+class TestUpsertEntry(TempDirTestCase):
+    """Re-running OCR with the same result must not rewrite the entry"""
+
+    def setUp(self):
+        super().setUp()
+        self.cache = OCRCache(self.base / "ocr.sqlite3")
+
+    def tearDown(self):
+        self.cache.conn.close()
+
+    def test_same_content_is_a_no_op(self):
+        self.assertTrue(self.cache.upsert_entry("@chan", 1, ocr_payload()))
+        self.assertFalse(self.cache.upsert_entry("@chan", 1, ocr_payload(updated_at="2025-09-11T10:00:00Z")))
+        self.assertEqual(self.cache.get_entry("@chan", 1)["updated_at"], "2025-09-10T10:00:00Z")
+
+    def test_changed_text_is_written(self):
+        self.cache.upsert_entry("@chan", 1, ocr_payload())
+        self.assertTrue(self.cache.upsert_entry("@chan", 1, ocr_payload(text="hello world")))
+        self.assertEqual(self.cache.get_entry("@chan", 1)["ocr_text"], "hello world")
+
+    def test_empty_text_round_trips(self):
+        self.cache.upsert_entry("@chan", 1, ocr_payload(text=None))
+        self.assertFalse(self.cache.upsert_entry("@chan", 1, ocr_payload(text="")))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the perceptual-hash BK-tree used to reuse OCR of near-duplicates.
+"""
+
+import random
+import unittest
+import unittest.mock
+
+from helpers import TempDirTestCase
+import media_ocr_cache
+from media_ocr_cache import BKTree, OCRCache, hamming_distance, process_media
+
+try:
+    from PIL import Image, ImageDraw
+except ImportError:
+    Image = None
+
+
+class TestBKTree(unittest.TestCase):
+    """Tree search must agree with a brute-force Hamming scan"""
+
+    def setUp(self):
+        rng = random.Random(42)
+        self.values = [rng.getrandbits(64) for _ in range(500)]
+        self.tree = BKTree()
+        for i, value in enumerate(self.values):
+            self.tree.add(value, f"hash{i}")
+
+    def brute_force(self, query, max_distance):
+        return sorted(
+            (hamming_distance(query, value), f"hash{i}")
+            for i, value in enumerate(self.values)
+            if hamming_distance(query, value) <= max_distance
+        )
+
+    def test_finds_near_duplicate(self):
+        query = self.values[7] ^ 0b10110  # flip three bits
+        self.assertEqual(sorted(self.tree.search(query, 4)), [(3, "hash7")])
+
+    def test_matches_brute_force(self):
+        rng = random.Random(7)
+        for _ in range(20):
+            query = rng.getrandbits(64)
+            self.assertEqual(sorted(self.tree.search(query, 24)), self.brute_force(query, 24))
+
+    def test_empty_tree(self):
+        self.assertEqual(BKTree().search(0, 10), [])
+
+
+class FakeBackend:
+    name = "fake"
+
+    def __init__(self):
+        self.calls = 0
+
+    def recognize(self, image, lang):
+        self.calls += 1
+        return "recognized text"
+
+
+@unittest.skipIf(Image is None, "Pillow not installed")
+class TestNearDuplicateReuse(TempDirTestCase):
+    """Hashes stored by a default run let a later --phash-distance run match"""
+
+    def setUp(self):
+        super().setUp()
+        image = Image.new("L", (800, 600), 255)
+        draw = ImageDraw.Draw(image)
+        for y in range(40, 560, 30):
+            draw.text((20, y), "Lorem ipsum dolor sit amet " * 3, fill=0)
+        image.save(self.base / "original.png")
+        image.resize((640, 480)).save(self.base / "resized.jpg", quality=70)
+
+        self.backend = FakeBackend()
+        backends = dict(media_ocr_cache._BACKENDS, auto=self.backend)
+        patcher = unittest.mock.patch.object(media_ocr_cache, "_BACKENDS", backends)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.cache = OCRCache(self.base / "ocr.sqlite3")
+
+    def tearDown(self):
+        self.cache.conn.close()
+
+    def media(self, message_id, name):
+        return {'id': message_id, 'media_info': {'file_path': str(self.base / name)}}
+
+    def test_default_run_stores_hash_for_later_matching(self):
+        process_media('@chan', [self.media(1, "original.png")], self.cache, refresh=False, lang="eng")
+        self.assertIsNotNone(self.cache.get_entry('@chan', 1)['phash'])
+
+        results = process_media('@chan', [self.media(2, "resized.jpg")], self.cache,
+                                refresh=False, lang="eng", phash_distance=6)
+        self.assertEqual(results[0]['status'], 'similar_hit')
+        self.assertEqual(self.backend.calls, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+Unit tests for OCR queue retries and the max-attempts cutoff.
+"""
+
+import unittest
+from unittest import mock
+
+from helpers import TempDirTestCase
+import media_ocr_cache
+from ocr_queue import MAX_ATTEMPTS, OCRQueue
+
+
+def media_message(msg_id):
+    return {'id': msg_id, 'media_info': {'file_path': f"/media/{msg_id}.jpg", 'content_hash': f"hash{msg_id}"}}
+
+
+class TestOCRQueueRetries(TempDirTestCase):
+    """Backend errors are retried and end up failed, never done"""
+
+    def setUp(self):
+        super().setUp()
+        self.queue = OCRQueue(self.base)
+        self.refresh_flags = []
+
+        def process_media(channel, messages, cache, *, refresh, **kwargs):
+            self.refresh_flags.append(refresh)
+            return [
+                {'message_id': msg['id'], 'status': 'updated', 'ocr_text': '',
+                 'error': "tesseract crashed" if msg['id'] == 1 else None}
+                for msg in messages
+            ]
+
+        for name, value in (("process_media", process_media), ("OCRCache", mock.MagicMock())):
+            patcher = mock.patch.object(media_ocr_cache, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        self.queue.close()
+
+    def status(self, msg_id):
+        return self.queue.conn.execute(
+            "SELECT status, attempts, error FROM jobs WHERE message_id = ?", (msg_id,)
+        ).fetchone()
+
+    def test_backend_error_is_retried_then_failed(self):
+        self.queue.enqueue('@chan', [media_message(1), media_message(2)])
+        self.queue.drain()
+
+        self.assertEqual(self.status(1), ('failed', MAX_ATTEMPTS, "tesseract crashed"))
+        self.assertEqual(self.status(2), ('done', 1, None))
+        self.assertEqual(self.refresh_flags, [False] + [True] * (MAX_ATTEMPTS - 1))
+
+    def test_crashed_drainer_jobs_give_up_after_max_attempts(self):
+        self.queue.enqueue('@chan', [media_message(1)])
+        for _ in range(MAX_ATTEMPTS):
+            self.queue.claim()
+            self.queue.requeue_running()
+        self.assertEqual(self.status(1)[0], 'failed')
+
+
+if __name__ == "__main__":
+    unittest.main()
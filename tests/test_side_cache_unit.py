@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the side cache of out-of-range messages and its merge on load.
+"""
+
+import unittest
+from unittest import mock
+
+from helpers import TempDirTestCase, make_message, write_cache
+import thread_index
+from telegram_cache import load_side_cache, merge_messages_into_cache, save_side_messages, side_cache_path
+from thread_index import ThreadIndex, load_cached_messages
+
+MEDIA = {'file_path': '/media/1.jpg', 'file_name': '1.jpg', 'content_hash': 'abc'}
+
+
+class TestSideCache(TempDirTestCase):
+    """Side messages are upserted by id and never lose downloaded media"""
+
+    def test_upsert_keeps_media_info(self):
+        save_side_messages('@chan', [make_message(5, text="first", media_info=MEDIA)], "search", self.base)
+        save_side_messages('@chan', [make_message(5, text="edited"), make_message(6)], "thread", self.base)
+
+        side = load_side_cache('@chan', self.base)
+        self.assertEqual(sorted(side['messages']), [5, 6])
+        self.assertEqual(side['messages'][5]['text'], "edited")
+        self.assertEqual(side['messages'][5]['media_info'], MEDIA)
+        self.assertEqual(side['messages'][5]['source'], "thread")
+
+    def test_records_searches_and_reply_edges(self):
+        save_side_messages('@chan', [make_message(7, reply_to_id=3)], "search", self.base,
+                           search={'pattern': 'alpha', 'min_id': 0, 'max_id': 90})
+        self.assertEqual(load_side_cache('@chan', self.base)['searches'][0]['pattern'], 'alpha')
+        self.assertEqual(ThreadIndex('@chan', self.base).root_of(7), 3)
+
+    def test_missing_side_cache_is_empty(self):
+        self.assertFalse(side_cache_path('@chan', self.base).exists())
+        self.assertEqual(load_side_cache('@chan', self.base)['messages'], {})
+
+
+class TestCachedMessagesMerge(TempDirTestCase):
+    """Thread lookups see the latest cache file plus the side cache"""
+
+    def setUp(self):
+        super().setUp()
+        self.cache_file = write_cache(self.base / "chan_20250910_120000.json",
+                                      [make_message(100, text="cached"), make_message(99)], channel='@chan')
+        patcher = mock.patch('telegram_filter.find_latest_cache', return_value=self.cache_file)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_side_messages_are_merged_and_cache_wins(self):
+        save_side_messages('@chan', [make_message(5), make_message(100, text="stale")], "thread", self.base)
+
+        cache_file, by_id = load_cached_messages('@chan')
+        self.assertEqual(cache_file, self.cache_file)
+        self.assertEqual(sorted(by_id), [5, 99, 100])
+        self.assertEqual(by_id[100]['text'], "cached")
+
+    def test_without_cache_file_side_cache_is_used(self):
+        with mock.patch('telegram_filter.find_latest_cache', return_value=None), \
+                mock.patch.object(thread_index, 'DEFAULT_BASE_DIR', self.base):
+            save_side_messages('@chan', [make_message(6)], "thread", self.base)
+            cache_file, by_id = load_cached_messages('@chan')
+        self.assertIsNone(cache_file)
+        self.assertEqual(sorted(by_id), [6])
+
+    def test_merge_into_cache_keeps_media_and_order(self):
+        merge_messages_into_cache(self.cache_file, [make_message(99, media_info=MEDIA)])
+        merged = merge_messages_into_cache(self.cache_file, [make_message(101), make_message(99, text="edited")])
+
+        self.assertEqual([m['id'] for m in merged], [101, 100, 99])
+        self.assertEqual(merged[2]['text'], "edited")
+        self.assertEqual(merged[2]['media_info'], MEDIA)
+
+
+if __name__ == "__main__":
+    unittest.main()
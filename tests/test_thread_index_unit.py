@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Unit tests for reply-thread reconstruction and fetching of uncached parents.
+"""
+
+import sys
+import types
+import unittest
+from unittest import mock
+
+from helpers import TempDirTestCase, make_message
+from telegram_cache import load_side_cache
+from thread_index import ThreadIndex, fill_missing_messages
+
+
+def reply(msg_id, parent_id):
+    return make_message(msg_id, reply_to_id=parent_id)
+
+
+class TestThreadWalk(TempDirTestCase):
+    """Parent links lead to the root; children come back in reading order"""
+
+    def setUp(self):
+        super().setUp()
+        self.index = ThreadIndex('@chan', self.base)
+        # 10 <- 11 <- 13, 10 <- 12, 11 <- 14
+        self.index.add_messages([reply(11, 10), reply(12, 10), reply(13, 11), reply(14, 11), make_message(10)])
+
+    def test_root_of_walks_every_hop(self):
+        self.assertEqual(self.index.root_of(13), 10)
+        self.assertEqual(self.index.root_of(10), 10)
+        self.assertEqual(self.index.depth_of(13), 2)
+
+    def test_thread_ids_are_depth_first(self):
+        self.assertEqual(self.index.thread_ids(10), [(10, 0), (11, 1), (13, 2), (14, 2), (12, 1)])
+
+    def test_cycles_do_not_loop(self):
+        self.index.add_messages([reply(10, 13)])
+        self.assertEqual(self.index.root_of(13), 10)
+        self.assertEqual(sorted(mid for mid, _ in self.index.thread_ids(10)), [10, 11, 12, 13, 14])
+
+    def test_round_trips_through_disk(self):
+        self.index.save()
+        reloaded = ThreadIndex('@chan', self.base)
+        self.assertEqual(reloaded.thread_ids(10), self.index.thread_ids(10))
+        self.assertEqual(reloaded.add_messages([reply(11, 10)]), 0)
+
+
+class TestFillMissingMessages(TempDirTestCase):
+    """Missing parents are fetched round by round until the root is reached"""
+
+    def setUp(self):
+        super().setUp()
+        # Only the newest reply is cached; its ancestors 30 <- 20 <- 10 are on the server
+        self.server = {10: make_message(10), 20: reply(20, 10), 30: reply(30, 20)}
+        self.requests = []
+
+        async def fetch_messages_by_id(channel, message_ids):
+            self.requests.append(sorted(message_ids))
+            return [self.server[mid] for mid in message_ids if mid in self.server]
+
+        fake_fetch = types.ModuleType("telegram_fetch")
+        fake_fetch.fetch_messages_by_id = fetch_messages_by_id
+        patcher = mock.patch.dict(sys.modules, {"telegram_fetch": fake_fetch})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.cache_file = self.base / "chan_20250910_120000.json"
+        self.index = ThreadIndex('@chan', self.base)
+        self.by_id = {40: reply(40, 30)}
+        self.index.add_messages(self.by_id.values())
+
+    def test_walks_up_to_the_root(self):
+        fill_missing_messages('@chan', self.index, self.cache_file, self.by_id, 40)
+
+        self.assertEqual(self.requests, [[30], [20], [10]])
+        self.assertEqual(self.index.root_of(40), 10)
+        self.assertEqual(sorted(self.by_id), [10, 20, 30, 40])
+        # Fetched parents go to the side cache, not the contiguous cache file
+        self.assertEqual(sorted(load_side_cache('@chan', self.base)['messages']), [10, 20, 30])
+        self.assertFalse(self.cache_file.exists())
+
+    def test_stops_when_server_has_nothing(self):
+        del self.server[20]
+        fill_missing_messages('@chan', self.index, self.cache_file, self.by_id, 40)
+        self.assertEqual(self.requests, [[30], [20]])
+        self.assertEqual(self.index.root_of(40), 20)
+
+    def test_max_rounds_bounds_requests(self):
+        fill_missing_messages('@chan', self.index, self.cache_file, self.by_id, 40, max_rounds=1)
+        self.assertEqual(self.requests, [[30]])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the multi-channel timeline k-way merge.
+"""
+
+import unittest
+
+from helpers import TempDirTestCase, make_message, write_cache
+from message_index import MessageIndex
+from telegram_filter import message_matcher
+from telegram_timeline import merge_streams
+
+
+class TestTimelineMerge(unittest.TestCase):
+    """Merged output must be chronological across channels"""
+
+    def test_interleaves_channels_chronologically(self):
+        first = [make_message(1, '2025-09-15 08:00:00', channel='@a'), make_message(2, '2025-09-15 10:00:00', channel='@a')]
+        second = [make_message(7, '2025-09-15 09:00:00', channel='@b'),
+                  make_message(8, '2025-09-15 11:00:00', channel='@b')]
+
+        merged = list(merge_streams([iter(first), iter(second)]))
+
+        self.assertEqual([m['id'] for m in merged], [1, 7, 2, 8])
+
+    def test_merge_is_lazy(self):
+        def endless(channel, start):
+            hour = start
+            while True:
+                yield make_message(hour, f'2025-09-15 {hour:02d}:00:00', channel=channel)
+                hour += 2
+
+        merged = merge_streams([endless('@a', 0), endless('@b', 1)])
+        self.assertEqual([next(merged)['id'] for _ in range(4)], [0, 1, 2, 3])
+
+    def test_empty_streams(self):
+        self.assertEqual(list(merge_streams([iter([]), iter([])])), [])
+
+    def test_matcher_applies_date_and_pattern(self):
+        matches = message_matcher('2025-09-15', 'gem')
+        self.assertTrue(matches(make_message(1, '2025-09-15 08:00:00', 'Gemini release')))
+        self.assertFalse(matches(make_message(2, '2025-09-15 08:00:00', 'Claude')))
+        self.assertFalse(matches(make_message(3, '2025-09-14 08:00:00', 'Gemini')))
+
+
+class TestIndexedFileStream(TempDirTestCase):
+    """Cache files are streamed through the offset index, in either direction"""
+
+    def test_streams_oldest_first(self):
+        messages = [make_message(i, f'2025-09-15 {i:02d}:00:00', f"сообщение {i}") for i in range(5, 0, -1)]
+        cache_file = write_cache(self.base / "a_20250915_120000.json", messages)
+        with MessageIndex(self.base) as index:
+            self.assertEqual(list(index.iter_file_messages('@a', cache_file, newest_first=False)), messages[::-1])
+            self.assertEqual(list(index.iter_file_messages('@a', cache_file)), messages)
+
+
+if __name__ == "__main__":
+    unittest.main()